@@ -2,11 +2,12 @@ import os
 
 from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
-from app.voter_records.tables import Ballot, VoterRecord
-from fuzzy_match_helper import create_ocr_matched_df, create_select_voter_records
+from voter_records.tables import Ballot, VoterRecord
+from fuzzy_match_helper import create_ocr_matched_df, load_voter_roll_file
 from ocr_helper import create_ocr_df
 from routers import file
-from settings.settings_repo import config
+from matching import MatchCache, ScorerCascade
+from settings.settings_repo import config, load_settings
 from utils import logger
 from piccolo_api.fastapi.endpoints import FastAPIWrapper, FastAPIKwargs
 from piccolo_api.crud.endpoints import PiccoloCRUD
@@ -39,6 +40,13 @@ app.mount(
 )
 app.router.include_router(file.router, tags=["File Upload"])
 
+# The roll uploaded before a restart is loaded once, not on every request
+app.state.voter_roll = (
+    load_voter_roll_file(file.VOTER_RECORDS_PATH)
+    if os.path.exists(file.VOTER_RECORDS_PATH)
+    else None
+)
+
 FastAPIWrapper(
     root_url="/voter_record",
     fastapi_app=app,
@@ -79,7 +87,8 @@ def ocr(response: Response):
         logger.error("No PDF file found for petition signatures")
         response.status_code = 400
         return {"error": "No PDF file found for petition signatures"}
-    if app.state.voter_records_df is None:
+    voter_roll = app.state.voter_roll
+    if voter_roll is None:
         logger.error("No voter records file found")
         response.status_code = 400
         return {"error": "No voter records file found"}
@@ -89,14 +98,23 @@ def ocr(response: Response):
 
     ocr_df = create_ocr_df(filedir="temp", filename="ballot.pdf")
 
-    logger.info("Compiling Voter Record Data...")
-
-    select_voter_records = create_select_voter_records(app.state.voter_records_df)
-
     logger.info("Matching petition signatures to voter records...")
 
-    ocr_matched_df = create_ocr_matched_df(
-        ocr_df, select_voter_records, threshold=config["BASE_THRESHOLD"]
-    )
+    matching_config = load_settings().matching
+    with voter_roll.process_pool(matching_config.workers) as process_pool:
+        ocr_matched_df = create_ocr_matched_df(
+            ocr_df,
+            voter_roll.store,
+            threshold=config["BASE_THRESHOLD"],
+            exact_index=voter_roll.exact_index,
+            process_pool=process_pool,
+            ward_index=voter_roll.ward_index,
+            tfidf_index=voter_roll.tfidf_index(matching_config),
+            scorer_cascade=ScorerCascade.from_config(matching_config),
+            match_cache=MatchCache.from_config(matching_config, voter_roll.roll_hash),
+        )
     response.headers["Content-Type"] = "application/json"
-    return {"data": ocr_matched_df.to_dict(orient="records"), "stats": {}}
+    return {
+        "data": ocr_matched_df.to_dict(orient="records"),
+        "stats": {"failed_pages": ocr_df.attrs.get("failed_pages", [])},
+    }
@@ -1,16 +1,42 @@
 # needed libraries
 ### structured outputs; replacements
+import json
 import os
-from typing import List, Tuple
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+from typing import Callable, ContextManager, Dict, List, Optional, Tuple, Union
 from tqdm.notebook import tqdm
 from rapidfuzz import fuzz
 from dotenv import load_dotenv
 import pandas as pd
 import numpy as np
-from concurrent.futures import ThreadPoolExecutor
 import logging
 from datetime import datetime
 
+from matching import (
+    DEFAULT_INDEX_DIRECTORY,
+    WARD_COLUMN,
+    BlockingIndex,
+    ExactMatchIndex,
+    MatchCache,
+    ProcessPoolMatcher,
+    ScorerCascade,
+    StreetIndex,
+    TfidfCandidateIndex,
+    VoterMatchIndex,
+    VoterStringStore,
+    WardIndex,
+    hash_voter_file,
+    hash_voter_records,
+    combine_name_address_matches,
+    match_name_and_address_joint_batch,
+    match_name_then_address_batch,
+    match_name_then_address_candidates_batch,
+    normalize_ward,
+    top_k_matches,
+    voter_index_path,
+)
+
 # local environment storage
 repo_name = "Ballot-Initiative"
 REPODIR = os.getcwd()
@@ -47,10 +73,21 @@ logger.addHandler(console_handler)
 ###
 
 
+def _join_columns(records: pd.DataFrame, columns: List[str]) -> pd.Series:
+    """
+    Joins the given columns of every row with spaces, treating missing values as "".
+    """
+    parts = records[columns].fillna("").astype(str)
+    return parts[columns[0]].str.cat([parts[column] for column in columns[1:]], sep=" ")
+
+
 def create_select_voter_records(voter_records: pd.DataFrame) -> pd.DataFrame:
     """
     Creates a simplified DataFrame with full names and addresses from voter records.
 
+    The columns are joined with vectorized string concatenation, and
+    `voter_records` is left unchanged.
+
     Args:
         voter_records (pd.DataFrame): DataFrame containing voter information with columns for
             first name, last name, and address components.
@@ -60,10 +97,6 @@ def create_select_voter_records(voter_records: pd.DataFrame) -> pd.DataFrame:
     """
     # Create full name by combining first and last names
     name_components = ["First_Name", "Last_Name"]
-    voter_records[name_components] = voter_records[name_components].fillna("")
-    voter_records["Full Name"] = (
-        voter_records[name_components].astype(str).agg(" ".join, axis=1)
-    )
 
     # Create full address by combining address components
     address_components = [
@@ -72,17 +105,161 @@ def create_select_voter_records(voter_records: pd.DataFrame) -> pd.DataFrame:
         "Street_Type",
         "Street_Dir_Suffix",
     ]
-    voter_records[address_components] = voter_records[address_components].fillna("")
-    voter_records["Full Address"] = (
-        voter_records[address_components].astype(str).agg(" ".join, axis=1)
+
+    return pd.DataFrame(
+        {
+            "Full Name": _join_columns(voter_records, name_components),
+            "Full Address": _join_columns(voter_records, address_components),
+        }
     )
 
-    # Return only the columns we need
-    return voter_records[["Full Name", "Full Address"]]
+
+def load_voter_match_index(
+    voter_records: pd.DataFrame,
+    directory: str = DEFAULT_INDEX_DIRECTORY,
+    roll_hash: Optional[str] = None,
+) -> VoterMatchIndex:
+    """
+    Opens the persistent match index of a voter roll, building and saving it with
+    `create_select_voter_records` the first time the roll is seen.
+
+    Args:
+        voter_records (pd.DataFrame): The raw voter records.
+        directory (str): Directory holding the index files.
+        roll_hash (str): Content hash of the roll, e.g. from `hash_voter_file`.
+            Computed with `hash_voter_records` when not given.
+
+    Returns:
+        VoterMatchIndex: The memory-mapped index.
+    """
+    roll_hash = roll_hash or hash_voter_records(voter_records)
+    path = voter_index_path(roll_hash, directory)
+    if not os.path.exists(path):
+        logger.info(f"No voter match index for roll {roll_hash[:12]}, building it")
+        os.makedirs(directory, exist_ok=True)
+        select_voter_records = create_select_voter_records(voter_records)
+        wards = None
+        if WARD_COLUMN in voter_records.columns:
+            wards = voter_records[WARD_COLUMN].map(normalize_ward).values
+        VoterMatchIndex.build(select_voter_records, roll_hash, wards).save(path)
+    return VoterMatchIndex.open(path)
+
+
+@dataclass
+class VoterRoll:
+    """
+    A voter roll loaded once for matching: its match index, and the voter strings
+    and the exact match and ward indexes read from it. Requests match against it
+    instead of hashing and decoding the roll again.
+    """
+
+    index: VoterMatchIndex
+    store: VoterStringStore
+    exact_index: ExactMatchIndex
+    ward_index: Optional[WardIndex]
+    _tfidf_indexes: Dict[Tuple[str, int], TfidfCandidateIndex] = field(
+        default_factory=dict, init=False, repr=False, compare=False
+    )
+
+    @classmethod
+    def from_index(cls, index: VoterMatchIndex) -> "VoterRoll":
+        """
+        Opens the voter strings and the indexes saved in a match index. They are
+        read from the mapped file, so nothing is decoded or rebuilt, and processes
+        loading the same roll share one copy of it.
+
+        Args:
+            index (VoterMatchIndex): The match index of the roll.
+
+        Returns:
+            VoterRoll: The roll, ready for `create_ocr_matched_df`.
+        """
+        return cls(
+            index,
+            VoterStringStore.from_index(index),
+            index.exact_index(),
+            index.ward_index(),
+        )
+
+    @property
+    def roll_hash(self) -> str:
+        return self.index.roll_hash
+
+    def tfidf_index(self, matching_config) -> Optional[TfidfCandidateIndex]:
+        """
+        Returns the TF-IDF index chosen in the `[matching]` section, built once per
+        roll and setting.
+
+        Args:
+            matching_config (MatchingConfig): The matching settings, with `tfidf`,
+                `tfidf_limit` and `workers`.
+
+        Returns:
+            Optional[TfidfCandidateIndex]: The index, or None when `tfidf` is "none"
+                or matching runs in a process pool, which scans the whole roll.
+        """
+        if matching_config.tfidf == "none":
+            return None
+        if matching_config.workers > 0:
+            logger.warning("The TF-IDF index is not used with matching workers")
+            return None
+        key = (matching_config.tfidf, matching_config.tfidf_limit)
+        if key not in self._tfidf_indexes:
+            self._tfidf_indexes[key] = TfidfCandidateIndex.from_config(
+                matching_config, self.store.names, self.store.addresses
+            )
+        return self._tfidf_indexes[key]
+
+    def process_pool(
+        self, workers: int
+    ) -> ContextManager[Optional[ProcessPoolMatcher]]:
+        """
+        Starts a process pool matcher reading the index file of the roll, for the
+        `workers` setting of the `[matching]` section.
+
+        Args:
+            workers (int): Number of worker processes. 0 matches in process.
+
+        Returns:
+            ContextManager[Optional[ProcessPoolMatcher]]: The pool, or None when
+                `workers` is 0, to pass to `create_ocr_matched_df`.
+        """
+        if workers <= 0:
+            return nullcontext()
+        return ProcessPoolMatcher(max_workers=workers, index_path=self.index.path)
+
+
+def load_voter_roll_file(
+    path: str, directory: str = DEFAULT_INDEX_DIRECTORY
+) -> VoterRoll:
+    """
+    Loads the voter roll of a CSV file. The file is hashed once, and only parsed
+    when its match index has not been built yet.
+
+    Args:
+        path (str): Path to the voter records CSV.
+        directory (str): Directory holding the index files.
+
+    Returns:
+        VoterRoll: The loaded roll.
+    """
+    roll_hash = hash_voter_file(path)
+    index_path = voter_index_path(roll_hash, directory)
+    if os.path.exists(index_path):
+        index = VoterMatchIndex.open(index_path)
+    else:
+        voter_records = pd.read_csv(path, dtype=str)
+        index = load_voter_match_index(voter_records, directory, roll_hash)
+    return VoterRoll.from_index(index)
 
 
 def score_fuzzy_match_slim(
-    ocr_result: str, comparison_list: List[str], scorer_=fuzz.ratio, limit_=10
+    ocr_result: str,
+    comparison_list: List[str],
+    scorer_=fuzz.ratio,
+    limit_=10,
+    unique_choices: Optional[Tuple[np.ndarray, np.ndarray]] = None,
+    cascade: Optional[ScorerCascade] = None,
 ) -> List[Tuple[str, int, int]]:
     """
     Scores the fuzzy match between the OCR result and the comparison list.
@@ -92,124 +269,681 @@ def score_fuzzy_match_slim(
         comparison_list (List[str]): The list of strings to compare against.
         scorer_ (function): The scorer function to use.
         limit_ (int): The number of top matches to return.
+        unique_choices (Tuple[np.ndarray, np.ndarray]): Optional distinct strings of
+            `comparison_list` and the position of each entry among them. Each distinct
+            string is then scored once and its score shared by all its entries.
+        cascade (ScorerCascade): Optional two-stage scorer. When given, a cheap
+            prefilter shortlists candidates for its final scorer, instead of
+            scoring the whole list with `scorer_`.
 
     Returns:
         List[Tuple[str, int, int]]: The list of top matches with their scores and indices.
     """
     logger.debug(f"Starting fuzzy matching for: {ocr_result[:30]}...")
 
-    # Convert to numpy array for faster operations
-    comparison_array = np.array(comparison_list)
-
-    # Vectorize the scorer function
-    vectorized_scorer = np.vectorize(lambda x: scorer_(ocr_result, x))
-
-    # Calculate all scores at once
-    scores = vectorized_scorer(comparison_array)
-
-    # Get top N indices
-    top_indices = np.argpartition(scores, -limit_)[-limit_:]
-    top_indices = top_indices[np.argsort(scores[top_indices])[::-1]]
+    # Score against the whole list in a single native call
+    if cascade is not None:
+        top_indices, top_scores = cascade.top_k(
+            [ocr_result], comparison_list, limit=limit_
+        )
+    else:
+        if unique_choices is None:
+            choices, choice_inverse = comparison_list, None
+        else:
+            choices, choice_inverse = unique_choices
+        top_indices, top_scores = top_k_matches(
+            [ocr_result],
+            choices,
+            scorer=scorer_,
+            limit=limit_,
+            choice_inverse=choice_inverse,
+        )
 
-    results = [(comparison_array[i], scores[i], i) for i in top_indices]
+    results = [
+        (comparison_list[i], score, i)
+        for i, score in zip(top_indices[0], top_scores[0])
+    ]
     logger.debug(f"Top match score: {results[0][1]}, Match: {results[0][0][:30]}...")
     return results
 
 
-def get_matched_name_address(
-    ocr_name: str, ocr_address: str, select_voter_records: pd.DataFrame
+def _match_name_then_address(
+    ocr_name: str,
+    ocr_address: str,
+    voter_names: np.ndarray,
+    voter_addresses: np.ndarray,
+    unique_names: Optional[Tuple[np.ndarray, np.ndarray]] = None,
+    cascade: Optional[ScorerCascade] = None,
 ) -> List[Tuple[str, str, float, int]]:
     """
-    Optimized name and address matching
+    Scores the top name matches, then the addresses of those matches.
 
     Args:
         ocr_name (str): The OCR result for the name.
         ocr_address (str): The OCR result for the address.
-        select_voter_records (pd.DataFrame): The DataFrame containing voter records.
+        voter_names (np.ndarray): The voter full names to search.
+        voter_addresses (np.ndarray): The voter full addresses, aligned with the names.
+        unique_names (Tuple[np.ndarray, np.ndarray]): Optional distinct voter names
+            with their inverse, see `VoterStringStore.unique_names`.
+        cascade (ScorerCascade): Optional two-stage scorer for the names; its final
+            scorer is also used for the addresses.
 
     Returns:
-        List[Tuple[str, str, float, int]]: The list of top matches with their scores and indices.
+        List[Tuple[str, str, float, int]]: The list of top matches with their scores and
+            positions in `voter_names`.
     """
-    logger.debug(f"Matching - Name: {ocr_name[:30]}... Address: {ocr_address[:30]}...")
-
     # Get name matches
     name_matches = score_fuzzy_match_slim(
-        ocr_name, select_voter_records["Full Name"].values
+        ocr_name,
+        voter_names,
+        limit_=min(10, len(voter_names)),
+        unique_choices=unique_names,
+        cascade=cascade,
     )
     logger.debug(f"Best name match score: {name_matches[0][1]}")
 
     # Get address matches
     matched_indices = [x[2] for x in name_matches]
-    relevant_addresses = select_voter_records["Full Address"].values[matched_indices]
-    address_matches = score_fuzzy_match_slim(ocr_address, relevant_addresses)
+    relevant_addresses = voter_addresses[matched_indices]
+    address_matches = score_fuzzy_match_slim(
+        ocr_address,
+        relevant_addresses,
+        scorer_=fuzz.ratio if cascade is None else cascade.scorer,
+        limit_=len(relevant_addresses),
+    )
     logger.debug(f"Best address match score: {address_matches[0][1]}")
 
-    # Calculate harmonic means
-    name_scores = np.array([x[1] for x in name_matches])
-    addr_scores = np.array([x[1] for x in address_matches])
-    harmonic_means = 2 * name_scores * addr_scores / (name_scores + addr_scores)
-
-    # Create and sort results
-    results = list(
-        zip(
-            [x[0] for x in name_matches],
-            [x[0] for x in address_matches],
-            harmonic_means,
-            matched_indices,
+    return combine_name_address_matches(name_matches, address_matches)
+
+
+def _candidate_rows(
+    ocr_name: str,
+    ocr_address: str,
+    blocking_index: Optional[BlockingIndex],
+    street_index: Optional[StreetIndex],
+) -> Optional[np.ndarray]:
+    """
+    Returns the voter rows to score for a signature, or None to score the whole roll.
+
+    Voters living on the streets matching the OCR address and voters sharing a name
+    blocking key are selected; with both indexes, voters must satisfy both.
+    """
+    candidates = None
+    if street_index is not None:
+        candidates = street_index.candidates(ocr_address)
+    if blocking_index is not None:
+        name_candidates = blocking_index.candidates(ocr_name)
+        candidates = (
+            name_candidates
+            if candidates is None
+            else np.intersect1d(candidates, name_candidates, assume_unique=True)
+        )
+    return candidates
+
+
+def _match_blocked(
+    ocr_name: str,
+    ocr_address: str,
+    store: VoterStringStore,
+    candidates: np.ndarray,
+    fallback_threshold: Optional[float],
+    cascade: Optional[ScorerCascade] = None,
+) -> Optional[List[Tuple[str, str, float, int]]]:
+    """
+    Matches a signature among the candidate voter rows from `_candidate_rows`.
+
+    Returns None when there are no candidates or when the best blocked score is below
+    `fallback_threshold`, meaning the caller should widen to a full scan.
+    """
+    if len(candidates) == 0:
+        logger.debug(f"No blocking candidates for: {ocr_name[:30]}...")
+        return None
+
+    results = _match_name_then_address(
+        ocr_name,
+        ocr_address,
+        store.names[candidates],
+        store.addresses[candidates],
+        cascade=cascade,
+    )
+    if fallback_threshold is not None and results[0][2] < fallback_threshold:
+        logger.debug(
+            f"Best blocked score {results[0][2]:.1f} below {fallback_threshold}, "
+            "widening to full scan"
         )
+        return None
+
+    return [
+        (name, address, score, candidates[i]) for name, address, score, i in results
+    ]
+
+
+def _match_cache_config(
+    scorer_cascade: Optional[ScorerCascade],
+    fallback_threshold: Optional[float],
+    limit: int = 10,
+    joint: bool = False,
+    process_pool: bool = False,
+    blocking_index: Optional[BlockingIndex] = None,
+    street_index: Optional[StreetIndex] = None,
+    tfidf_index: Optional[TfidfCandidateIndex] = None,
+    ocr_ward: Optional[str] = None,
+) -> str:
+    """
+    Describes the matching options a result depends on, for `MatchCache` keys.
+    The fallback threshold only matters, and is only included, when a blocking,
+    street or ward index narrows the candidates.
+    """
+    uses_fallback = (
+        blocking_index is not None or street_index is not None or ocr_ward is not None
     )
-    results = sorted(results, key=lambda x: x[2], reverse=True)
+    return json.dumps(
+        {
+            "scorer": "ratio" if scorer_cascade is None else scorer_cascade.config_key,
+            "fallback_threshold": fallback_threshold if uses_fallback else None,
+            "limit": limit,
+            "joint": joint,
+            "process_pool": process_pool,
+            "blocking": blocking_index is not None,
+            "street": street_index is not None,
+            "tfidf": None if tfidf_index is None else tfidf_index.config_key,
+            "ward": ocr_ward,
+        },
+        sort_keys=True,
+    )
+
+
+def get_matched_name_address(
+    ocr_name: str,
+    ocr_address: str,
+    select_voter_records: Union[pd.DataFrame, VoterStringStore],
+    blocking_index: Optional[BlockingIndex] = None,
+    fallback_threshold: Optional[float] = config["BASE_THRESHOLD"],
+    street_index: Optional[StreetIndex] = None,
+    scorer_cascade: Optional[ScorerCascade] = None,
+    match_cache: Optional[MatchCache] = None,
+) -> List[Tuple[str, str, float, int]]:
+    """
+    Optimized name and address matching
+
+    Args:
+        ocr_name (str): The OCR result for the name.
+        ocr_address (str): The OCR result for the address.
+        select_voter_records (pd.DataFrame | VoterStringStore): The DataFrame
+            containing voter records, or a store built from it once.
+        blocking_index (BlockingIndex): Optional candidate index built from
+            `select_voter_records`. When given, only voters sharing a blocking key
+            with the OCR name are scored.
+        fallback_threshold (float): Widen a blocked search to a full scan when its best
+            score is below this value. None disables the fallback.
+        street_index (StreetIndex): Optional street index built from the voter
+            records. When given, only residents of the streets matching the OCR
+            address are scored.
+        scorer_cascade (ScorerCascade): Optional two-stage scorer, see
+            `score_fuzzy_match_slim`. Defaults to `fuzz.ratio` on every voter.
+        match_cache (MatchCache): Optional cache of match results for this voter
+            roll. Inputs repeated with the same text, up to whitespace, are answered
+            from the cache.
+
+    Returns:
+        List[Tuple[str, str, float, int]]: The list of top matches with their scores and indices.
+    """
+    if match_cache is not None:
+        cache_config = _match_cache_config(
+            scorer_cascade,
+            fallback_threshold,
+            blocking_index=blocking_index,
+            street_index=street_index,
+        )
+        (cached,) = match_cache.get_many([ocr_name], [ocr_address], [cache_config])
+        if cached is not None:
+            return cached
+
+    logger.debug(f"Matching - Name: {ocr_name[:30]}... Address: {ocr_address[:30]}...")
+    store = VoterStringStore.of(select_voter_records)
+
+    results = None
+    candidates = _candidate_rows(ocr_name, ocr_address, blocking_index, street_index)
+    if candidates is not None:
+        results = _match_blocked(
+            ocr_name,
+            ocr_address,
+            store,
+            candidates,
+            fallback_threshold,
+            cascade=scorer_cascade,
+        )
+
+    if results is None:
+        # Only reuse the distinct name table of a store the caller keeps around;
+        # building it for a one-off store costs more than it saves
+        results = _match_name_then_address(
+            ocr_name,
+            ocr_address,
+            store.names,
+            store.addresses,
+            unique_names=(
+                store.unique_names if store is select_voter_records else None
+            ),
+            cascade=scorer_cascade,
+        )
 
     logger.debug(f"Best combined match score: {results[0][2]}")
+    if match_cache is not None:
+        match_cache.set_many([ocr_name], [ocr_address], [cache_config], [results])
     return results
 
 
+def _match_whole_roll(
+    ocr_names: List[str],
+    ocr_addresses: List[str],
+    store: VoterStringStore,
+    limit: int,
+    tfidf_index: Optional[TfidfCandidateIndex],
+    cascade: Optional[ScorerCascade],
+    process_pool: Optional[ProcessPoolMatcher] = None,
+) -> List[List[Tuple[str, str, float, int]]]:
+    """
+    Name-first matching against every voter, in the worker processes of
+    `process_pool` when given, or against the TF-IDF candidates of each row when a
+    `TfidfCandidateIndex` is given.
+    """
+    if process_pool is not None:
+        return process_pool.match(ocr_names, ocr_addresses, limit, cascade=cascade)
+
+    if tfidf_index is not None:
+        name_candidates = tfidf_index.candidates(ocr_names, ocr_addresses)
+        return match_name_then_address_candidates_batch(
+            ocr_names,
+            ocr_addresses,
+            store.names,
+            store.addresses,
+            name_candidates,
+            limit=limit,
+            scorer=fuzz.ratio if cascade is None else cascade.scorer,
+        )
+
+    return match_name_then_address_batch(
+        ocr_names,
+        ocr_addresses,
+        store.names,
+        store.addresses,
+        limit=limit,
+        unique_names=store.unique_names,
+        cascade=cascade,
+    )
+
+
+def _match_by_ward(
+    ocr_names: List[str],
+    ocr_addresses: List[str],
+    ocr_wards: List,
+    store: VoterStringStore,
+    ward_index: WardIndex,
+    fallback_threshold: Optional[float],
+    match_city_wide: Callable[
+        [List[str], List[str]], List[List[Tuple[str, str, float, int]]]
+    ],
+    limit: int = 10,
+    cascade: Optional[ScorerCascade] = None,
+) -> List[List[Tuple[str, str, float, int]]]:
+    """
+    Matches every row with a known OCR ward against the voters of that ward, then
+    the remaining rows with `match_city_wide`. A ward is only trusted when its best
+    match is confident, scoring at least `fallback_threshold`, or `BASE_THRESHOLD`
+    when it is None, as a misread ward holds no good match for the signer.
+    """
+    if fallback_threshold is None:
+        fallback_threshold = config["BASE_THRESHOLD"]
+    batch_results = [None] * len(ocr_names)
+    for ward, rows in ward_index.partition(ocr_wards).items():
+        residents = ward_index.residents[ward]
+        ward_store = ward_index.ward_store(ward, store)
+        ward_results = match_name_then_address_batch(
+            [ocr_names[row] for row in rows],
+            [ocr_addresses[row] for row in rows],
+            ward_store.names,
+            ward_store.addresses,
+            limit=min(limit, len(residents)),
+            unique_names=ward_store.unique_names,
+            cascade=cascade,
+        )
+        for row, results in zip(rows, ward_results):
+            if results[0][2] >= fallback_threshold:
+                batch_results[row] = [
+                    (name, address, score, residents[i])
+                    for name, address, score, i in results
+                ]
+
+    # Rows without a ward, with an unknown ward or without a good match in their
+    # ward are matched against the whole city
+    fallback_rows = [row for row, result in enumerate(batch_results) if result is None]
+    logger.debug(
+        f"Matched {len(ocr_names) - len(fallback_rows)} rows within their ward, "
+        f"{len(fallback_rows)} rows city-wide"
+    )
+    if fallback_rows:
+        fallback_results = match_city_wide(
+            [ocr_names[row] for row in fallback_rows],
+            [ocr_addresses[row] for row in fallback_rows],
+        )
+        for row, result in zip(fallback_rows, fallback_results):
+            batch_results[row] = result
+
+    return batch_results
+
+
+def get_matched_name_address_batch(
+    ocr_names: List[str],
+    ocr_addresses: List[str],
+    select_voter_records: Union[pd.DataFrame, VoterStringStore],
+    limit_: int = 10,
+    blocking_index: Optional[BlockingIndex] = None,
+    fallback_threshold: Optional[float] = config["BASE_THRESHOLD"],
+    joint: bool = False,
+    street_index: Optional[StreetIndex] = None,
+    ward_index: Optional[WardIndex] = None,
+    ocr_wards: Optional[List] = None,
+    tfidf_index: Optional[TfidfCandidateIndex] = None,
+    scorer_cascade: Optional[ScorerCascade] = None,
+    process_pool: Optional[ProcessPoolMatcher] = None,
+) -> List[List[Tuple[str, str, float, int]]]:
+    """
+    Name and address matching for a whole batch of OCR results at once.
+
+    Gives the same results as calling `get_matched_name_address` for every row, but
+    scores the batch against the voter roll in a few native rapidfuzz calls.
+
+    Args:
+        ocr_names (List[str]): The OCR results for the names.
+        ocr_addresses (List[str]): The OCR results for the addresses.
+        select_voter_records (pd.DataFrame | VoterStringStore): The DataFrame
+            containing voter records, or a store built from it once.
+        limit_ (int): The number of top name matches to consider per row.
+        blocking_index (BlockingIndex): Optional candidate index, see
+            `get_matched_name_address`.
+        fallback_threshold (float): Widen blocked searches to a full scan below this score.
+        joint (bool): Take candidates from both the top name and the top address
+            matches, see `match_name_and_address_joint_batch`. `blocking_index` is
+            not used in this mode.
+        street_index (StreetIndex): Optional street index, see
+            `get_matched_name_address`.
+        ward_index (WardIndex): Optional ward index built from the voter records.
+            Rows whose OCR ward is known to the index are matched against that
+            ward's voters first; rows below `fallback_threshold`, or below
+            `BASE_THRESHOLD` when it is None, are matched city-wide.
+        ocr_wards (List): The OCR results for the ward of each row, used with
+            `ward_index`.
+        tfidf_index (TfidfCandidateIndex): Optional TF-IDF index over the voter
+            names, or names and addresses. Scans of the whole roll then only score
+            each row's TF-IDF candidates with `fuzz.ratio`.
+        scorer_cascade (ScorerCascade): Optional two-stage scorer, see
+            `score_fuzzy_match_slim`. Not used in joint mode.
+        process_pool (ProcessPoolMatcher): Optional process pool attached to the
+            same voter records. Scans of the whole roll then run in its worker
+            processes. Can not be combined with `tfidf_index`.
+
+    Returns:
+        List[List[Tuple[str, str, float, int]]]: The top matches for every row.
+
+    Raises:
+        ValueError: If `process_pool` is combined with `tfidf_index`.
+    """
+    if process_pool is not None and tfidf_index is not None:
+        raise ValueError("The process pool can not be combined with tfidf_index")
+
+    store = VoterStringStore.of(select_voter_records)
+    if ward_index is not None and ocr_wards is not None:
+        return _match_by_ward(
+            ocr_names,
+            ocr_addresses,
+            ocr_wards,
+            store,
+            ward_index,
+            fallback_threshold,
+            lambda names, addresses: get_matched_name_address_batch(
+                names,
+                addresses,
+                store,
+                limit_=limit_,
+                blocking_index=blocking_index,
+                fallback_threshold=fallback_threshold,
+                joint=joint,
+                street_index=street_index,
+                tfidf_index=tfidf_index,
+                scorer_cascade=scorer_cascade,
+                process_pool=process_pool,
+            ),
+            limit=limit_,
+            cascade=scorer_cascade,
+        )
+
+    if joint:
+        if process_pool is not None:
+            return process_pool.match(ocr_names, ocr_addresses, limit_, joint=True)
+        return match_name_and_address_joint_batch(
+            ocr_names,
+            ocr_addresses,
+            store.names,
+            store.addresses,
+            limit=limit_,
+            unique_names=store.unique_names,
+            unique_addresses=store.unique_addresses,
+        )
+
+    if blocking_index is None and street_index is None:
+        return _match_whole_roll(
+            ocr_names,
+            ocr_addresses,
+            store,
+            limit_,
+            tfidf_index,
+            scorer_cascade,
+            process_pool,
+        )
+
+    batch_results = [
+        _match_blocked(
+            ocr_name,
+            ocr_address,
+            store,
+            _candidate_rows(ocr_name, ocr_address, blocking_index, street_index),
+            fallback_threshold,
+            cascade=scorer_cascade,
+        )
+        for ocr_name, ocr_address in zip(ocr_names, ocr_addresses)
+    ]
+
+    # Rows without a good blocked match are scored against the whole roll
+    fallback_rows = [row for row, result in enumerate(batch_results) if result is None]
+    if fallback_rows:
+        logger.debug(f"{len(fallback_rows)} rows fell back to a full scan")
+        fallback_results = _match_whole_roll(
+            [ocr_names[row] for row in fallback_rows],
+            [ocr_addresses[row] for row in fallback_rows],
+            store,
+            limit_,
+            tfidf_index,
+            scorer_cascade,
+            process_pool,
+        )
+        for row, result in zip(fallback_rows, fallback_results):
+            batch_results[row] = result
+
+    return batch_results
+
+
 def create_ocr_matched_df(
     ocr_df: pd.DataFrame,
-    select_voter_records: pd.DataFrame,
+    select_voter_records: Union[pd.DataFrame, VoterStringStore],
     threshold: float = config["BASE_THRESHOLD"],
     st_bar=None,
+    blocking_index: Optional[BlockingIndex] = None,
+    exact_index: Optional[ExactMatchIndex] = None,
+    process_pool: Optional[ProcessPoolMatcher] = None,
+    joint: bool = False,
+    street_index: Optional[StreetIndex] = None,
+    ward_index: Optional[WardIndex] = None,
+    tfidf_index: Optional[TfidfCandidateIndex] = None,
+    scorer_cascade: Optional[ScorerCascade] = None,
+    match_cache: Optional[MatchCache] = None,
 ) -> pd.DataFrame:
     """
     Creates a DataFrame with matched name and address.
 
+    Rows whose normalized name and address exactly match a voter are resolved with a
+    hash lookup and scored 100; only the remaining rows are fuzzy matched.
+
     Args:
         ocr_df (pd.DataFrame): The DataFrame containing OCR results.
-        select_voter_records (pd.DataFrame): The DataFrame containing voter records.
+        select_voter_records (pd.DataFrame | VoterStringStore): The DataFrame
+            containing voter records, or a store built from it once.
         threshold (float): The threshold for matching.
         st_bar (st.progress): The progress bar to display.
+        blocking_index (BlockingIndex): Optional candidate index built from
+            `select_voter_records`. Blocked matches scoring below `threshold` are
+            retried against the full roll.
+        exact_index (ExactMatchIndex): Precomputed exact match index of
+            `select_voter_records`. Built on the fly when not given.
+        process_pool (ProcessPoolMatcher): Optional process pool backend attached to
+            `select_voter_records`, see `VoterRoll.process_pool`. When given, scans
+            of the whole roll run in its worker processes; blocked, street-local
+            and ward-local matching stay in process. Can not be combined with
+            `tfidf_index`.
+        joint (bool): Generate candidates from both the name and the address, see
+            `get_matched_name_address_batch`.
+        street_index (StreetIndex): Optional street index built from the voter
+            records. Street-local matches scoring below `threshold` are retried
+            against the full roll.
+        ward_index (WardIndex): Optional ward index built from the voter records.
+            Rows are matched within their 'OCR Ward' first, and city-wide when the
+            ward is unknown or the match scores below `threshold`.
+        tfidf_index (TfidfCandidateIndex): Optional TF-IDF index over the voter
+            names, or names and addresses, used to pick the candidates of full roll
+            scans, see `VoterRoll.tfidf_index`.
+        scorer_cascade (ScorerCascade): Optional two-stage scorer configured in the
+            `[matching]` section of the settings file.
+        match_cache (MatchCache): Optional cache of match results for the voter
+            roll. Rows already matched with the same options, e.g. a signer on an
+            earlier petition or a rerun, are read from it instead of being scored.
+            Rows are matched on their text as read; only the cache keys have
+            their whitespace normalized.
 
     Returns:
         pd.DataFrame: The DataFrame with matched name and address.
+
+    Raises:
+        ValueError: If `process_pool` is combined with `tfidf_index`.
     """
+    if process_pool is not None and tfidf_index is not None:
+        raise ValueError("The process pool can not be combined with tfidf_index")
+
     logger.info(
         f"Starting matching process for {len(ocr_df)} records with threshold {threshold}"
     )
 
+    # Hold the voter strings once for every batch below
+    store = VoterStringStore.of(select_voter_records)
+
+    # Resolve exact matches first with a hash join on normalized keys
+    if exact_index is None:
+        exact_index = ExactMatchIndex.from_strings(store.names, store.addresses)
+    exact_positions = exact_index.lookup(ocr_df["OCR Name"], ocr_df["OCR Address"])
+
+    results = [
+        (store[position].name, store[position].address, 100.0)
+        if position >= 0
+        else None
+        for position in exact_positions
+    ]
+    residual_rows = np.flatnonzero(exact_positions < 0)
+    logger.info(
+        f"Exact matches: {len(ocr_df) - len(residual_rows)}, "
+        f"rows left for fuzzy matching: {len(residual_rows)}"
+    )
+
+    ocr_names = ocr_df["OCR Name"].tolist()
+    ocr_addresses = ocr_df["OCR Address"].tolist()
+    ocr_wards = ocr_df["OCR Ward"].tolist() if "OCR Ward" in ocr_df.columns else None
+
+    # Answer rows matched before from the cache, and match the rest
+    if match_cache is not None:
+        cache_configs = [
+            _match_cache_config(
+                scorer_cascade,
+                threshold,
+                joint=joint,
+                process_pool=process_pool is not None,
+                blocking_index=blocking_index,
+                street_index=street_index,
+                tfidf_index=tfidf_index,
+                ocr_ward=(
+                    normalize_ward(ocr_wards[row])
+                    if ward_index is not None and ocr_wards is not None
+                    else None
+                ),
+            )
+            for row in range(len(ocr_df))
+        ]
+        cached_results = match_cache.get_many(
+            [ocr_names[row] for row in residual_rows],
+            [ocr_addresses[row] for row in residual_rows],
+            [cache_configs[row] for row in residual_rows],
+        )
+        for row, cached in zip(residual_rows, cached_results):
+            if cached is not None:
+                results[row] = cached[0][:3]
+        residual_rows = np.array(
+            [row for row in residual_rows if results[row] is None], dtype=np.int64
+        )
+        logger.info(
+            f"Cached matches: {sum(r is not None for r in cached_results)}, "
+            f"rows left for fuzzy matching: {len(residual_rows)}"
+        )
+
     # Process in batches for better memory management
     batch_size = 1000
-    results = []
 
-    for batch_start in tqdm(range(0, len(ocr_df), batch_size)):
-        batch = ocr_df.iloc[batch_start : batch_start + batch_size]
+    for batch_start in tqdm(range(0, len(residual_rows), batch_size)):
+        batch_rows = residual_rows[batch_start : batch_start + batch_size]
+        batch_names = [ocr_names[row] for row in batch_rows]
+        batch_addresses = [ocr_addresses[row] for row in batch_rows]
         logger.info(
-            f"Processing batch {batch_start // batch_size + 1}, rows {batch_start} to {min(batch_start + batch_size, len(ocr_df))}"
+            f"Processing batch {batch_start // batch_size + 1}, rows {batch_start} to {batch_start + len(batch_rows)} of {len(residual_rows)}"
+        )
+
+        # Score the whole batch against the voter roll at once
+        batch_results = get_matched_name_address_batch(
+            batch_names,
+            batch_addresses,
+            store,
+            blocking_index=blocking_index,
+            fallback_threshold=threshold,
+            joint=joint,
+            street_index=street_index,
+            ward_index=ward_index,
+            ocr_wards=(
+                [ocr_wards[row] for row in batch_rows]
+                if ocr_wards is not None
+                else None
+            ),
+            tfidf_index=tfidf_index,
+            scorer_cascade=scorer_cascade,
+            process_pool=process_pool,
         )
 
-        # Process batch in parallel
-        with ThreadPoolExecutor() as executor:
-            batch_results = list(
-                executor.map(
-                    lambda row: get_matched_name_address(
-                        row["OCR Name"], row["OCR Address"], select_voter_records
-                    ),
-                    [row for _, row in batch.iterrows()],
-                )
+        if match_cache is not None:
+            match_cache.set_many(
+                batch_names,
+                batch_addresses,
+                [cache_configs[row] for row in batch_rows],
+                batch_results,
             )
 
         # Extract best matches
         batch_matches = [(res[0][0], res[0][1], res[0][2]) for res in batch_results]
-        results.extend(batch_matches)
+        for row, match in zip(batch_rows, batch_matches):
+            results[row] = match
 
         # Log batch statistics
         batch_scores = [match[2] for match in batch_matches]
@@ -222,8 +956,8 @@ def create_ocr_matched_df(
 
         if st_bar:
             st_bar.progress(
-                batch_start / len(ocr_df),
-                text=f"Processing batch {batch_start} out of {len(ocr_df) // batch_size + 1} batches",
+                batch_start / len(residual_rows),
+                text=f"Processing batch {batch_start} out of {len(residual_rows) // batch_size + 1} batches",
             )
 
     logger.info("Creating final DataFrame")
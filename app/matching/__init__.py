@@ -0,0 +1,59 @@
+from .blocking import BlockingIndex, soundex
+from .cascade import PREFILTER_SCORERS, SCORERS, ScorerCascade
+from .exact import ExactMatchIndex, normalize_match_text
+from .funnel import (
+    combine_name_address_matches,
+    match_name_and_address_joint_batch,
+    match_name_then_address_batch,
+    match_name_then_address_candidates_batch,
+)
+from .match_cache import DEFAULT_MATCH_CACHE_PATH, MatchCache, normalize_cache_text
+from .packed import PackedStrings
+from .process_pool import ProcessPoolMatcher
+from .scoring import rank_top_k, top_k_matches
+from .store import VoterRecordView, VoterStringStore
+from .streets import StreetIndex, ocr_street
+from .tfidf import TFIDF_FIELDS, TfidfCandidateIndex
+from .voter_index import (
+    DEFAULT_INDEX_DIRECTORY,
+    VoterMatchIndex,
+    hash_voter_file,
+    hash_voter_records,
+    voter_index_path,
+)
+from .wards import WARD_COLUMN, WardIndex, normalize_ward
+
+__all__ = [
+    "PREFILTER_SCORERS",
+    "SCORERS",
+    "TFIDF_FIELDS",
+    "DEFAULT_INDEX_DIRECTORY",
+    "DEFAULT_MATCH_CACHE_PATH",
+    "WARD_COLUMN",
+    "BlockingIndex",
+    "ExactMatchIndex",
+    "MatchCache",
+    "PackedStrings",
+    "ProcessPoolMatcher",
+    "ScorerCascade",
+    "StreetIndex",
+    "TfidfCandidateIndex",
+    "VoterMatchIndex",
+    "VoterRecordView",
+    "VoterStringStore",
+    "WardIndex",
+    "combine_name_address_matches",
+    "hash_voter_file",
+    "hash_voter_records",
+    "match_name_and_address_joint_batch",
+    "match_name_then_address_batch",
+    "match_name_then_address_candidates_batch",
+    "normalize_cache_text",
+    "normalize_match_text",
+    "normalize_ward",
+    "ocr_street",
+    "soundex",
+    "rank_top_k",
+    "top_k_matches",
+    "voter_index_path",
+]
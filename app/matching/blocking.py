@@ -0,0 +1,214 @@
+import re
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from utils import logger
+
+# American Soundex digit for each consonant; vowels and Y separate runs,
+# H and W are skipped entirely.
+_SOUNDEX_CODES = {
+    letter: digit
+    for letters, digit in (
+        ("BFPV", "1"),
+        ("CGJKQSXZ", "2"),
+        ("DT", "3"),
+        ("L", "4"),
+        ("MN", "5"),
+        ("R", "6"),
+    )
+    for letter in letters
+}
+
+_NON_LETTERS = re.compile(r"[^A-Z]")
+
+
+def soundex(name: str) -> str:
+    """
+    Computes the four character American Soundex code of a name.
+
+    Args:
+        name (str): The name to encode.
+
+    Returns:
+        str: The Soundex code, e.g. "R163" for "Robert", or "" for names without letters.
+    """
+    letters = _NON_LETTERS.sub("", name.upper())
+    if not letters:
+        return ""
+
+    digits = []
+    previous = _SOUNDEX_CODES.get(letters[0])
+    for letter in letters[1:]:
+        if letter in "HW":
+            continue
+        digit = _SOUNDEX_CODES.get(letter)
+        if digit is not None and digit != previous:
+            digits.append(digit)
+        previous = digit
+
+    return (letters[0] + "".join(digits) + "000")[:4]
+
+
+def split_full_name(full_name: str) -> Tuple[str, str]:
+    """
+    Splits a full name into normalized first and last name tokens.
+
+    Args:
+        full_name (str): A name in "First Last" order.
+
+    Returns:
+        Tuple[str, str]: Upper case first and last name with non-letters removed.
+    """
+    tokens = [_NON_LETTERS.sub("", token) for token in full_name.upper().split()]
+    tokens = [token for token in tokens if token]
+    if not tokens:
+        return "", ""
+    return tokens[0], tokens[-1]
+
+
+def name_trigrams(first: str, last: str) -> List[str]:
+    """
+    Returns the distinct character trigrams of a first and last name, each name
+    padded with "_" so that its first and last letters start and end a trigram.
+
+    Args:
+        first (str): Normalized first name, see `split_full_name`.
+        last (str): Normalized last name.
+
+    Returns:
+        List[str]: The trigrams, e.g. "_AN", "ANN", "NN_" for "Ann".
+    """
+    trigrams = []
+    for token in dict.fromkeys([first, last]):
+        padded = f"_{token}_"
+        trigrams.extend(padded[i : i + 3] for i in range(len(padded) - 2))
+    return list(dict.fromkeys(trigrams))
+
+
+def blocking_keys(full_name: str) -> List[str]:
+    """
+    Returns the blocking keys of a name: the Soundex code of the last name, then the
+    character trigrams of the first and last names.
+
+    Args:
+        full_name (str): A name in "First Last" order.
+
+    Returns:
+        List[str]: The blocking keys of the name.
+    """
+    first, last = split_full_name(full_name)
+    if not last:
+        return []
+    return [f"S:{soundex(last)}"] + [
+        f"T:{trigram}" for trigram in name_trigrams(first, last)
+    ]
+
+
+def voter_blocking_keys(full_names: pd.Series) -> List[pd.Series]:
+    """
+    Computes the blocking keys of every voter, one Series per key type.
+
+    Args:
+        full_names (pd.Series): The voter full names.
+
+    Returns:
+        List[pd.Series]: The Soundex key of each voter, and its trigram keys joined
+            by spaces.
+    """
+    # Compute keys once per distinct name, then spread them back to the rows
+    unique_names = pd.unique(full_names)
+    keys_by_name = {name: blocking_keys(name) for name in unique_names}
+    soundex_keys = {
+        name: keys[0] if keys else "" for name, keys in keys_by_name.items()
+    }
+    trigram_keys = {name: " ".join(keys[1:]) for name, keys in keys_by_name.items()}
+    return [full_names.map(soundex_keys), full_names.map(trigram_keys)]
+
+
+class BlockingIndex:
+    """
+    Candidate index mapping name blocking keys to voter row positions, so that fuzzy
+    scoring only has to run on voters with the same last name Soundex code as the
+    OCR name, or sharing at least `min_shared_trigrams` of its character trigrams.
+    """
+
+    def __init__(
+        self,
+        buckets: Dict[str, np.ndarray],
+        n_records: int,
+        min_shared_trigrams: int = 3,
+    ):
+        self.buckets = buckets
+        self.n_records = n_records
+        self.min_shared_trigrams = min_shared_trigrams
+
+    @classmethod
+    def from_select_voter_records(
+        cls, select_voter_records: pd.DataFrame
+    ) -> "BlockingIndex":
+        """
+        Builds the index from the output of `create_select_voter_records`.
+
+        Args:
+            select_voter_records (pd.DataFrame): DataFrame with a 'Full Name' column.
+
+        Returns:
+            BlockingIndex: The blocking index over the voter rows.
+        """
+        return cls.from_key_columns(
+            voter_blocking_keys(select_voter_records["Full Name"])
+        )
+
+    @classmethod
+    def from_key_columns(cls, key_columns: List[Sequence[str]]) -> "BlockingIndex":
+        """
+        Builds the index from precomputed per-voter keys, see `voter_blocking_keys`.
+
+        Args:
+            key_columns (List[Sequence[str]]): One sequence of keys per key type, each
+                aligned with the voter rows. A voter may have several keys of a type,
+                joined by spaces. Empty keys are ignored.
+
+        Returns:
+            BlockingIndex: The blocking index over the voter rows.
+        """
+        buckets = {}
+        for column in key_columns:
+            keys = pd.Series(column, dtype=object).reset_index(drop=True)
+            keys = keys.str.split().explode()
+            keys = keys[keys.notna()]
+            rows = keys.index.to_numpy(dtype=np.int64)
+            for key, positions in keys.groupby(keys.to_numpy()).indices.items():
+                buckets[key] = rows[positions]
+
+        n_records = len(key_columns[0]) if key_columns else 0
+        logger.info(
+            f"Built blocking index with {len(buckets)} buckets over {n_records} voters"
+        )
+        return cls(buckets, n_records)
+
+    def candidates(self, ocr_name: str) -> np.ndarray:
+        """
+        Returns the voter row positions with the Soundex key of the OCR name, or
+        sharing at least `min_shared_trigrams` of its trigrams.
+
+        Args:
+            ocr_name (str): The OCR result for the name.
+
+        Returns:
+            np.ndarray: Sorted, unique row positions into the voter records.
+        """
+        keys = blocking_keys(ocr_name)
+        if not keys:
+            return np.empty(0, dtype=np.int64)
+        rows = [self.buckets.get(keys[0], np.empty(0, dtype=np.int64))]
+
+        trigram_rows = [self.buckets[key] for key in keys[1:] if key in self.buckets]
+        if trigram_rows:
+            # Names shorter than the threshold only need to share all their trigrams
+            min_shared = min(self.min_shared_trigrams, len(keys) - 1)
+            shared = np.bincount(np.concatenate(trigram_rows), minlength=self.n_records)
+            rows.append(np.flatnonzero(shared >= min_shared))
+        return np.unique(np.concatenate(rows))
@@ -0,0 +1,172 @@
+from typing import Callable, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+from rapidfuzz import fuzz, process, utils
+from rapidfuzz.distance import Indel, JaroWinkler, Prefix
+
+from utils import logger
+
+from .scoring import rank_top_k, top_k_matches
+
+# Cheap metrics used to shortlist candidates. They only rank voters, so their scale
+# does not matter; they run on lower-cased strings without punctuation.
+PREFILTER_SCORERS: Dict[str, Callable] = {
+    "indel": Indel.normalized_similarity,
+    "jaro_winkler": JaroWinkler.normalized_similarity,
+    "prefix": Prefix.normalized_similarity,
+}
+
+# Final scorers, on the 0-100 scale the match threshold is expressed in
+SCORERS: Dict[str, Callable] = {
+    "ratio": fuzz.ratio,
+    "partial_ratio": fuzz.partial_ratio,
+    "token_sort_ratio": fuzz.token_sort_ratio,
+    "token_set_ratio": fuzz.token_set_ratio,
+    "WRatio": fuzz.WRatio,
+    "QRatio": fuzz.QRatio,
+}
+
+
+def _registered_name(registry: Dict[str, Callable], scorer: Callable) -> str:
+    for name, registered in registry.items():
+        if registered is scorer:
+            return name
+    return f"{scorer.__module__}.{scorer.__qualname__}"
+
+
+def _unpickle_cascade(scorer, prefilter, prefilter_limit: int) -> "ScorerCascade":
+    return ScorerCascade(
+        SCORERS.get(scorer, scorer),
+        PREFILTER_SCORERS.get(prefilter, prefilter),
+        prefilter_limit,
+    )
+
+
+class ScorerCascade:
+    """
+    Two-stage scorer: a cheap prefilter metric shortlists the best candidates of
+    every query, and the final scorer only runs on that shortlist. Without a
+    prefilter every choice is scored with the final scorer.
+    """
+
+    def __init__(
+        self,
+        scorer: Callable = fuzz.ratio,
+        prefilter: Optional[Callable] = None,
+        prefilter_limit: int = 300,
+    ):
+        self.scorer = scorer
+        self.prefilter = prefilter
+        self.prefilter_limit = prefilter_limit
+
+    @classmethod
+    def from_config(cls, matching_config) -> "ScorerCascade":
+        """
+        Builds the cascade from the `[matching]` section of the settings file.
+
+        Args:
+            matching_config (MatchingConfig): The matching settings, with
+                `prefilter_scorer`, `prefilter_limit` and `scorer`.
+
+        Returns:
+            ScorerCascade: The configured cascade.
+
+        Raises:
+            ValueError: If a scorer name is unknown.
+        """
+        if matching_config.scorer not in SCORERS:
+            raise ValueError(
+                f"Unknown scorer {matching_config.scorer}. "
+                f"Choose one of {', '.join(SCORERS)}."
+            )
+        prefilter = None
+        if matching_config.prefilter_scorer != "none":
+            if matching_config.prefilter_scorer not in PREFILTER_SCORERS:
+                raise ValueError(
+                    f"Unknown prefilter scorer {matching_config.prefilter_scorer}. "
+                    f"Choose one of none, {', '.join(PREFILTER_SCORERS)}."
+                )
+            prefilter = PREFILTER_SCORERS[matching_config.prefilter_scorer]
+
+        logger.info(
+            f"Matching with scorer {matching_config.scorer}, prefilter "
+            f"{matching_config.prefilter_scorer} "
+            f"keeping {matching_config.prefilter_limit} candidates"
+        )
+        return cls(
+            SCORERS[matching_config.scorer],
+            prefilter,
+            matching_config.prefilter_limit,
+        )
+
+    def __reduce__(self):
+        # The rapidfuzz metrics do not pickle, so registered scorers are sent to
+        # process pool workers by name
+        scorer, prefilter = self.scorer, self.prefilter
+        if scorer in SCORERS.values():
+            scorer = _registered_name(SCORERS, scorer)
+        if prefilter in PREFILTER_SCORERS.values():
+            prefilter = _registered_name(PREFILTER_SCORERS, prefilter)
+        return _unpickle_cascade, (scorer, prefilter, self.prefilter_limit)
+
+    @property
+    def config_key(self) -> str:
+        """
+        Identifies the scorers and the shortlist size, for caching match results.
+
+        Returns:
+            str: e.g. "jaro_winkler:300>WRatio", or "ratio" without a prefilter.
+        """
+        scorer = _registered_name(SCORERS, self.scorer)
+        if self.prefilter is None:
+            return scorer
+        prefilter = _registered_name(PREFILTER_SCORERS, self.prefilter)
+        return f"{prefilter}:{self.prefilter_limit}>{scorer}"
+
+    def top_k(
+        self,
+        queries: Sequence[str],
+        choices: Sequence[str],
+        limit: int = 10,
+        workers: int = -1,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Finds the top matches of every query with the final scorer, among the
+        prefilter shortlist.
+
+        Args:
+            queries (Sequence[str]): The OCR strings to match.
+            choices (Sequence[str]): The strings to compare against.
+            limit (int): The number of top matches to return per query.
+            workers (int): Number of threads used by rapidfuzz. -1 uses all cores.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Indices into ``choices`` and final scores,
+                both of shape (len(queries), limit), best match first.
+        """
+        if self.prefilter is None or self.prefilter_limit >= len(choices):
+            return top_k_matches(
+                queries, choices, scorer=self.scorer, limit=limit, workers=workers
+            )
+
+        shortlist_size = max(self.prefilter_limit, limit)
+        shortlist, _ = top_k_matches(
+            queries,
+            choices,
+            scorer=self.prefilter,
+            limit=shortlist_size,
+            workers=workers,
+            processor=utils.default_process,
+        )
+
+        # Final scores for the shortlisted pairs only
+        choices = np.asarray(choices, dtype=object)
+        final_scores = process.cpdist(
+            np.repeat(np.asarray(queries, dtype=object), shortlist_size),
+            choices[shortlist].ravel(),
+            scorer=self.scorer,
+            dtype=np.float64,
+            workers=workers,
+        ).reshape(shortlist.shape)
+        positions, scores = rank_top_k(final_scores, limit)
+        return np.take_along_axis(shortlist, positions, axis=1), scores
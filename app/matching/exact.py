@@ -0,0 +1,136 @@
+from typing import Iterable, Sequence
+
+import numpy as np
+import pandas as pd
+
+from utils import logger
+
+
+def normalize_match_text(values: Iterable[str]) -> pd.Series:
+    """
+    Normalizes names or addresses for exact comparison: upper case, punctuation
+    replaced by spaces, and runs of whitespace collapsed.
+
+    Args:
+        values (Iterable[str]): The strings to normalize.
+
+    Returns:
+        pd.Series: The normalized strings.
+    """
+    return (
+        pd.Series(values, dtype=object)
+        .fillna("")
+        .astype(str)
+        .str.upper()
+        .str.replace(r"[^A-Z0-9]+", " ", regex=True)
+        .str.strip()
+    )
+
+
+def _hash_keys(names: pd.Series, addresses: pd.Series) -> np.ndarray:
+    # Stable across processes, unlike hash(), so the hashes can be saved
+    return pd.util.hash_array((names + "\x1f" + addresses).to_numpy(dtype=object))
+
+
+class ExactMatchIndex:
+    """
+    Hash index from normalized (full name, full address) pairs to the first voter row
+    with that pair. Used to resolve clean OCR rows before any fuzzy scoring.
+
+    The pairs are kept as sorted 64-bit hashes with their voter rows, so the index
+    can be saved in a `VoterMatchIndex` and searched in the mapped file. A found row
+    is confirmed against the voter strings, so a hash collision never yields a
+    wrong match.
+    """
+
+    def __init__(
+        self,
+        hashes: np.ndarray,
+        rows: np.ndarray,
+        full_names: Sequence[str],
+        full_addresses: Sequence[str],
+    ):
+        self.hashes = hashes
+        self.rows = rows
+        self.full_names = full_names
+        self.full_addresses = full_addresses
+
+    @classmethod
+    def from_select_voter_records(
+        cls, select_voter_records: pd.DataFrame
+    ) -> "ExactMatchIndex":
+        """
+        Builds the index from the output of `create_select_voter_records`.
+
+        Args:
+            select_voter_records (pd.DataFrame): DataFrame with 'Full Name' and
+                'Full Address' columns.
+
+        Returns:
+            ExactMatchIndex: The exact match index over the voter rows.
+        """
+        return cls.from_strings(
+            select_voter_records["Full Name"].values,
+            select_voter_records["Full Address"].values,
+        )
+
+    @classmethod
+    def from_strings(
+        cls, full_names: Iterable[str], full_addresses: Iterable[str]
+    ) -> "ExactMatchIndex":
+        """
+        Builds the index from aligned voter full names and addresses.
+
+        Args:
+            full_names (Iterable[str]): The voter full names.
+            full_addresses (Iterable[str]): The voter full addresses.
+
+        Returns:
+            ExactMatchIndex: The exact match index over the voter rows.
+        """
+        full_names = np.asarray(full_names, dtype=object)
+        full_addresses = np.asarray(full_addresses, dtype=object)
+        hashes = _hash_keys(
+            normalize_match_text(full_names), normalize_match_text(full_addresses)
+        )
+        # The first voter row of every key, in hash order
+        hashes, rows = np.unique(hashes, return_index=True)
+
+        logger.info(f"Built exact match index with {len(hashes)} keys")
+        return cls(hashes, rows.astype(np.int64), full_names, full_addresses)
+
+    def lookup(
+        self, ocr_names: Iterable[str], ocr_addresses: Iterable[str]
+    ) -> np.ndarray:
+        """
+        Finds the voter row of every OCR name and address pair that matches exactly
+        after normalization.
+
+        Args:
+            ocr_names (Iterable[str]): The OCR results for the names.
+            ocr_addresses (Iterable[str]): The OCR results for the addresses.
+
+        Returns:
+            np.ndarray: Voter row positions, -1 where there is no exact match.
+        """
+        names = normalize_match_text(ocr_names)
+        addresses = normalize_match_text(ocr_addresses)
+        positions = np.full(len(names), -1, dtype=np.int64)
+        if len(self.hashes) == 0:
+            return positions
+
+        hashes = _hash_keys(names, addresses)
+        found = np.minimum(np.searchsorted(self.hashes, hashes), len(self.hashes) - 1)
+        hits = np.flatnonzero(self.hashes[found] == hashes)
+        rows = self.rows[found[hits]]
+
+        # Confirm the hits against the normalized voter strings
+        confirmed = (
+            normalize_match_text(self.full_names[rows]).to_numpy()
+            == names.to_numpy()[hits]
+        ) & (
+            normalize_match_text(self.full_addresses[rows]).to_numpy()
+            == addresses.to_numpy()[hits]
+        )
+        positions[hits[confirmed]] = rows[confirmed]
+        return positions
@@ -0,0 +1,307 @@
+from typing import Callable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from rapidfuzz import fuzz, process
+
+from .cascade import ScorerCascade
+from .scoring import rank_top_k, top_k_matches
+
+
+def combine_name_address_matches(
+    name_matches: List[Tuple[str, int, int]],
+    address_matches: List[Tuple[str, int, int]],
+) -> List[Tuple[str, str, float, int]]:
+    """
+    Combines name and address matches into harmonic mean scored results.
+
+    Args:
+        name_matches (List[Tuple[str, int, int]]): The top name matches.
+        address_matches (List[Tuple[str, int, int]]): The address matches among the top names.
+
+    Returns:
+        List[Tuple[str, str, float, int]]: The list of top matches with their scores and indices.
+    """
+    matched_indices = [x[2] for x in name_matches]
+
+    # Calculate harmonic means
+    name_scores = np.array([x[1] for x in name_matches])
+    addr_scores = np.array([x[1] for x in address_matches])
+    harmonic_means = 2 * name_scores * addr_scores / (name_scores + addr_scores)
+
+    # Create and sort results
+    results = list(
+        zip(
+            [x[0] for x in name_matches],
+            [x[0] for x in address_matches],
+            harmonic_means,
+            matched_indices,
+        )
+    )
+    return sorted(results, key=lambda x: x[2], reverse=True)
+
+
+def match_name_then_address_batch(
+    ocr_names: Sequence[str],
+    ocr_addresses: Sequence[str],
+    voter_names: np.ndarray,
+    voter_addresses: np.ndarray,
+    limit: int = 10,
+    workers: int = -1,
+    unique_names: Optional[Tuple[np.ndarray, np.ndarray]] = None,
+    cascade: Optional[ScorerCascade] = None,
+) -> List[List[Tuple[str, str, float, int]]]:
+    """
+    Scores the top name matches of every OCR row, then the addresses of those matches.
+
+    Args:
+        ocr_names (Sequence[str]): The OCR results for the names.
+        ocr_addresses (Sequence[str]): The OCR results for the addresses.
+        voter_names (np.ndarray): The voter full names.
+        voter_addresses (np.ndarray): The voter full addresses, aligned with the names.
+        limit (int): The number of top name matches to consider per row.
+        workers (int): Number of threads used by rapidfuzz. -1 uses all cores.
+        unique_names (Tuple[np.ndarray, np.ndarray]): Optional distinct voter names and
+            the position of each voter's name among them, see
+            `VoterStringStore.unique_names`. Each distinct name is then scored once.
+        cascade (ScorerCascade): Optional two-stage scorer used instead of
+            `fuzz.ratio` for both the names and the addresses.
+
+    Returns:
+        List[List[Tuple[str, str, float, int]]]: The top matches for every row.
+    """
+    # Get name matches for the whole batch
+    if cascade is not None:
+        name_indices, name_scores = cascade.top_k(
+            list(ocr_names), voter_names, limit=limit, workers=workers
+        )
+    else:
+        if unique_names is None:
+            name_choices, name_inverse = voter_names, None
+        else:
+            name_choices, name_inverse = unique_names
+        name_indices, name_scores = top_k_matches(
+            list(ocr_names),
+            name_choices,
+            scorer=fuzz.ratio,
+            limit=limit,
+            workers=workers,
+            choice_inverse=name_inverse,
+        )
+
+    return _match_addresses_of_top_names(
+        ocr_addresses,
+        voter_names,
+        voter_addresses,
+        name_indices,
+        name_scores,
+        workers,
+        scorer=fuzz.ratio if cascade is None else cascade.scorer,
+    )
+
+
+def match_name_then_address_candidates_batch(
+    ocr_names: Sequence[str],
+    ocr_addresses: Sequence[str],
+    voter_names: np.ndarray,
+    voter_addresses: np.ndarray,
+    name_candidates: np.ndarray,
+    limit: int = 10,
+    workers: int = -1,
+    scorer: Callable = fuzz.ratio,
+) -> List[List[Tuple[str, str, float, int]]]:
+    """
+    Name-first matching restricted to precomputed name candidates, e.g. from a
+    `TfidfCandidateIndex`. The candidates are scored with `scorer` and the top
+    name matches among them go through the same address stage as
+    `match_name_then_address_batch`. Rows with fewer than `limit` candidates are
+    scored against every voter.
+
+    Args:
+        ocr_names (Sequence[str]): The OCR results for the names.
+        ocr_addresses (Sequence[str]): The OCR results for the addresses.
+        voter_names (np.ndarray): The voter full names.
+        voter_addresses (np.ndarray): The voter full addresses, aligned with the names.
+        name_candidates (np.ndarray): Voter positions of shape (len(ocr_names), C),
+            padded with -1.
+        limit (int): The number of top name matches to consider per row.
+        workers (int): Number of threads used by rapidfuzz. -1 uses all cores.
+        scorer (Callable): The scorer for the names and the addresses.
+
+    Returns:
+        List[List[Tuple[str, str, float, int]]]: The top matches for every row.
+    """
+    ocr_names = np.asarray(ocr_names, dtype=object)
+    if name_candidates.shape[1] < limit:
+        # Fewer candidates than top matches: every row is scored against all voters
+        name_candidates = np.pad(
+            name_candidates,
+            ((0, 0), (0, limit - name_candidates.shape[1])),
+            constant_values=-1,
+        )
+    n_candidates = name_candidates.shape[1]
+    padding = name_candidates < 0
+
+    # Padded entries can never be selected over a real candidate
+    candidate_scores = process.cpdist(
+        np.repeat(ocr_names, n_candidates),
+        voter_names[np.where(padding, 0, name_candidates)].ravel(),
+        scorer=scorer,
+        dtype=np.float64,
+        workers=workers,
+    ).reshape(name_candidates.shape)
+    candidate_scores[padding] = -np.inf
+
+    positions, name_scores = rank_top_k(candidate_scores, limit)
+    name_indices = np.take_along_axis(name_candidates, positions, axis=1)
+
+    short_rows = np.flatnonzero((~padding).sum(axis=1) < limit)
+    if len(short_rows):
+        name_indices[short_rows], name_scores[short_rows] = top_k_matches(
+            list(ocr_names[short_rows]),
+            voter_names,
+            scorer=scorer,
+            limit=limit,
+            workers=workers,
+        )
+
+    return _match_addresses_of_top_names(
+        ocr_addresses,
+        voter_names,
+        voter_addresses,
+        name_indices,
+        name_scores,
+        workers,
+        scorer=scorer,
+    )
+
+
+def _match_addresses_of_top_names(
+    ocr_addresses: Sequence[str],
+    voter_names: np.ndarray,
+    voter_addresses: np.ndarray,
+    name_indices: np.ndarray,
+    name_scores: np.ndarray,
+    workers: int,
+    scorer: Callable = fuzz.ratio,
+) -> List[List[Tuple[str, str, float, int]]]:
+    # Score each row's address against the addresses of its top name matches
+    limit = name_indices.shape[1]
+    candidate_addresses = voter_addresses[name_indices]
+    pair_scores = process.cpdist(
+        np.repeat(np.asarray(ocr_addresses, dtype=object), limit),
+        candidate_addresses.ravel(),
+        scorer=scorer,
+        dtype=np.float64,
+        workers=workers,
+    ).reshape(name_indices.shape)
+    address_positions, address_scores = rank_top_k(pair_scores, limit)
+
+    batch_results = []
+    for row in range(len(name_indices)):
+        name_matches = [
+            (voter_names[i], score, i)
+            for i, score in zip(name_indices[row], name_scores[row])
+        ]
+        address_matches = [
+            (candidate_addresses[row, i], score, i)
+            for i, score in zip(address_positions[row], address_scores[row])
+        ]
+        batch_results.append(
+            combine_name_address_matches(name_matches, address_matches)
+        )
+
+    return batch_results
+
+
+def match_name_and_address_joint_batch(
+    ocr_names: Sequence[str],
+    ocr_addresses: Sequence[str],
+    voter_names: np.ndarray,
+    voter_addresses: np.ndarray,
+    limit: int = 10,
+    workers: int = -1,
+    unique_names: Optional[Tuple[np.ndarray, np.ndarray]] = None,
+    unique_addresses: Optional[Tuple[np.ndarray, np.ndarray]] = None,
+) -> List[List[Tuple[str, str, float, int]]]:
+    """
+    Joint candidate generation: the top name matches and the top address matches of
+    every OCR row are unioned, and both scores are computed for every voter in the
+    union. Unlike `match_name_then_address_batch`, a badly read name can still be
+    rescued by its address, and the harmonic mean pairs the name and address of the
+    same voter.
+
+    Args:
+        ocr_names (Sequence[str]): The OCR results for the names.
+        ocr_addresses (Sequence[str]): The OCR results for the addresses.
+        voter_names (np.ndarray): The voter full names.
+        voter_addresses (np.ndarray): The voter full addresses, aligned with the names.
+        limit (int): The number of candidates taken from each of the name and address
+            rankings, and the number of matches returned per row.
+        workers (int): Number of threads used by rapidfuzz. -1 uses all cores.
+        unique_names (Tuple[np.ndarray, np.ndarray]): Optional distinct voter names
+            with their inverse, see `VoterStringStore.unique_names`.
+        unique_addresses (Tuple[np.ndarray, np.ndarray]): Optional distinct voter
+            addresses with their inverse, see `VoterStringStore.unique_addresses`.
+
+    Returns:
+        List[List[Tuple[str, str, float, int]]]: The top matches for every row, with
+            the voter name, address, harmonic mean score and position.
+    """
+    ocr_names = np.asarray(ocr_names, dtype=object)
+    ocr_addresses = np.asarray(ocr_addresses, dtype=object)
+
+    # Top candidates by name and by address, side by side
+    candidate_sets = []
+    for queries, voter_strings, unique in (
+        (ocr_names, voter_names, unique_names),
+        (ocr_addresses, voter_addresses, unique_addresses),
+    ):
+        choices, inverse = (voter_strings, None) if unique is None else unique
+        indices, _ = top_k_matches(
+            list(queries),
+            choices,
+            scorer=fuzz.ratio,
+            limit=limit,
+            workers=workers,
+            choice_inverse=inverse,
+        )
+        candidate_sets.append(indices)
+    candidates = np.concatenate(candidate_sets, axis=1)
+
+    # Score the name and the address of every candidate voter
+    n_candidates = candidates.shape[1]
+    name_scores, address_scores = (
+        process.cpdist(
+            np.repeat(queries, n_candidates),
+            voter_strings[candidates].ravel(),
+            scorer=fuzz.ratio,
+            dtype=np.float64,
+            workers=workers,
+        ).reshape(candidates.shape)
+        for queries, voter_strings in (
+            (ocr_names, voter_names),
+            (ocr_addresses, voter_addresses),
+        )
+    )
+    total = name_scores + address_scores
+    harmonic_means = np.divide(
+        2 * name_scores * address_scores,
+        total,
+        out=np.zeros_like(total),
+        where=total > 0,
+    )
+
+    batch_results = []
+    for row in range(len(candidates)):
+        # Drop voters found by both rankings, best score first, ties by position
+        positions, first = np.unique(candidates[row], return_index=True)
+        scores = harmonic_means[row, first]
+        order = np.lexsort((positions, -scores))[:limit]
+        batch_results.append(
+            [
+                (voter_names[i], voter_addresses[i], score, i)
+                for i, score in zip(positions[order], scores[order])
+            ]
+        )
+
+    return batch_results
@@ -0,0 +1,155 @@
+import hashlib
+import json
+import os
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from utils import SqliteLruCache, logger
+
+DEFAULT_MATCH_CACHE_PATH = os.path.join("temp", "match_cache.sqlite")
+
+# Opened cache files by path, so their memory tier outlives a single run
+_open_caches: Dict[str, SqliteLruCache] = {}
+
+
+def normalize_cache_text(text) -> str:
+    """
+    Normalizes an OCR name or address for the match cache keys: surrounding
+    whitespace removed and inner runs of whitespace collapsed to one space. Only the
+    keys are normalized; rows are matched on their text as read.
+
+    Args:
+        text: The OCR result. Missing values become "".
+
+    Returns:
+        str: The normalized text.
+    """
+    if not isinstance(text, str):
+        return ""
+    return " ".join(text.split())
+
+
+class MatchCache:
+    """
+    Memoized match results of one voter roll. Entries are keyed by the OCR name and
+    address, normalized with `normalize_cache_text`, the content hash of the roll and the matching
+    configuration, so a different roll or scorer never reads stale results.
+    """
+
+    def __init__(self, cache: SqliteLruCache, roll_hash: str):
+        self.cache = cache
+        self.roll_hash = roll_hash
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_config(
+        cls,
+        matching_config,
+        roll_hash: str,
+        path: str = DEFAULT_MATCH_CACHE_PATH,
+    ) -> Optional["MatchCache"]:
+        """
+        Opens the match cache sized in the `[matching]` section of the settings file.
+
+        Args:
+            matching_config (MatchingConfig): The matching settings, with
+                `cache_size_mb`.
+            roll_hash (str): Content hash of the voter roll being matched.
+            path (str): Path of the SQLite cache file.
+
+        Returns:
+            Optional[MatchCache]: The cache, or None when `cache_size_mb` is 0.
+        """
+        if matching_config.cache_size_mb <= 0:
+            return None
+        if path not in _open_caches:
+            _open_caches[path] = SqliteLruCache(path)
+        cache = _open_caches[path]
+        cache.max_bytes = matching_config.cache_size_mb * 1024 * 1024
+        return cls(cache, roll_hash)
+
+    def key(self, ocr_name: str, ocr_address: str, config: str) -> str:
+        """
+        Computes the cache key of one OCR row, from its name and address with their
+        whitespace normalized.
+
+        Args:
+            ocr_name (str): The OCR name.
+            ocr_address (str): The OCR address.
+            config (str): Description of everything else the result depends on,
+                e.g. the scorer and the candidate indexes.
+
+        Returns:
+            str: Hex SHA-256 digest of the inputs.
+        """
+        payload = json.dumps(
+            [
+                normalize_cache_text(ocr_name),
+                normalize_cache_text(ocr_address),
+                self.roll_hash,
+                config,
+            ]
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get_many(
+        self,
+        ocr_names: Sequence[str],
+        ocr_addresses: Sequence[str],
+        configs: Sequence[str],
+    ) -> List[Optional[List[Tuple[str, str, float, int]]]]:
+        """
+        Looks up the match results of a batch of OCR rows.
+
+        Args:
+            ocr_names (Sequence[str]): The OCR names.
+            ocr_addresses (Sequence[str]): The OCR addresses.
+            configs (Sequence[str]): The matching configuration of every row.
+
+        Returns:
+            List[Optional[List[Tuple[str, str, float, int]]]]: The cached top
+                matches of every row, or None where the row is not cached.
+        """
+        keys = [
+            self.key(name, address, config)
+            for name, address, config in zip(ocr_names, ocr_addresses, configs)
+        ]
+        found = self.cache.get_many(keys)
+        results = [
+            [tuple(match) for match in found[key]] if key in found else None
+            for key in keys
+        ]
+        hits = sum(result is not None for result in results)
+        self.hits += hits
+        self.misses += len(results) - hits
+        logger.debug(f"Match cache: {hits} hits, {len(results) - hits} misses")
+        return results
+
+    def set_many(
+        self,
+        ocr_names: Sequence[str],
+        ocr_addresses: Sequence[str],
+        configs: Sequence[str],
+        results: Sequence[List[Tuple[str, str, float, int]]],
+    ) -> None:
+        """
+        Stores the match results of a batch of OCR rows.
+
+        Args:
+            ocr_names (Sequence[str]): The OCR names.
+            ocr_addresses (Sequence[str]): The OCR addresses.
+            configs (Sequence[str]): The matching configuration of every row.
+            results (Sequence[List[Tuple[str, str, float, int]]]): The top matches
+                of every row.
+        """
+        self.cache.set_many(
+            {
+                self.key(name, address, config): [
+                    (str(match[0]), str(match[1]), float(match[2]), int(match[3]))
+                    for match in matches
+                ]
+                for name, address, config, matches in zip(
+                    ocr_names, ocr_addresses, configs, results
+                )
+            }
+        )
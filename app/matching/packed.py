@@ -0,0 +1,119 @@
+from itertools import pairwise
+from typing import Iterable, List, Union
+
+import numpy as np
+
+# Serialized layout: int64 count, int64 offsets[count + 1], UTF-8 bytes
+_HEADER_DTYPE = np.dtype("<i8")
+
+
+class PackedStrings:
+    """
+    Read-only sequence of strings stored as one contiguous UTF-8 buffer plus an
+    offsets array. The buffer can be any object supporting the buffer protocol
+    (bytes, shared memory, mmap), so many processes can read the same copy.
+
+    Strings are decoded when they are indexed: by position, by slice into a list,
+    or by an array of positions into an object array of the same shape, so the
+    matching functions can read them like the object arrays of a
+    `VoterStringStore`.
+    """
+
+    def __init__(self, offsets: np.ndarray, data):
+        self.offsets = offsets
+        self.data = memoryview(data)
+
+    @classmethod
+    def from_strings(cls, strings: Iterable[str]) -> "PackedStrings":
+        """
+        Packs strings into a new buffer.
+
+        Args:
+            strings (Iterable[str]): The strings to pack.
+
+        Returns:
+            PackedStrings: The packed strings.
+        """
+        encoded = [str(s).encode("utf-8") for s in strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=_HEADER_DTYPE)
+        np.cumsum([len(b) for b in encoded], out=offsets[1:])
+        return cls(offsets, b"".join(encoded))
+
+    @classmethod
+    def from_buffer(cls, buffer) -> "PackedStrings":
+        """
+        Opens packed strings previously serialized with `write_to`, without copying.
+
+        Args:
+            buffer: A buffer holding the serialized layout.
+
+        Returns:
+            PackedStrings: A view over the buffer.
+        """
+        count = int(np.frombuffer(buffer, dtype=_HEADER_DTYPE, count=1)[0])
+        offsets = np.frombuffer(
+            buffer,
+            dtype=_HEADER_DTYPE,
+            count=count + 1,
+            offset=_HEADER_DTYPE.itemsize,
+        )
+        start = _HEADER_DTYPE.itemsize * (count + 2)
+        return cls(offsets, memoryview(buffer)[start : start + int(offsets[-1])])
+
+    @property
+    def serialized_size(self) -> int:
+        """Number of bytes needed by `write_to`."""
+        return _HEADER_DTYPE.itemsize * (len(self.offsets) + 1) + len(self.data)
+
+    def write_to(self, buffer) -> None:
+        """
+        Serializes the count, offsets and string data into a writable buffer.
+
+        Args:
+            buffer: A writable buffer of at least `serialized_size` bytes.
+        """
+        view = memoryview(buffer)
+        header = np.frombuffer(view, dtype=_HEADER_DTYPE, count=len(self.offsets) + 1)
+        header[0] = len(self)
+        header[1:] = self.offsets
+        start = header.nbytes
+        view[start : start + len(self.data)] = self.data
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(
+        self, index: Union[int, slice, np.ndarray]
+    ) -> Union[str, List[str], np.ndarray]:
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                return [self[i] for i in range(start, stop, step)]
+            return PackedStrings(
+                self.offsets[start : stop + 1] - self.offsets[start],
+                self._bytes(start, stop),
+            ).to_list()
+        if isinstance(index, np.ndarray):
+            strings = np.empty(index.shape, dtype=object)
+            strings.ravel()[:] = [self[i] for i in index.ravel().tolist()]
+            return strings
+        return str(self._bytes(index, index + 1), "utf-8")
+
+    def _bytes(self, start: int, stop: int) -> memoryview:
+        return self.data[self.offsets[start] : self.offsets[stop]]
+
+    def to_list(self) -> List[str]:
+        """
+        Decodes all strings.
+
+        Returns:
+            List[str]: The unpacked strings.
+        """
+        text = str(self.data, "utf-8")
+        bounds = self.offsets.tolist()
+        if len(text) != len(self.data):
+            # Multi-byte characters: byte offsets are not character offsets
+            return [
+                str(self.data[start:stop], "utf-8") for start, stop in pairwise(bounds)
+            ]
+        return [text[start:stop] for start, stop in pairwise(bounds)]
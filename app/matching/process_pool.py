@@ -0,0 +1,185 @@
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+from typing import List, Optional, Self, Sequence, Tuple, Union
+
+import pandas as pd
+
+from utils import logger
+
+from .cascade import ScorerCascade
+from .funnel import match_name_and_address_joint_batch, match_name_then_address_batch
+from .packed import PackedStrings
+from .store import VoterStringStore
+from .voter_index import VoterMatchIndex
+
+# Voter roll of a worker process, read in place from the shared blocks
+_voter_store: Optional[VoterStringStore] = None
+# Kept open for the life of the worker, as the store reads their buffers
+_attached_blocks: List[SharedMemory] = []
+
+
+def _attach_shared_strings(name: str) -> PackedStrings:
+    # Workers only read the block; the parent process owns and unlinks it
+    kwargs = {"track": False} if sys.version_info >= (3, 13) else {}
+    block = SharedMemory(name=name, **kwargs)
+    _attached_blocks.append(block)
+    return PackedStrings.from_buffer(block.buf)
+
+
+def _attach_voter_roll(names_block: str, addresses_block: str) -> None:
+    global _voter_store
+    _voter_store = VoterStringStore(
+        _attach_shared_strings(names_block), _attach_shared_strings(addresses_block)
+    )
+
+
+def _open_voter_index(path: str) -> None:
+    global _voter_store
+    # The mapped sections are scored in place, and shared with the other workers
+    index = VoterMatchIndex.open(path)
+    _voter_store = VoterStringStore(index.names, index.addresses)
+
+
+def _match_chunk(
+    chunk: Tuple[List[str], List[str]],
+    limit: int,
+    joint: bool = False,
+    cascade: Optional[ScorerCascade] = None,
+) -> List[List[Tuple[str, str, float, int]]]:
+    ocr_names, ocr_addresses = chunk
+    # One rapidfuzz thread per worker process, the pool provides the parallelism.
+    # The packed strings are scored block by block, without the distinct string
+    # tables, which would decode the whole roll in every worker.
+    if joint:
+        return match_name_and_address_joint_batch(
+            ocr_names,
+            ocr_addresses,
+            _voter_store.names,
+            _voter_store.addresses,
+            limit,
+            workers=1,
+        )
+    return match_name_then_address_batch(
+        ocr_names,
+        ocr_addresses,
+        _voter_store.names,
+        _voter_store.addresses,
+        limit,
+        workers=1,
+        cascade=cascade,
+    )
+
+
+class ProcessPoolMatcher:
+    """
+    Process pool matching backend. The voter names and addresses are packed once into
+    shared memory, or read from a saved `VoterMatchIndex` file; each worker attaches to
+    them when it starts, so tasks only carry the OCR strings of a chunk of signatures
+    instead of the voter roll. Workers score the packed strings in place.
+
+    The pool runs the name-first and joint matching of the whole roll, with an
+    optional scorer cascade. `create_ocr_matched_df` sends it the full roll scans
+    and keeps the blocked, street-local and ward-local matching in process.
+
+    Use as a context manager, or call `close` to stop the workers and free the
+    shared memory.
+    """
+
+    def __init__(
+        self,
+        select_voter_records: Union[pd.DataFrame, VoterStringStore, None] = None,
+        max_workers: Optional[int] = None,
+        chunk_size: int = 64,
+        index_path: Optional[str] = None,
+    ):
+        self.chunk_size = chunk_size
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self._blocks = []
+        try:
+            if index_path is not None:
+                initializer, initargs = _open_voter_index, (index_path,)
+            else:
+                store = VoterStringStore.of(select_voter_records)
+                initializer = _attach_voter_roll
+                initargs = (self._share(store.names), self._share(store.addresses))
+            # Spawned rather than forked: the parent runs rapidfuzz thread pools
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=initializer,
+                initargs=initargs,
+            )
+        except Exception:
+            self._release_blocks()
+            raise
+
+        logger.info(f"Started process pool matcher with {self.max_workers} workers")
+
+    def _share(self, strings: Sequence[str]) -> str:
+        packed = PackedStrings.from_strings(strings)
+        block = SharedMemory(create=True, size=max(packed.serialized_size, 1))
+        self._blocks.append(block)
+        packed.write_to(block.buf)
+        return block.name
+
+    def _release_blocks(self) -> None:
+        for block in self._blocks:
+            block.close()
+            block.unlink()
+        self._blocks = []
+
+    def match(
+        self,
+        ocr_names: Sequence[str],
+        ocr_addresses: Sequence[str],
+        limit: int = 10,
+        joint: bool = False,
+        cascade: Optional[ScorerCascade] = None,
+    ) -> List[List[Tuple[str, str, float, int]]]:
+        """
+        Matches signatures against the shared voter roll across the worker processes.
+
+        Args:
+            ocr_names (Sequence[str]): The OCR results for the names.
+            ocr_addresses (Sequence[str]): The OCR results for the addresses.
+            limit (int): The number of top name matches to consider per row.
+            joint (bool): Use joint name and address candidate generation, see
+                `match_name_and_address_joint_batch`.
+            cascade (ScorerCascade): Optional two-stage scorer for the names. Not
+                used in joint mode.
+
+        Returns:
+            List[List[Tuple[str, str, float, int]]]: The top matches for every row, in
+                the order of the input.
+        """
+        chunks = [
+            (
+                list(ocr_names[start : start + self.chunk_size]),
+                list(ocr_addresses[start : start + self.chunk_size]),
+            )
+            for start in range(0, len(ocr_names), self.chunk_size)
+        ]
+        results = []
+        for chunk_results in self._executor.map(
+            _match_chunk,
+            chunks,
+            [limit] * len(chunks),
+            [joint] * len(chunks),
+            [cascade] * len(chunks),
+        ):
+            results.extend(chunk_results)
+        return results
+
+    def close(self) -> None:
+        """Stops the worker processes and releases the shared memory."""
+        self._executor.shutdown()
+        self._release_blocks()
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
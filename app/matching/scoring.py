@@ -0,0 +1,194 @@
+from typing import Callable, Optional, Sequence, Tuple
+
+import numpy as np
+from rapidfuzz import fuzz, process
+
+from utils import logger
+
+from .packed import PackedStrings
+
+# Upper bound on the number of cells in a single score matrix. Queries are
+# scored in row chunks so that a large voter roll does not allocate a
+# (signatures x voters) matrix in one go (2**25 float64 cells = 256 MB).
+MAX_CHUNK_CELLS = 2**25
+
+
+def top_k_matches(
+    queries: Sequence[str],
+    choices: Sequence[str],
+    scorer: Callable = fuzz.ratio,
+    limit: int = 10,
+    workers: int = -1,
+    max_chunk_cells: int = MAX_CHUNK_CELLS,
+    choice_inverse: Optional[np.ndarray] = None,
+    processor: Optional[Callable[[str], str]] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Scores every query against every choice in native code and keeps the top matches.
+
+    Scores are float64, so each row is identical to scoring the query on its own,
+    and equal scores are ordered by voter position, see `rank_top_k`.
+
+    When ``choice_inverse`` is given, ``choices`` holds only distinct strings and each
+    one is scored once. The top matches are selected among the distinct strings, and
+    only the voters of those strings are ranked, so the ranking is the same as
+    scoring the full list.
+
+    When ``choices`` are `PackedStrings`, e.g. a shared memory block or a mapped
+    `VoterMatchIndex`, they are decoded one block of columns at a time and the
+    top matches are merged across blocks, so the whole roll is never decoded.
+
+    Args:
+        queries (Sequence[str]): The OCR strings to match.
+        choices (Sequence[str]): The strings to compare against.
+        scorer (function): The rapidfuzz scorer to use.
+        limit (int): The number of top matches to return per query.
+        workers (int): Number of threads used by rapidfuzz. -1 uses all cores.
+        max_chunk_cells (int): Maximum size of a single score matrix.
+        choice_inverse (np.ndarray): Optional position in ``choices`` of every voter.
+        processor (Callable): Optional preprocessing applied to every string before
+            scoring, e.g. ``rapidfuzz.utils.default_process``.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: Voter indices (indices into ``choices`` when no
+            inverse is given) and their scores, both of shape (len(queries), limit),
+            best match first.
+    """
+    n_queries = len(queries)
+    indices = np.empty((n_queries, limit), dtype=np.intp)
+    scores = np.empty((n_queries, limit), dtype=np.float64)
+    if n_queries == 0:
+        return indices, scores
+
+    if isinstance(choices, PackedStrings) and choice_inverse is None:
+        return _top_k_packed(
+            queries, choices, scorer, limit, workers, max_chunk_cells, processor
+        )
+
+    n_voters = len(choices) if choice_inverse is None else len(choice_inverse)
+    rows_per_chunk = max(1, max_chunk_cells // max(len(choices), 1))
+    if choice_inverse is not None:
+        # The voters of every distinct string, in voter order
+        voters_by_choice = np.argsort(choice_inverse, kind="stable")
+        voter_counts = np.bincount(choice_inverse, minlength=len(choices))
+        voter_starts = np.cumsum(voter_counts) - voter_counts
+    logger.debug(
+        f"Scoring {n_queries} queries against {len(choices)} distinct choices "
+        f"for {n_voters} voters in chunks of {rows_per_chunk}"
+    )
+
+    for start in range(0, n_queries, rows_per_chunk):
+        stop = min(start + rows_per_chunk, n_queries)
+        chunk_scores = process.cdist(
+            queries[start:stop],
+            choices,
+            scorer=scorer,
+            dtype=np.float64,
+            workers=workers,
+            processor=processor,
+        )
+        if choice_inverse is None:
+            indices[start:stop], scores[start:stop] = rank_top_k(chunk_scores, limit)
+            continue
+
+        # Every voter among the top matches has a string scoring at least the
+        # limit-th best distinct score, so only the voters of those strings are ranked
+        rows, columns = _at_least_kth(chunk_scores, min(limit, len(choices)))
+        counts = voter_counts[columns]
+        ends = np.cumsum(counts)
+        voters = voters_by_choice[
+            np.repeat(voter_starts[columns] - ends + counts, counts)
+            + np.arange(ends[-1])
+        ]
+        indices[start:stop], scores[start:stop] = _first_per_row(
+            np.repeat(rows, counts),
+            voters,
+            np.repeat(chunk_scores[rows, columns], counts),
+            limit,
+            stop - start,
+        )
+
+    return indices, scores
+
+
+def _top_k_packed(
+    queries: Sequence[str],
+    choices: PackedStrings,
+    scorer: Callable,
+    limit: int,
+    workers: int,
+    max_chunk_cells: int,
+    processor: Optional[Callable[[str], str]],
+) -> Tuple[np.ndarray, np.ndarray]:
+    n_queries = len(queries)
+    columns_per_chunk = max(limit, max_chunk_cells // n_queries)
+    logger.debug(
+        f"Scoring {n_queries} queries against {len(choices)} packed choices "
+        f"in chunks of {columns_per_chunk}"
+    )
+
+    indices = np.empty((n_queries, 0), dtype=np.intp)
+    scores = np.empty((n_queries, 0), dtype=np.float64)
+    for start in range(0, len(choices), columns_per_chunk):
+        block = choices[start : start + columns_per_chunk]
+        block_scores = process.cdist(
+            queries,
+            block,
+            scorer=scorer,
+            dtype=np.float64,
+            workers=workers,
+            processor=processor,
+        )
+        block_indices, block_scores = rank_top_k(block_scores, min(limit, len(block)))
+
+        # Merge the best matches of this block into the running top matches
+        merged_indices = np.concatenate([indices, block_indices + start], axis=1)
+        merged_scores = np.concatenate([scores, block_scores], axis=1)
+        top, scores = rank_top_k(merged_scores, min(limit, merged_scores.shape[1]))
+        indices = np.take_along_axis(merged_indices, top, axis=1)
+
+    return indices, scores
+
+
+def rank_top_k(score_matrix: np.ndarray, limit: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Selects the ``limit`` best scores of each row of a score matrix, best first.
+    Equal scores are ordered by column, so the ranking does not depend on how the
+    choices were split into blocks or deduplicated.
+
+    Args:
+        score_matrix (np.ndarray): Scores of shape (n_queries, n_choices).
+        limit (int): The number of top matches to keep per row.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: Column indices and scores of the top matches.
+    """
+    rows, columns = _at_least_kth(score_matrix, limit)
+    return _first_per_row(
+        rows, columns, score_matrix[rows, columns], limit, len(score_matrix)
+    )
+
+
+def _at_least_kth(
+    score_matrix: np.ndarray, limit: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    # Rows and columns, row by row and in column order, of the scores at least the
+    # limit-th best of their row, ties included
+    n_columns = score_matrix.shape[1]
+    kth = np.partition(score_matrix, n_columns - limit, axis=1)[:, n_columns - limit]
+    return np.nonzero(score_matrix >= kth[:, None])
+
+
+def _first_per_row(
+    rows: np.ndarray,
+    columns: np.ndarray,
+    values: np.ndarray,
+    limit: int,
+    n_rows: int,
+) -> Tuple[np.ndarray, np.ndarray]:
+    # The `limit` best values of every row, at least `limit` per row, equal values
+    # by column
+    order = np.lexsort((columns, -values, rows))
+    starts = np.searchsorted(rows[order], np.arange(n_rows))
+    top = order[starts[:, None] + np.arange(limit)]
+    return columns[top], values[top]
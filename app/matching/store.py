@@ -0,0 +1,151 @@
+from typing import Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from .packed import PackedStrings
+from .voter_index import VoterMatchIndex
+
+
+def _unique_with_inverse(strings: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    inverse, uniques = pd.factorize(strings)
+    return np.asarray(uniques, dtype=object), inverse
+
+
+def _decoded(
+    unique_strings: Tuple[Sequence[str], np.ndarray],
+) -> Tuple[np.ndarray, np.ndarray]:
+    # The distinct strings are scored against every query, so they are decoded once
+    distinct, inverse = unique_strings
+    if isinstance(distinct, PackedStrings):
+        distinct = np.array(distinct.to_list(), dtype=object)
+    return distinct, inverse
+
+
+class VoterRecordView:
+    """Lightweight view of one voter in a `VoterStringStore`."""
+
+    __slots__ = ("store", "position")
+
+    def __init__(self, store: "VoterStringStore", position: int):
+        self.store = store
+        self.position = position
+
+    @property
+    def name(self) -> str:
+        return self.store.names[self.position]
+
+    @property
+    def address(self) -> str:
+        return self.store.addresses[self.position]
+
+    def __repr__(self) -> str:
+        return f"VoterRecordView({self.position}, {self.name!r}, {self.address!r})"
+
+
+class VoterStringStore:
+    """
+    The voter full names and addresses held once as aligned numpy object arrays, or
+    as the `PackedStrings` of a mapped `VoterMatchIndex`. Matching reads and indexes
+    them directly, so scoring a signature never copies or converts the voter roll.
+
+    The store also keeps tables of the distinct names and addresses with inverse
+    arrays mapping every voter to its entry, so shared strings (households at one
+    address, common names) are scored once. They are built on first use, or taken
+    from the index and decoded on first use.
+    """
+
+    __slots__ = ("names", "addresses", "_unique_names", "_unique_addresses")
+
+    def __init__(
+        self,
+        names: Sequence[str],
+        addresses: Sequence[str],
+        unique_names: Optional[Tuple[Sequence[str], np.ndarray]] = None,
+        unique_addresses: Optional[Tuple[Sequence[str], np.ndarray]] = None,
+    ):
+        self.names = names
+        self.addresses = addresses
+        self._unique_names = unique_names
+        self._unique_addresses = unique_addresses
+
+    @classmethod
+    def from_select_voter_records(
+        cls, select_voter_records: pd.DataFrame
+    ) -> "VoterStringStore":
+        """
+        Builds the store from the output of `create_select_voter_records`.
+
+        Args:
+            select_voter_records (pd.DataFrame): DataFrame with 'Full Name' and
+                'Full Address' columns.
+
+        Returns:
+            VoterStringStore: The store.
+        """
+        return cls(
+            select_voter_records["Full Name"].to_numpy(dtype=object),
+            select_voter_records["Full Address"].to_numpy(dtype=object),
+        )
+
+    @classmethod
+    def from_index(cls, index: VoterMatchIndex) -> "VoterStringStore":
+        """
+        Builds the store over the strings of a `VoterMatchIndex`, read in place.
+        Only the distinct names and addresses are decoded, when first scored.
+
+        Args:
+            index (VoterMatchIndex): The voter match index.
+
+        Returns:
+            VoterStringStore: The store.
+        """
+        return cls(
+            index.names, index.addresses, index.unique_names, index.unique_addresses
+        )
+
+    @classmethod
+    def of(
+        cls, voter_records: Union["VoterStringStore", pd.DataFrame]
+    ) -> "VoterStringStore":
+        """
+        Returns `voter_records` if it already is a store, otherwise builds one from the
+        output of `create_select_voter_records`.
+        """
+        if isinstance(voter_records, cls):
+            return voter_records
+        return cls.from_select_voter_records(voter_records)
+
+    @property
+    def unique_names(self) -> Tuple[np.ndarray, np.ndarray]:
+        """The distinct full names and the position of each voter's name among them."""
+        if self._unique_names is None:
+            self._unique_names = _unique_with_inverse(self.names)
+        self._unique_names = _decoded(self._unique_names)
+        return self._unique_names
+
+    @property
+    def unique_addresses(self) -> Tuple[np.ndarray, np.ndarray]:
+        """The distinct full addresses and the position of each voter's address."""
+        if self._unique_addresses is None:
+            self._unique_addresses = _unique_with_inverse(self.addresses)
+        self._unique_addresses = _decoded(self._unique_addresses)
+        return self._unique_addresses
+
+    def subset(self, positions: np.ndarray) -> "VoterStringStore":
+        """
+        Builds the store of some of the voters. The strings are shared, not copied.
+
+        Args:
+            positions (np.ndarray): The voter positions to keep, in order.
+
+        Returns:
+            VoterStringStore: The store of those voters.
+        """
+        return VoterStringStore(self.names[positions], self.addresses[positions])
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __getitem__(self, position: int) -> VoterRecordView:
+        return VoterRecordView(self, position)
@@ -0,0 +1,123 @@
+import re
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+from rapidfuzz import fuzz, process
+
+from utils import logger
+
+from .exact import normalize_match_text
+
+STREET_COLUMNS = ["Street_Name", "Street_Type", "Street_Dir_Suffix"]
+
+# Leading house number of an OCR address, e.g. "1234", "12B" or "1234-1236"
+_HOUSE_NUMBER = re.compile(r"^\s*\d[\dA-Z\-/]*\s+")
+
+
+def ocr_street(ocr_address: str) -> str:
+    """
+    Returns the normalized street of an OCR address, without its house number.
+
+    Args:
+        ocr_address (str): The OCR result for the address.
+
+    Returns:
+        str: The normalized street name, type and direction suffix.
+    """
+    normalized = normalize_match_text([ocr_address]).iloc[0]
+    return _HOUSE_NUMBER.sub("", normalized, count=1)
+
+
+class StreetIndex:
+    """
+    Address index partitioning the voter rows by normalized street. An OCR address
+    is first resolved to a few candidate streets, and only their residents are
+    scored, so the cost of a signature depends on the street population rather than
+    on the size of the roll.
+    """
+
+    def __init__(self, streets: np.ndarray, residents: Dict[str, np.ndarray]):
+        self.streets = streets
+        self.residents = residents
+
+    @classmethod
+    def from_voter_records(cls, voter_records: pd.DataFrame) -> "StreetIndex":
+        """
+        Builds the index from the street columns of the raw voter records.
+
+        Args:
+            voter_records (pd.DataFrame): The voter records, with 'Street_Name',
+                'Street_Type' and 'Street_Dir_Suffix' columns, in the row order of
+                `create_select_voter_records`.
+
+        Returns:
+            StreetIndex: The street index over the voter rows.
+        """
+        street_parts = voter_records[STREET_COLUMNS].fillna("").astype(str)
+        keys = normalize_match_text(
+            street_parts[STREET_COLUMNS[0]].str.cat(
+                [street_parts[column] for column in STREET_COLUMNS[1:]], sep=" "
+            )
+        )
+        residents = {
+            street: rows.astype(np.int64)
+            for street, rows in keys.groupby(keys.to_numpy()).indices.items()
+            if street
+        }
+        logger.info(
+            f"Built street index with {len(residents)} streets "
+            f"over {len(voter_records)} voters"
+        )
+        return cls(np.array(list(residents), dtype=object), residents)
+
+    def match_streets(
+        self, ocr_address: str, limit: int = 3, min_score: float = 70
+    ) -> List[Tuple[str, float]]:
+        """
+        Resolves an OCR address to its most likely streets.
+
+        Args:
+            ocr_address (str): The OCR result for the address.
+            limit (int): The maximum number of streets to return.
+            min_score (float): Minimum `fuzz.ratio` between the OCR street and a
+                street name for it to be considered.
+
+        Returns:
+            List[Tuple[str, float]]: The streets and their scores, best first.
+        """
+        street = ocr_street(ocr_address)
+        if not street or len(self.streets) == 0:
+            return []
+        return [
+            (match, score)
+            for match, score, _ in process.extract(
+                street,
+                self.streets,
+                scorer=fuzz.ratio,
+                limit=limit,
+                score_cutoff=min_score,
+            )
+        ]
+
+    def candidates(
+        self, ocr_address: str, limit: int = 3, min_score: float = 70
+    ) -> np.ndarray:
+        """
+        Returns the voter row positions living on the streets matching the OCR address.
+
+        Args:
+            ocr_address (str): The OCR result for the address.
+            limit (int): The maximum number of streets to consider.
+            min_score (float): Minimum street score, see `match_streets`.
+
+        Returns:
+            np.ndarray: Sorted, unique row positions into the voter records.
+        """
+        rows = [
+            self.residents[street]
+            for street, _ in self.match_streets(ocr_address, limit, min_score)
+        ]
+        if not rows:
+            return np.empty(0, dtype=np.int64)
+        return np.unique(np.concatenate(rows))
@@ -0,0 +1,240 @@
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from utils import logger
+
+# Default bound on the entries of one query-by-voter product, about 200 MB
+MAX_PRODUCT_NNZ = 2**24
+
+# Voter strings the index can be fitted on, named as in the `[matching]` settings
+TFIDF_FIELDS = ["name", "name_address"]
+
+# Joined with the addresses, n-grams of house numbers and street types are shared
+# by much of the roll; ignoring them keeps the products small
+NAME_ADDRESS_MAX_DF = 0.02
+
+
+def _join_name_address(names: Sequence[str], addresses: Sequence[str]) -> List[str]:
+    return [f"{name} {address}" for name, address in zip(names, addresses)]
+
+
+class TfidfCandidateIndex:
+    """
+    Character n-gram TF-IDF index over voter names or addresses. One sparse matrix
+    product per batch of OCR strings retrieves the voters sharing the most
+    distinctive n-grams, and only those candidates are scored with rapidfuzz.
+    `limit` is the number of candidates retrieved per OCR string.
+
+    An index over the names joined with the addresses, see `from_voter_strings`,
+    retrieves the candidates of a signature from both, so a badly read name can be
+    recovered from its address.
+    """
+
+    def __init__(
+        self,
+        vectorizer: TfidfVectorizer,
+        matrix,
+        n_records: int,
+        limit: int = 50,
+        field: str = "name",
+    ):
+        self.vectorizer = vectorizer
+        self.field = field
+        # Transposed once, so every batch is a CSR times CSC product
+        self.matrix_t = matrix.T.tocsc()
+        self.n_records = n_records
+        self.limit = limit
+        # Number of voters with each n-gram, bounding the size of the products
+        self.document_frequency = np.bincount(
+            self.matrix_t.indices, minlength=self.matrix_t.shape[0]
+        )
+
+    @classmethod
+    def from_strings(
+        cls,
+        choices: Sequence[str],
+        ngram_range: Tuple[int, int] = (2, 3),
+        limit: int = 50,
+        max_df: float = 1.0,
+    ) -> "TfidfCandidateIndex":
+        """
+        Fits the vectorizer on the voter strings and builds the index.
+
+        Args:
+            choices (Sequence[str]): The voter full names or full addresses.
+            ngram_range (Tuple[int, int]): Character n-gram lengths, within words.
+            limit (int): The number of candidates retrieved per OCR string.
+            max_df (float): Ignore n-grams found in more than this share of the
+                strings.
+
+        Returns:
+            TfidfCandidateIndex: The candidate index over the voter rows.
+        """
+        vectorizer = TfidfVectorizer(
+            analyzer="char_wb",
+            ngram_range=ngram_range,
+            max_df=max_df,
+            dtype=np.float32,
+        )
+        matrix = vectorizer.fit_transform(choices)
+        logger.info(
+            f"Built TF-IDF index with {matrix.shape[1]} n-grams "
+            f"over {matrix.shape[0]} strings"
+        )
+        return cls(vectorizer, matrix, matrix.shape[0], limit)
+
+    @classmethod
+    def from_voter_strings(
+        cls,
+        names: Sequence[str],
+        addresses: Optional[Sequence[str]] = None,
+        ngram_range: Tuple[int, int] = (2, 3),
+        limit: int = 50,
+    ) -> "TfidfCandidateIndex":
+        """
+        Builds the index over the voter names, or over each name joined with its
+        address when `addresses` are given. The n-grams of the joined strings found
+        in more than `NAME_ADDRESS_MAX_DF` of the roll are ignored.
+
+        Args:
+            names (Sequence[str]): The voter full names.
+            addresses (Sequence[str]): Optional voter full addresses.
+            ngram_range (Tuple[int, int]): Character n-gram lengths, within words.
+            limit (int): The number of candidates retrieved per signature.
+
+        Returns:
+            TfidfCandidateIndex: The candidate index over the voter rows.
+        """
+        if addresses is None:
+            return cls.from_strings(names, ngram_range, limit)
+        index = cls.from_strings(
+            _join_name_address(names, addresses),
+            ngram_range,
+            limit,
+            max_df=NAME_ADDRESS_MAX_DF,
+        )
+        index.field = "name_address"
+        return index
+
+    @classmethod
+    def from_config(
+        cls, matching_config, names: Sequence[str], addresses: Sequence[str]
+    ) -> Optional["TfidfCandidateIndex"]:
+        """
+        Builds the index chosen in the `[matching]` section of the settings file.
+
+        Args:
+            matching_config (MatchingConfig): The matching settings, with `tfidf`
+                and `tfidf_limit`.
+            names (Sequence[str]): The voter full names.
+            addresses (Sequence[str]): The voter full addresses.
+
+        Returns:
+            Optional[TfidfCandidateIndex]: The index, or None when `tfidf` is "none".
+
+        Raises:
+            ValueError: If `tfidf` is not "none" or one of `TFIDF_FIELDS`.
+        """
+        if matching_config.tfidf == "none":
+            return None
+        if matching_config.tfidf not in TFIDF_FIELDS:
+            raise ValueError(
+                f"Unknown TF-IDF field {matching_config.tfidf}. "
+                f"Choose one of none, {', '.join(TFIDF_FIELDS)}."
+            )
+        return cls.from_voter_strings(
+            names,
+            addresses if matching_config.tfidf == "name_address" else None,
+            limit=matching_config.tfidf_limit,
+        )
+
+    @property
+    def config_key(self) -> str:
+        """
+        Identifies the indexed field and the number of candidates, for caching
+        match results.
+
+        Returns:
+            str: e.g. "name_address:50".
+        """
+        return f"{self.field}:{self.limit}"
+
+    def candidates(
+        self, ocr_names: Sequence[str], ocr_addresses: Sequence[str]
+    ) -> np.ndarray:
+        """
+        Retrieves the candidate voters of each signature, from its name, or from its
+        name and address for an index built over both.
+
+        Args:
+            ocr_names (Sequence[str]): The OCR results for the names.
+            ocr_addresses (Sequence[str]): The OCR results for the addresses.
+
+        Returns:
+            np.ndarray: Voter positions of shape (len(ocr_names), limit), best first,
+                padded with -1, see `top_k`.
+        """
+        if self.field == "name_address":
+            return self.top_k(_join_name_address(ocr_names, ocr_addresses))[0]
+        return self.top_k(ocr_names)[0]
+
+    def top_k(
+        self,
+        queries: Sequence[str],
+        limit: Optional[int] = None,
+        max_product_nnz: int = MAX_PRODUCT_NNZ,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Retrieves the voters with the highest cosine similarity to each query.
+
+        A query sharing common n-grams matches most of the roll, so queries are
+        multiplied with the index in chunks whose products hold at most about
+        `max_product_nnz` entries, bounded from the voters having each n-gram.
+
+        Args:
+            queries (Sequence[str]): The OCR strings to match.
+            limit (int): The number of candidates to return per query. Defaults to
+                the `limit` of the index.
+            max_product_nnz (int): Bound on the entries of one chunk's product. A
+                query whose product alone is larger is multiplied on its own.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Voter positions and similarities, both of
+                shape (len(queries), limit), best first. Rows sharing no n-gram with
+                enough voters are padded with position -1 and similarity 0.
+        """
+        limit = self.limit if limit is None else limit
+        indices = np.full((len(queries), limit), -1, dtype=np.int64)
+        similarities = np.zeros((len(queries), limit), dtype=np.float32)
+        query_matrix = self.vectorizer.transform(queries)
+
+        for start, stop in self._chunks(query_matrix, max_product_nnz):
+            products = (query_matrix[start:stop] @ self.matrix_t).tocsr()
+            for offset in range(products.shape[0]):
+                row = slice(products.indptr[offset], products.indptr[offset + 1])
+                columns, values = products.indices[row], products.data[row]
+                if len(values) > limit:
+                    top = np.argpartition(values, -limit)[-limit:]
+                    columns, values = columns[top], values[top]
+                order = np.lexsort((columns, -values))
+                indices[start + offset, : len(order)] = columns[order]
+                similarities[start + offset, : len(order)] = values[order]
+
+        return indices, similarities
+
+    def _chunks(self, query_matrix, max_product_nnz: int) -> Iterator[Tuple[int, int]]:
+        # A product row has at most as many entries as voters sharing an n-gram
+        # with the query
+        present = query_matrix.copy()
+        present.data[:] = 1
+        bounds = np.minimum(present @ self.document_frequency, self.n_records)
+        ends = np.cumsum(bounds)
+
+        start = 0
+        while start < len(bounds):
+            budget = ends[start] - bounds[start] + max_product_nnz
+            stop = max(start + 1, int(np.searchsorted(ends, budget, side="right")))
+            yield start, stop
+            start = stop
@@ -0,0 +1,321 @@
+import hashlib
+import json
+import mmap
+import os
+from typing import BinaryIO, Dict, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from utils import logger
+
+from .blocking import BlockingIndex, voter_blocking_keys
+from .exact import ExactMatchIndex
+from .packed import PackedStrings
+from .wards import WardIndex
+
+DEFAULT_INDEX_DIRECTORY = os.path.join("temp", "voter_index")
+
+# File layout: magic, little endian uint64 header length, JSON header, then the
+# sections, each a serialized PackedStrings or a little endian numpy array, aligned
+# to 8 bytes. The version is part of the file name, so files of an older layout are
+# rebuilt rather than misread.
+_VERSION = 4
+_MAGIC = b"BIVIDX%02d" % _VERSION
+_ALIGNMENT = 8
+
+_NAME_SECTION = "Full Name"
+_ADDRESS_SECTION = "Full Address"
+_BLOCKING_SECTIONS = ["blocking:last_soundex", "blocking:name_trigrams"]
+# Distinct strings and the position of every voter's string among them
+_UNIQUE_SECTIONS = {
+    _NAME_SECTION: ("names:distinct", "names:inverse"),
+    _ADDRESS_SECTION: ("addresses:distinct", "addresses:inverse"),
+}
+_EXACT_SECTIONS = ["exact:hashes", "exact:rows"]
+# Distinct wards, and the voter rows grouped by ward with the start of each group
+_WARD_SECTIONS = ["ward:names", "ward:starts", "ward:rows"]
+
+
+def hash_voter_file(file: Union[str, BinaryIO]) -> str:
+    """
+    Computes the content hash of a voter records file.
+
+    Args:
+        file (str | BinaryIO): Path to the voter records CSV, or the CSV opened in
+            binary mode, e.g. an upload. An open file is read from its start and
+            rewound.
+
+    Returns:
+        str: Hex SHA-256 digest of the file contents.
+    """
+    if isinstance(file, str):
+        with open(file, "rb") as f:
+            return hash_voter_file(f)
+
+    digest = hashlib.sha256()
+    file.seek(0)
+    for block in iter(lambda: file.read(1 << 20), b""):
+        digest.update(block)
+    file.seek(0)
+    return digest.hexdigest()
+
+
+def hash_voter_records(voter_records: pd.DataFrame) -> str:
+    """
+    Computes the content hash of voter records loaded from a CSV or the database.
+
+    Args:
+        voter_records (pd.DataFrame): The voter records.
+
+    Returns:
+        str: Hex SHA-256 digest of the column names and row values.
+    """
+    digest = hashlib.sha256()
+    digest.update(json.dumps(list(map(str, voter_records.columns))).encode("utf-8"))
+    digest.update(
+        pd.util.hash_pandas_object(voter_records, index=False).to_numpy().tobytes()
+    )
+    return digest.hexdigest()
+
+
+def _aligned(size: int) -> int:
+    return -(-size // _ALIGNMENT) * _ALIGNMENT
+
+
+def voter_index_path(roll_hash: str, directory: str = DEFAULT_INDEX_DIRECTORY) -> str:
+    """
+    Returns the path of the index file of a voter roll.
+
+    Args:
+        roll_hash (str): Content hash of the voter roll.
+        directory (str): Directory holding the index files.
+
+    Returns:
+        str: Path of the index file.
+    """
+    return os.path.join(directory, f"{roll_hash}.v{_VERSION}.idx")
+
+
+class VoterMatchIndex:
+    """
+    On-disk voter match index: the full names and addresses of the roll, their
+    blocking keys, the tables of distinct names and addresses, the exact match keys
+    and, when the roll has them, the voters of each ward. Strings are stored as one
+    contiguous UTF-8 buffer with an offsets array, and the rest as numpy arrays.
+    Opened indexes are memory-mapped, so processes opening the same file share one
+    physical copy and nothing is parsed until it is used.
+    """
+
+    def __init__(
+        self,
+        sections: Dict[str, Union[PackedStrings, np.ndarray]],
+        roll_hash: str,
+        path: Optional[str] = None,
+    ):
+        self.sections = sections
+        self.roll_hash = roll_hash
+        self.path = path
+
+    @classmethod
+    def build(
+        cls,
+        select_voter_records: pd.DataFrame,
+        roll_hash: str,
+        wards: Optional[Sequence[str]] = None,
+    ) -> "VoterMatchIndex":
+        """
+        Builds an in-memory index from the output of `create_select_voter_records`.
+
+        Args:
+            select_voter_records (pd.DataFrame): DataFrame with 'Full Name' and
+                'Full Address' columns.
+            roll_hash (str): Content hash of the voter roll the records came from.
+            wards (Sequence[str]): Optional ward of every voter, normalized with
+                `normalize_ward`.
+
+        Returns:
+            VoterMatchIndex: The index.
+        """
+        sections = {
+            _NAME_SECTION: PackedStrings.from_strings(
+                select_voter_records["Full Name"].values
+            ),
+            _ADDRESS_SECTION: PackedStrings.from_strings(
+                select_voter_records["Full Address"].values
+            ),
+        }
+        key_columns = voter_blocking_keys(select_voter_records["Full Name"])
+        for section, keys in zip(_BLOCKING_SECTIONS, key_columns):
+            sections[section] = PackedStrings.from_strings(keys.values)
+        for column, (distinct_section, inverse_section) in _UNIQUE_SECTIONS.items():
+            inverse, uniques = pd.factorize(select_voter_records[column].values)
+            sections[distinct_section] = PackedStrings.from_strings(uniques)
+            sections[inverse_section] = inverse.astype(np.int64)
+
+        exact_index = ExactMatchIndex.from_select_voter_records(select_voter_records)
+        sections[_EXACT_SECTIONS[0]] = exact_index.hashes
+        sections[_EXACT_SECTIONS[1]] = exact_index.rows
+
+        if wards is not None:
+            residents = WardIndex.from_wards(wards).residents
+            starts = np.cumsum([0] + [len(rows) for rows in residents.values()])
+            sections[_WARD_SECTIONS[0]] = PackedStrings.from_strings(residents)
+            sections[_WARD_SECTIONS[1]] = starts.astype(np.int64)
+            sections[_WARD_SECTIONS[2]] = np.concatenate(
+                [np.empty(0, dtype=np.int64), *residents.values()]
+            )
+        return cls(sections, roll_hash)
+
+    @classmethod
+    def open(cls, path: str) -> "VoterMatchIndex":
+        """
+        Memory-maps an index file written by `save`.
+
+        Args:
+            path (str): Path to the index file.
+
+        Returns:
+            VoterMatchIndex: The index, backed by the mapped file.
+        """
+        with open(path, "rb") as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        view = memoryview(buffer)
+        if bytes(view[: len(_MAGIC)]) != _MAGIC:
+            raise ValueError(f"{path} is not a voter match index file")
+        header_start = len(_MAGIC) + 8
+        header_length = int.from_bytes(view[len(_MAGIC) : header_start], "little")
+        data_start = header_start + header_length
+        header = json.loads(bytes(view[header_start:data_start]))
+
+        sections = {}
+        for name, (offset, size, dtype) in header["sections"].items():
+            section = view[data_start + offset : data_start + offset + size]
+            if dtype is None:
+                sections[name] = PackedStrings.from_buffer(section)
+            else:
+                sections[name] = np.frombuffer(section, dtype=dtype)
+        logger.debug(f"Opened voter match index {path}")
+        return cls(sections, header["roll_hash"], path)
+
+    def save(self, path: str) -> None:
+        """
+        Writes the index to a file. The file is written next to `path` and moved into
+        place, so concurrent readers never see a partial index.
+
+        Args:
+            path (str): Path of the index file.
+        """
+        # Section offsets are relative to the end of the header
+        header = {"roll_hash": self.roll_hash, "sections": {}}
+        offset = 0
+        for name, section in self.sections.items():
+            if isinstance(section, PackedStrings):
+                size, dtype = section.serialized_size, None
+            else:
+                size, dtype = section.nbytes, section.dtype.newbyteorder("<").str
+            header["sections"][name] = [offset, size, dtype]
+            offset += _aligned(size)
+
+        header_bytes = json.dumps(header).encode("utf-8")
+        header_bytes = header_bytes.ljust(
+            _aligned(len(_MAGIC) + 8 + len(header_bytes)) - len(_MAGIC) - 8
+        )
+
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(_MAGIC)
+            f.write(len(header_bytes).to_bytes(8, "little"))
+            f.write(header_bytes)
+            for section in self.sections.values():
+                if isinstance(section, PackedStrings):
+                    buffer = bytearray(_aligned(section.serialized_size))
+                    section.write_to(buffer)
+                else:
+                    data = section.astype(section.dtype.newbyteorder("<")).tobytes()
+                    buffer = data.ljust(_aligned(len(data)), b"\0")
+                f.write(buffer)
+        os.replace(temp_path, path)
+        self.path = path
+        logger.info(f"Saved voter match index to {path}")
+
+    def __len__(self) -> int:
+        return len(self.sections[_NAME_SECTION])
+
+    @property
+    def names(self) -> PackedStrings:
+        return self.sections[_NAME_SECTION]
+
+    @property
+    def addresses(self) -> PackedStrings:
+        return self.sections[_ADDRESS_SECTION]
+
+    @property
+    def unique_names(self) -> Tuple[PackedStrings, np.ndarray]:
+        """The distinct full names and the position of each voter's name among them."""
+        distinct_section, inverse_section = _UNIQUE_SECTIONS[_NAME_SECTION]
+        return self.sections[distinct_section], self.sections[inverse_section]
+
+    @property
+    def unique_addresses(self) -> Tuple[PackedStrings, np.ndarray]:
+        """The distinct full addresses and the position of each voter's address."""
+        distinct_section, inverse_section = _UNIQUE_SECTIONS[_ADDRESS_SECTION]
+        return self.sections[distinct_section], self.sections[inverse_section]
+
+    def to_select_voter_records(self) -> pd.DataFrame:
+        """
+        Decodes the index into the DataFrame returned by `create_select_voter_records`.
+
+        Returns:
+            pd.DataFrame: DataFrame with 'Full Name' and 'Full Address' columns.
+        """
+        return pd.DataFrame(
+            {
+                "Full Name": self.names.to_list(),
+                "Full Address": self.addresses.to_list(),
+            },
+            dtype=object,
+        )
+
+    def blocking_index(self) -> BlockingIndex:
+        """
+        Builds the blocking index from the stored keys, without recomputing them.
+
+        Returns:
+            BlockingIndex: The blocking index over the voter rows.
+        """
+        return BlockingIndex.from_key_columns(
+            [self.sections[section].to_list() for section in _BLOCKING_SECTIONS]
+        )
+
+    def exact_index(self) -> ExactMatchIndex:
+        """
+        Opens the exact match index over the stored keys and voter strings.
+
+        Returns:
+            ExactMatchIndex: The exact match index, reading the mapped file.
+        """
+        return ExactMatchIndex(
+            *(self.sections[section] for section in _EXACT_SECTIONS),
+            self.names,
+            self.addresses,
+        )
+
+    def ward_index(self) -> Optional[WardIndex]:
+        """
+        Opens the ward index over the stored voter rows of each ward.
+
+        Returns:
+            Optional[WardIndex]: The ward index over the voter rows, or None when the
+                roll has no 'Ward' column.
+        """
+        if _WARD_SECTIONS[0] not in self.sections:
+            return None
+        wards, starts, rows = (self.sections[section] for section in _WARD_SECTIONS)
+        return WardIndex(
+            {
+                ward: rows[start:stop]
+                for ward, start, stop in zip(wards.to_list(), starts[:-1], starts[1:])
+            }
+        )
@@ -0,0 +1,126 @@
+import re
+from typing import Dict, Iterable, List, Sequence
+
+import numpy as np
+import pandas as pd
+
+from utils import logger
+
+WARD_COLUMN = "Ward"
+
+_WARD_PREFIX = re.compile(r"^WARD\s*")
+
+
+def normalize_ward(ward) -> str:
+    """
+    Normalizes a ward from the voter records or the OCR output, e.g. "Ward 03",
+    "3" and 3 all become "3".
+
+    Args:
+        ward: The ward as a string or a number. Missing values are allowed.
+
+    Returns:
+        str: The normalized ward, or "" when it is missing.
+    """
+    if pd.isna(ward):
+        return ""
+    text = _WARD_PREFIX.sub("", str(ward).strip().upper())
+    if text.endswith(".0"):
+        text = text[:-2]
+    return text.lstrip("0") or text[:1]
+
+
+class WardIndex:
+    """
+    Partition of the voter rows by ward. Signatures whose OCR ward is a known ward
+    are matched against that ward's voters only, about an eighth of a DC roll.
+
+    The names and addresses of each ward's voters are gathered once per voter store,
+    see `ward_store`, so matching batch after batch reuses them.
+    """
+
+    def __init__(self, residents: Dict[str, np.ndarray]):
+        self.residents = residents
+        self._ward_stores = {}
+        self._parent_store = None
+
+    @classmethod
+    def from_wards(cls, wards: Sequence[str]) -> "WardIndex":
+        """
+        Builds the index from the ward of every voter row.
+
+        Args:
+            wards (Sequence[str]): The wards, normalized with `normalize_ward`, in
+                the row order of `create_select_voter_records`. "" marks voters
+                without a ward.
+
+        Returns:
+            WardIndex: The ward index over the voter rows.
+        """
+        wards = np.asarray(wards, dtype=object)
+        residents = {
+            ward: rows.astype(np.int64)
+            for ward, rows in pd.Series(wards).groupby(wards).indices.items()
+            if ward
+        }
+        logger.info(
+            f"Built ward index with {len(residents)} wards over {len(wards)} voters"
+        )
+        return cls(residents)
+
+    @classmethod
+    def from_voter_records(cls, voter_records: pd.DataFrame) -> "WardIndex":
+        """
+        Builds the index from the 'Ward' column of the raw voter records.
+
+        Args:
+            voter_records (pd.DataFrame): The voter records, in the row order of
+                `create_select_voter_records`.
+
+        Returns:
+            WardIndex: The ward index over the voter rows. Empty when the records
+                have no 'Ward' column.
+        """
+        if WARD_COLUMN not in voter_records.columns:
+            logger.info("Voter records have no ward column, ward index is empty")
+            return cls({})
+
+        return cls.from_wards(voter_records[WARD_COLUMN].map(normalize_ward).values)
+
+    def partition(self, ocr_wards: Iterable) -> Dict[str, List[int]]:
+        """
+        Groups OCR rows by their ward, keeping only wards known to the index.
+
+        Args:
+            ocr_wards (Iterable): The OCR results for the ward of each row.
+
+        Returns:
+            Dict[str, List[int]]: The row numbers of each known ward.
+        """
+        groups = {}
+        for row, ocr_ward in enumerate(ocr_wards):
+            ward = normalize_ward(ocr_ward)
+            if ward in self.residents:
+                groups.setdefault(ward, []).append(row)
+        return groups
+
+    def ward_store(self, ward: str, store):
+        """
+        Returns the names and addresses of a ward's voters, gathered from `store`
+        the first time the ward is matched. The gathered wards are dropped when a
+        different store is given.
+
+        Args:
+            ward (str): A ward known to the index.
+            store (VoterStringStore): The store of the whole voter roll.
+
+        Returns:
+            VoterStringStore: The store of the ward's voters, in the order of
+                `residents[ward]`.
+        """
+        if store is not self._parent_store:
+            self._ward_stores = {}
+            self._parent_store = store
+        if ward not in self._ward_stores:
+            self._ward_stores[ward] = store.subset(self.residents[ward])
+        return self._ward_stores[ward]
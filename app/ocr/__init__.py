@@ -1,3 +1,19 @@
-from .ocr_client_factory import extract_from_encoding_async
+from .ocr_client_factory import (
+    OCREntry,
+    extract_from_encoding_async,
+    extract_from_encodings_async,
+)
+from .ocr_cache import OcrCache, ocr_scope
+from .ocr_job import OcrCheckpoint
+from .scheduler import OcrScheduler, PageResult
 
-__all__ = ["extract_from_encoding_async"]
+__all__ = [
+    "extract_from_encoding_async",
+    "extract_from_encodings_async",
+    "OCREntry",
+    "OcrCache",
+    "OcrCheckpoint",
+    "ocr_scope",
+    "OcrScheduler",
+    "PageResult",
+]
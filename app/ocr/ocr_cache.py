@@ -0,0 +1,129 @@
+import base64
+import hashlib
+import json
+import os
+from typing import Dict, List, Optional, Union
+
+from settings import SettingsData
+from utils import SqliteLruCache
+from utils.app_logger import logger
+
+from .ocr_client_factory import OCR_PACKED_PROMPT, OCR_PROMPTS, OCR_SCHEMA_VERSION
+
+DEFAULT_OCR_CACHE_PATH = os.path.join("temp", "ocr_cache.sqlite")
+
+# Opened cache files by path, so their memory tier outlives a single run
+_open_caches: Dict[str, SqliteLruCache] = {}
+
+
+def ocr_scope(settings: SettingsData) -> str:
+    """
+    Describes everything the OCR rows of a page image depend on: the engine, the
+    model, the prompts, including the one for several pages per request, the number
+    of strips pages are split into, and the result schema version.
+
+    Args:
+        settings (SettingsData): The loaded settings.
+
+    Returns:
+        str: JSON description of the OCR configuration.
+    """
+    ocr_config = settings.selected_config
+    prompts = list(OCR_PROMPTS)
+    if settings.ocr.pages_per_request > 1:
+        prompts.append(OCR_PACKED_PROMPT)
+    scope = [type(ocr_config).__name__, ocr_config.model, prompts]
+    # Only pages sent one per request are split into strips
+    if settings.ocr.pages_per_request <= 1 and settings.ocr.strips_per_page > 1:
+        scope.append({"strips_per_page": settings.ocr.strips_per_page})
+    return json.dumps(scope + [OCR_SCHEMA_VERSION])
+
+
+class OcrCache:
+    """
+    Persistent OCR results, addressed by content. Entries are keyed by the bytes of
+    the cropped page image together with the provider, model, prompts and result
+    schema version, so re-running a petition only requests the pages that changed.
+    """
+
+    def __init__(self, cache: SqliteLruCache, scope: str):
+        self.cache = cache
+        self.scope = scope
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_config(
+        cls, settings: SettingsData, path: str = DEFAULT_OCR_CACHE_PATH
+    ) -> Optional["OcrCache"]:
+        """
+        Opens the OCR cache sized in the `[ocr]` section of the settings file, for
+        the selected OCR engine.
+
+        Args:
+            settings (SettingsData): The loaded settings, with `ocr.cache_size_mb`.
+            path (str): Path of the SQLite cache file.
+
+        Returns:
+            Optional[OcrCache]: The cache, or None when `cache_size_mb` is 0.
+        """
+        if settings.ocr.cache_size_mb <= 0:
+            return None
+        if path not in _open_caches:
+            _open_caches[path] = SqliteLruCache(path)
+        cache = _open_caches[path]
+        cache.max_bytes = settings.ocr.cache_size_mb * 1024 * 1024
+        return cls(cache, ocr_scope(settings))
+
+    def key(self, encoding: Union[str, List[str]]) -> str:
+        """
+        Computes the cache key of one page.
+
+        Args:
+            encoding (Union[str, List[str]]): The base64 encoded page image, or the
+                images of its strips.
+
+        Returns:
+            str: Hex SHA-256 digest of the image bytes and the OCR scope.
+        """
+        digest = hashlib.sha256(self.scope.encode("utf-8"))
+        if isinstance(encoding, list):
+            # Each strip is prefixed with its size, so cuts at other rows differ
+            for strip in encoding:
+                data = base64.b64decode(strip)
+                digest.update(len(data).to_bytes(8, "big"))
+                digest.update(data)
+        else:
+            digest.update(base64.b64decode(encoding))
+        return digest.hexdigest()
+
+    def get(self, encoding: Union[str, List[str]]) -> Optional[List[dict]]:
+        """
+        Looks up the OCR rows of a page.
+
+        Args:
+            encoding (Union[str, List[str]]): The base64 encoded page image, or
+                the images of its strips.
+
+        Returns:
+            Optional[List[dict]]: The cached rows, or None when the page is not
+                cached.
+        """
+        rows = self.cache.get(self.key(encoding))
+        if rows is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return rows
+
+    def set(self, encoding: Union[str, List[str]], rows: List[dict]) -> None:
+        """
+        Stores the OCR rows of a page.
+
+        Args:
+            encoding (Union[str, List[str]]): The base64 encoded page image, or
+                the images of its strips.
+            rows (List[dict]): The rows returned by `extract_from_encoding_async`.
+        """
+        self.cache.set(self.key(encoding), rows)
+        logger.debug(f"Cached OCR result of {len(rows)} rows")
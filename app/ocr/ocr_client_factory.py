@@ -1,4 +1,8 @@
-from typing import List
+import asyncio
+import weakref
+from dataclasses import astuple
+from typing import Dict, List, Optional, Type
+import httpx
 from langchain_openai import ChatOpenAI
 from langchain_mistralai import ChatMistralAI
 from langchain_google_genai import ChatGoogleGenerativeAI
@@ -12,6 +16,7 @@ from settings import (
     OpenAiConfig,
     MistralAiConfig,
     GeminiAiConfig,
+    SettingsData,
 )
 from utils.app_logger import logger
 import json
@@ -33,15 +38,95 @@ class OCRData(BaseModel):
     Data: List[OCREntry]
 
 
-def _create_ocr_client() -> Runnable:
+class PackedOCREntry(OCREntry):
+    """Ballot signatory data read from one of several page images"""
+
+    Page: int = Field(
+        description="Number of the image the signer was read from, starting at 1"
+    )
+
+
+class PackedOCRData(BaseModel):
+    Data: List[PackedOCREntry]
+
+
+# Instructions sent with every page image
+OCR_PROMPTS = (
+    """Using the written text in the image create a list of dictionaries where each dictionary consists of keys 'Name', 'Address', 'Date', and 'Ward'. Fill in the values of each dictionary with the correct entries for each key. Write all the values of the dictionary in full. Only output the list of dictionaries. No other intro text is necessary.""",
+    """Remove the city name 'Washington, DC' and any zip codes from the 'Address' values.""",
+)
+
+# Instructions added when several page images are sent in one request
+OCR_PACKED_PROMPT = """The images are separate petition pages, numbered from 1 in the order they are given. Read every page, and set 'Page' in each dictionary to the number of the image the entry was read from."""
+
+# Version of the rows returned by `extract_from_encoding_async`. Bump it when
+# `OCREntry` or the parsing of the response changes, so cached OCR results of the
+# previous version are not reused.
+OCR_SCHEMA_VERSION = 1
+
+
+# API root of the Mistral chat model, which its own client would default to
+MISTRAL_ENDPOINT = "https://api.mistral.ai/v1"
+
+# (settings key, chat model, OCR client by output schema) of each event loop, as
+# pooled connections belong to the loop that opened them
+_clients = weakref.WeakKeyDictionary()
+
+
+def _client_key(settings: SettingsData) -> tuple:
+    """The settings an OCR client depends on."""
+    ocr_config = settings.selected_config
+    return (
+        type(ocr_config).__name__,
+        *astuple(ocr_config),
+        settings.ocr.max_concurrency,
+    )
+
+
+def _create_http_client(
+    max_connections: int,
+    base_url: str = "",
+    headers: Optional[Dict[str, str]] = None,
+) -> httpx.AsyncClient:
+    """
+    Creates the keep-alive connection pool shared by the requests of an OCR run.
+
+    Args:
+        max_connections (int): Maximum number of open connections, the number of
+            pages OCR'd at the same time.
+        base_url (str): Optional root of the relative URLs requested by the client.
+        headers (Dict[str, str]): Optional headers sent with every request.
+
+    Returns:
+        httpx.AsyncClient: The HTTP client.
+    """
+    return httpx.AsyncClient(
+        base_url=base_url,
+        headers=headers,
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+            keepalive_expiry=120,
+        ),
+        timeout=httpx.Timeout(120, connect=10),
+    )
+
+
+def _create_ocr_client(settings: SettingsData) -> Runnable:
     """
     Create an OpenAI client with the appropriate settings.
 
+    Args:
+        settings (SettingsData): The loaded settings.
+
     Returns:
-        Runnable: An AI client for OCR extraction.
+        Runnable: The chat model of the selected engine, without structured output.
+            The OpenAI and Mistral clients send their requests through a keep-alive
+            pool sized for the OCR concurrency. The Gemini client takes no HTTP
+            client and keeps its own gRPC channel, reused with the cached client.
     """
 
-    ocr_config = load_settings().selected_config
+    ocr_config = settings.selected_config
 
     client: Runnable = None
 
@@ -52,32 +137,79 @@ def _create_ocr_client() -> Runnable:
                 temperature=1,
                 openai_api_base="https://oai.helicone.ai/v1",
                 model=ocr_config.model,
-            ).with_structured_output(OCRData)
+                http_async_client=_create_http_client(settings.ocr.max_concurrency),
+            )
         case MistralAiConfig():
+            # Requests are sent to relative URLs, with the API key in the headers
             client = ChatMistralAI(
                 api_key=ocr_config.api_key,
                 temperature=0.0,
                 model_name=ocr_config.model,
-            ).with_structured_output(OCRData)
+                endpoint=MISTRAL_ENDPOINT,
+                max_concurrent_requests=settings.ocr.max_concurrency,
+                async_client=_create_http_client(
+                    settings.ocr.max_concurrency,
+                    base_url=MISTRAL_ENDPOINT,
+                    headers={
+                        "Content-Type": "application/json",
+                        "Accept": "application/json",
+                        "Authorization": f"Bearer {ocr_config.api_key}",
+                    },
+                ),
+            )
         case GeminiAiConfig():
+            # Multiplexes its requests over its own gRPC channel instead of httpx
             client = ChatGoogleGenerativeAI(
                 api_key=ocr_config.api_key,
                 temperature=0.0,
                 model=ocr_config.model,
-            ).with_structured_output(OCRData)
+            )
 
     logger.debug(f"Creating client {ocr_config}")
 
     return client
 
 
-async def extract_from_encoding_async(base64_image: str) -> List[dict]:
+def get_ocr_client(schema: Type[BaseModel] = OCRData) -> Runnable:
+    """
+    Returns the OCR client of the current settings. The client and its connection
+    pool are built once per event loop and reused by every page, and rebuilt only
+    when `load_settings(reload_settings=True)` changed the OCR configuration.
+
+    Args:
+        schema (Type[BaseModel]): The structured output of the client, `OCRData` or
+            `PackedOCRData`.
+
+    Returns:
+        Runnable: An AI client for OCR extraction.
+    """
+    settings = load_settings()
+    key = _client_key(settings)
+    loop = asyncio.get_running_loop()
+
+    cached = _clients.get(loop)
+    if cached is None or cached[0] != key:
+        # A replaced client and its pool are released once in-flight pages drop them
+        cached = (key, _create_ocr_client(settings), {})
+        _clients[loop] = cached
+        logger.info(f"Built OCR client for {type(settings.selected_config).__name__}")
+
+    _, chat_model, clients = cached
+    if schema not in clients:
+        clients[schema] = chat_model.with_structured_output(schema)
+    return clients[schema]
+
+
+async def extract_from_encoding_async(
+    base64_image: str, mime_type: str = "image/jpeg"
+) -> List[dict]:
     """
     Extracts names and addresses from single ballot image asynchronously.
     Uses base64_image
 
     Args:
         base64_image: The base64 encoded image to extract data from.
+        mime_type (str): The MIME type of the image, see `ImageEncoding`.
 
     Returns:
         list: A list of dictionaries with the OCR data.
@@ -85,21 +217,14 @@ async def extract_from_encoding_async(base64_image: str) -> List[dict]:
     logger.debug("Starting OCR extraction for image")
 
     try:
-        # AI client definition
-        client = _create_ocr_client()
+        # AI client shared by every page
+        client = get_ocr_client()
         # prompt message
         messages = [
-            {
-                "type": "text",
-                "text": """Using the written text in the image create a list of dictionaries where each dictionary consists of keys 'Name', 'Address', 'Date', and 'Ward'. Fill in the values of each dictionary with the correct entries for each key. Write all the values of the dictionary in full. Only output the list of dictionaries. No other intro text is necessary.""",
-            },
-            {
-                "type": "text",
-                "text": """Remove the city name 'Washington, DC' and any zip codes from the 'Address' values.""",
-            },
+            *({"type": "text", "text": prompt} for prompt in OCR_PROMPTS),
             {
                 "type": "image_url",
-                "image_url": {"url": f"data:image/jpeg;base64,{base64_image}"},
+                "image_url": {"url": f"data:{mime_type};base64,{base64_image}"},
             },
         ]
 
@@ -115,3 +240,56 @@ async def extract_from_encoding_async(base64_image: str) -> List[dict]:
     except Exception as e:
         logger.error(f"Error in OCR extraction: {str(e)}")
         raise
+
+
+async def extract_from_encodings_async(
+    base64_images: List[str], mime_type: str = "image/jpeg"
+) -> List[List[dict]]:
+    """
+    Extracts names and addresses from several ballot images in one request. The
+    prompt is sent once for all the images, and each row is returned with the
+    number of the image it was read from.
+
+    Args:
+        base64_images (List[str]): The base64 encoded images to extract data from.
+        mime_type (str): The MIME type of the images, see `ImageEncoding`.
+
+    Returns:
+        List[List[dict]]: The OCR data of each image, in the order given.
+    """
+    logger.debug(f"Starting OCR extraction for {len(base64_images)} images")
+
+    try:
+        client = get_ocr_client(PackedOCRData)
+        messages = [
+            *({"type": "text", "text": prompt} for prompt in OCR_PROMPTS),
+            {"type": "text", "text": OCR_PACKED_PROMPT},
+        ]
+        for image_no, base64_image in enumerate(base64_images, start=1):
+            messages.append({"type": "text", "text": f"Image {image_no}:"})
+            messages.append(
+                {
+                    "type": "image_url",
+                    "image_url": {"url": f"data:{mime_type};base64,{base64_image}"},
+                }
+            )
+
+        results = await client.ainvoke([HumanMessage(content=messages)])
+
+        # Rows split back per image, without the image number
+        pages = [[] for _ in base64_images]
+        for row in json.loads(results.json())["Data"]:
+            image_no = row.pop("Page")
+            if 1 <= image_no <= len(pages):
+                pages[image_no - 1].append(row)
+            else:
+                logger.warning(f"Dropped OCR row of unknown image {image_no}")
+        logger.debug(
+            f"Successfully extracted {sum(map(len, pages))} entries from "
+            f"{len(pages)} images"
+        )
+        return pages
+
+    except Exception as e:
+        logger.error(f"Error in OCR extraction: {str(e)}")
+        raise
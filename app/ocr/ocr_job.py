@@ -0,0 +1,252 @@
+import asyncio
+import hashlib
+import json
+import time
+from typing import Dict, List, Optional
+
+from utils.app_logger import logger
+from voter_records.tables import OcrJob, OcrPage
+
+from .scheduler import PageResult
+
+
+def job_key(file_path: str, scope: str) -> str:
+    """
+    Identifies an OCR job by the content of its PDF and the OCR configuration, so a
+    re-uploaded copy of the same file resumes the same job.
+
+    Args:
+        file_path (str): Path to the PDF file.
+        scope (str): Description of the OCR configuration, see `ocr_scope`.
+
+    Returns:
+        str: Hex SHA-256 digest of the file and the scope.
+    """
+    digest = hashlib.sha256(scope.encode("utf-8"))
+    with open(file_path, "rb") as pdf_file:
+        while chunk := pdf_file.read(1024 * 1024):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class OcrCheckpoint:
+    """
+    Per-page results of an OCR job, saved in the `OcrJob` and `OcrPage` tables as
+    pages finish. Finished pages are written in batches of `batch_size`, or after
+    `flush_interval` seconds, so checkpointing does not slow the OCR down. When the
+    same PDF is OCR'd again after a crash, the pages already read are skipped.
+
+    Pages whose write fails stay queued and are written with the next batch. If the
+    database stays unavailable, the job finishes with the pages of this run as
+    they are kept in memory, and it is simply not resumable.
+    """
+
+    def __init__(
+        self,
+        job_id: int,
+        completed: Dict[int, List[dict]],
+        batch_size: int = 50,
+        flush_interval: float = 5.0,
+    ):
+        self.job_id = job_id
+        self.completed = completed
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._pending: List[PageResult] = []
+        # Every page finished by this run, in case the checkpoints cannot be read
+        self._results: Dict[int, PageResult] = {}
+        self._flushes = set()
+        self._last_flush = time.monotonic()
+        self._retry_after = 0.0
+
+    @classmethod
+    async def open(
+        cls,
+        file_path: str,
+        filename: str,
+        total_pages: int,
+        scope: str,
+        batch_size: int = 50,
+        flush_interval: float = 5.0,
+    ) -> "OcrCheckpoint":
+        """
+        Resumes the unfinished job of a PDF, or starts a new one.
+
+        Args:
+            file_path (str): Path to the PDF file.
+            filename (str): The name of the PDF file.
+            total_pages (int): The number of pages to OCR.
+            scope (str): Description of the OCR configuration, see `ocr_scope`.
+            batch_size (int): Number of finished pages written at once.
+            flush_interval (float): Maximum number of seconds a finished page waits
+                to be written.
+
+        Returns:
+            OcrCheckpoint: The checkpoint of the job, with its completed pages.
+        """
+        key = job_key(file_path, scope)
+        job = (
+            await OcrJob.objects()
+            .where((OcrJob.key == key) & OcrJob.completed.eq(False))
+            .order_by(OcrJob.id, ascending=False)
+            .first()
+        )
+        if job is None:
+            job = OcrJob(key=key, filename=filename, total_pages=total_pages)
+            await job.save()
+            logger.info(f"Started OCR job {job.id} for {filename}")
+            return cls(job.id, {}, batch_size, flush_interval)
+
+        completed = {
+            page_no: result.rows
+            for page_no, result in (await cls._load(job.id)).items()
+            if result.error is None
+        }
+        logger.info(
+            f"Resuming OCR job {job.id} for {filename}: "
+            f"{len(completed)} pages already done"
+        )
+        return cls(job.id, completed, batch_size, flush_interval)
+
+    def get(self, page_no: int) -> Optional[List[dict]]:
+        """
+        Looks up the rows of a page completed by an earlier run of the job.
+
+        Args:
+            page_no (int): The page number, from 0.
+
+        Returns:
+            Optional[List[dict]]: The rows of the page, or None if it is not done.
+        """
+        return self.completed.get(page_no)
+
+    def add(self, result: PageResult) -> None:
+        """
+        Queues a finished page to be written. Must be called from the event loop.
+
+        Args:
+            result (PageResult): The OCR outcome of the page.
+        """
+        if result.page_no in self.completed:
+            return
+        self._results[result.page_no] = result
+        self._pending.append(result)
+        now = time.monotonic()
+        if now >= self._retry_after and (
+            len(self._pending) >= self.batch_size
+            or now - self._last_flush >= self.flush_interval
+        ):
+            flush = asyncio.ensure_future(self.flush())
+            self._flushes.add(flush)
+            flush.add_done_callback(self._flushes.discard)
+
+    async def flush(self) -> None:
+        """
+        Writes the queued pages in one statement. If the write fails, the pages are
+        queued again and the next batch is not tried before `flush_interval`.
+        """
+        pending, self._pending = self._pending, []
+        self._last_flush = time.monotonic()
+        if not pending:
+            return
+        # A page is written once per job: a later attempt replaces the earlier
+        # one, and a batch whose write failed after committing is not duplicated
+        latest = {result.page_no: result for result in pending}
+        try:
+            await OcrPage.insert(
+                *[
+                    OcrPage(
+                        job=self.job_id,
+                        page_no=result.page_no,
+                        rows=json.dumps(result.rows),
+                        error=result.error,
+                    )
+                    for result in latest.values()
+                ]
+            ).on_conflict(
+                target=(OcrPage.job, OcrPage.page_no),
+                action="DO UPDATE",
+                values=[OcrPage.rows, OcrPage.error],
+            )
+        except Exception as e:
+            # Pages queued meanwhile go after the ones of this batch
+            self._pending[:0] = pending
+            self._retry_after = time.monotonic() + self.flush_interval
+            logger.warning(
+                f"Could not checkpoint {len(pending)} pages of OCR job "
+                f"{self.job_id}, retrying with the next batch: {e}"
+            )
+            return
+        for result in latest.values():
+            if result.error is None:
+                self.completed[result.page_no] = result.rows
+        logger.debug(f"Checkpointed {len(pending)} pages of OCR job {self.job_id}")
+
+    async def finish(self, total_pages: int) -> List[PageResult]:
+        """
+        Writes the remaining pages and rebuilds the results of the job from its
+        checkpoints. The job is marked completed when no page failed. When the
+        checkpoints cannot be written or read, the results are rebuilt from the
+        pages kept in memory instead.
+
+        Args:
+            total_pages (int): The number of pages OCR'd.
+
+        Returns:
+            List[PageResult]: The result of every page, in page order.
+        """
+        if self._flushes:
+            await asyncio.gather(*self._flushes)
+        await self.flush()
+        if self._pending:
+            logger.warning(
+                f"OCR job {self.job_id} is not resumable, "
+                f"{len(self._pending)} pages could not be checkpointed"
+            )
+            return self._results_in_memory(total_pages)
+
+        try:
+            saved = await self._load(self.job_id)
+        except Exception as e:
+            logger.warning(
+                f"Could not read the checkpoints of OCR job {self.job_id}: {e}"
+            )
+            return self._results_in_memory(total_pages)
+        results = [
+            saved.get(page_no, PageResult(page_no, error="Missing checkpoint"))
+            for page_no in range(total_pages)
+        ]
+        if not any(result.error for result in results):
+            try:
+                await OcrJob.update({OcrJob.completed: True}).where(
+                    OcrJob.id == self.job_id
+                )
+            except Exception as e:
+                logger.warning(f"Could not mark OCR job {self.job_id} completed: {e}")
+            else:
+                logger.info(f"OCR job {self.job_id} completed")
+        return results
+
+    def _results_in_memory(self, total_pages: int) -> List[PageResult]:
+        results = []
+        for page_no in range(total_pages):
+            if page_no in self._results:
+                results.append(self._results[page_no])
+            elif page_no in self.completed:
+                results.append(PageResult(page_no, self.completed[page_no]))
+            else:
+                results.append(PageResult(page_no, error="Missing checkpoint"))
+        return results
+
+    @staticmethod
+    async def _load(job_id: int) -> Dict[int, PageResult]:
+        rows = (
+            await OcrPage.select(OcrPage.page_no, OcrPage.rows, OcrPage.error)
+            .where(OcrPage.job == job_id)
+            .order_by(OcrPage.id)
+            .output(load_json=True)
+        )
+        return {
+            row["page_no"]: PageResult(row["page_no"], row["rows"], row["error"])
+            for row in rows
+        }
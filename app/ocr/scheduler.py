@@ -0,0 +1,326 @@
+import asyncio
+import random
+import time
+from dataclasses import dataclass, field
+from typing import AsyncIterable, Awaitable, Callable, List, Optional, Tuple
+
+from utils.app_logger import logger
+
+
+@dataclass
+class PageResult:
+    """OCR outcome of one page: its rows, or the error of its last attempt."""
+
+    page_no: int
+    rows: List[dict] = field(default_factory=list)
+    error: Optional[str] = None
+    attempts: int = 0
+
+
+def _status_code(error: BaseException) -> Optional[int]:
+    # OpenAI and Mistral errors carry `status_code`, Google errors `code`, and
+    # httpx errors a `response`
+    for attribute in ("status_code", "code"):
+        value = getattr(error, attribute, None)
+        if isinstance(value, int):
+            return value
+    value = getattr(getattr(error, "response", None), "status_code", None)
+    return value if isinstance(value, int) else None
+
+
+def _retry_after(error: BaseException) -> Optional[float]:
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+def is_throttled(error: BaseException) -> bool:
+    """
+    Tells whether an OCR request failed because the provider is rate limiting.
+
+    Args:
+        error (BaseException): The error raised by the request.
+
+    Returns:
+        bool: True for HTTP 429 responses.
+    """
+    return _status_code(error) == 429
+
+
+def is_retryable(error: BaseException) -> bool:
+    """
+    Tells whether an OCR request may succeed when retried: rate limiting, server
+    errors, timeouts and dropped connections.
+
+    Args:
+        error (BaseException): The error raised by the request.
+
+    Returns:
+        bool: True if the request should be retried.
+    """
+    status_code = _status_code(error)
+    if status_code is not None:
+        return status_code == 429 or status_code >= 500
+    name = type(error).__name__
+    return isinstance(error, (TimeoutError, ConnectionError)) or any(
+        part in name for part in ("Timeout", "Connect")
+    )
+
+
+class _MinuteBudget:
+    """Token bucket refilled continuously with `per_minute` units per minute."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.rate = per_minute / 60
+        self.available = per_minute
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self, amount: float) -> None:
+        amount = min(amount, self.capacity)
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.available = min(
+                    self.capacity, self.available + (now - self.updated) * self.rate
+                )
+                self.updated = now
+                if self.available >= amount:
+                    self.available -= amount
+                    return
+                await asyncio.sleep((amount - self.available) / self.rate)
+
+
+class _AdaptiveLimit:
+    """
+    Concurrency limit adjusted AIMD-style: it grows by one after a window of
+    successful requests and halves when the provider throttles, at most once per
+    `cooldown` seconds so one burst of 429s counts once.
+    """
+
+    def __init__(self, maximum: int, minimum: int = 1, cooldown: float = 1.0):
+        self.maximum = maximum
+        self.minimum = minimum
+        self.cooldown = cooldown
+        self.limit = float(maximum)
+        self.in_flight = 0
+        self.last_decrease = -cooldown
+        self.condition = asyncio.Condition()
+
+    async def acquire(self) -> None:
+        async with self.condition:
+            await self.condition.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+
+    async def release(self, throttled: bool = False) -> None:
+        async with self.condition:
+            self.in_flight -= 1
+            now = time.monotonic()
+            if throttled:
+                if now - self.last_decrease >= self.cooldown:
+                    self.limit = max(self.minimum, self.limit / 2)
+                    self.last_decrease = now
+                    logger.info(f"OCR throttled, concurrency down to {int(self.limit)}")
+            else:
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            self.condition.notify_all()
+
+
+class OcrScheduler:
+    """
+    Sliding-window scheduler for OCR requests. Up to `max_concurrency` requests are
+    in flight at any time, a new one starting as soon as one finishes, within the
+    provider's requests and tokens per minute budgets. Throttled and failed requests
+    are retried with jittered exponential backoff, throttling halves the concurrency,
+    and pages that still fail are recorded in their `PageResult` instead of stopping
+    the run. With a `pack_size` above 1, consecutive pages are sent `pack_size` at a
+    time in one request. A single page may be sent as `requests_per_page` requests,
+    e.g. one per row strip, which are counted against the requests per minute.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 10,
+        min_concurrency: int = 1,
+        requests_per_minute: int = 0,
+        tokens_per_minute: int = 0,
+        tokens_per_page: int = 1500,
+        max_retries: int = 5,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+        pack_size: int = 1,
+        requests_per_page: int = 1,
+    ):
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min(min_concurrency, max_concurrency)
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.tokens_per_page = tokens_per_page
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.pack_size = max(1, pack_size)
+        self.requests_per_page = max(1, requests_per_page)
+
+    @classmethod
+    def from_config(
+        cls, ocr_config, max_concurrency: Optional[int] = None
+    ) -> "OcrScheduler":
+        """
+        Builds the scheduler from the `[ocr]` section of the settings file.
+
+        Args:
+            ocr_config (OcrConfig): The OCR settings.
+            max_concurrency (int): Overrides `ocr_config.max_concurrency` when given.
+
+        Returns:
+            OcrScheduler: The configured scheduler.
+        """
+        return cls(
+            max_concurrency=max_concurrency or ocr_config.max_concurrency,
+            requests_per_minute=ocr_config.requests_per_minute,
+            tokens_per_minute=ocr_config.tokens_per_minute,
+            tokens_per_page=ocr_config.tokens_per_page,
+            max_retries=ocr_config.max_retries,
+            pack_size=ocr_config.pages_per_request,
+            # Pages are only split into strips when sent one per request
+            requests_per_page=(
+                ocr_config.strips_per_page if ocr_config.pages_per_request <= 1 else 1
+            ),
+        )
+
+    async def run(
+        self,
+        pages: AsyncIterable[str],
+        ocr: Callable[[str], Awaitable[List[dict]]],
+        on_page_done: Optional[Callable[[PageResult], None]] = None,
+        lookup: Optional[Callable[[int, str], Optional[List[dict]]]] = None,
+        ocr_pack: Optional[Callable[[List[str]], Awaitable[List[List[dict]]]]] = None,
+    ) -> List[PageResult]:
+        """
+        OCRs every page, pulling the next page only when a request slot is free.
+        Pages found by `lookup` are not requested and use no slot or budget.
+
+        Args:
+            pages (AsyncIterable[str]): The base64 encoded page images, in page order.
+            ocr (Callable[[str], Awaitable[List[dict]]]): The OCR request of a page,
+                e.g. `extract_from_encoding_async`.
+            on_page_done (Callable[[PageResult], None]): Optional callback run as
+                each page finishes, e.g. to report progress.
+            lookup (Callable[[int, str], Optional[List[dict]]]): Optional lookup
+                of the rows of an already OCR'd page, by page number and image,
+                e.g. in an `OcrCache`. Returns None for pages to request.
+            ocr_pack (Callable[[List[str]], Awaitable[List[List[dict]]]]): The OCR
+                request of several pages, e.g. `extract_from_encodings_async`, used
+                when `pack_size` is above 1. A last pack of a single page is sent
+                with `ocr`.
+
+        Returns:
+            List[PageResult]: The result of every page, in page order.
+        """
+        pack_size = self.pack_size if ocr_pack is not None else 1
+        # Budgets and limit are per run, as they belong to the running event loop
+        self._limit = _AdaptiveLimit(self.max_concurrency, self.min_concurrency)
+        # (budget, units per request, units per page)
+        self._budgets = []
+        if self.requests_per_minute > 0:
+            self._budgets.append((_MinuteBudget(self.requests_per_minute), 1, 0))
+        if self.tokens_per_minute > 0:
+            self._budgets.append(
+                (_MinuteBudget(self.tokens_per_minute), 0, self.tokens_per_page)
+            )
+
+        results = []
+        tasks = set()
+
+        async def send(pack: List[Tuple[int, str]]) -> None:
+            await self._limit.acquire()
+            task = asyncio.create_task(self._run_pack(pack, ocr, ocr_pack))
+            task.add_done_callback(
+                lambda done: self._finish(done, results, tasks, on_page_done)
+            )
+            tasks.add(task)
+
+        pack = []
+        page_no = 0
+        async for encoding in pages:
+            rows = lookup(page_no, encoding) if lookup else None
+            if rows is not None:
+                result = PageResult(page_no, rows)
+                results.append(result)
+                if on_page_done:
+                    on_page_done(result)
+            else:
+                pack.append((page_no, encoding))
+                if len(pack) == pack_size:
+                    await send(pack)
+                    pack = []
+            page_no += 1
+        if pack:
+            await send(pack)
+        if tasks:
+            await asyncio.gather(*tasks)
+
+        failed = [result.page_no + 1 for result in results if result.error]
+        if failed:
+            logger.error(f"OCR failed for {len(failed)} pages: {failed}")
+        return sorted(results, key=lambda result: result.page_no)
+
+    @staticmethod
+    def _finish(task, results, tasks, on_page_done) -> None:
+        tasks.discard(task)
+        for result in task.result():
+            results.append(result)
+            if on_page_done:
+                on_page_done(result)
+
+    async def _run_pack(
+        self,
+        pack: List[Tuple[int, str]],
+        ocr: Callable[[str], Awaitable[List[dict]]],
+        ocr_pack: Optional[Callable[[List[str]], Awaitable[List[List[dict]]]]],
+    ) -> List[PageResult]:
+        # Called with a slot of the concurrency limit already held
+        results = [PageResult(page_no) for page_no, _ in pack]
+        requests = self.requests_per_page if len(pack) == 1 else 1
+        encodings = [encoding for _, encoding in pack]
+        pages = "page" + ("s " if len(pack) > 1 else " ")
+        pages += ", ".join(str(page_no + 1) for page_no, _ in pack)
+        attempts = 0
+        while True:
+            attempts += 1
+            for result in results:
+                result.attempts = attempts
+            for budget, per_request, per_page in self._budgets:
+                await budget.acquire(per_request * requests + per_page * len(pack))
+            try:
+                if len(pack) == 1:
+                    page_rows = [await ocr(encodings[0])]
+                else:
+                    page_rows = await ocr_pack(encodings)
+            except Exception as e:
+                throttled = is_throttled(e)
+                await self._limit.release(throttled=throttled)
+                if not is_retryable(e) or attempts > self.max_retries:
+                    for result in results:
+                        result.error = f"{type(e).__name__}: {e}"
+                    return results
+
+                delay = random.uniform(
+                    0, min(self.max_delay, self.base_delay * 2 ** (attempts - 1))
+                )
+                delay = max(delay, _retry_after(e) or 0)
+                logger.warning(
+                    f"OCR of {pages} failed ({type(e).__name__}), "
+                    f"retrying in {delay:.1f} s"
+                )
+                await asyncio.sleep(delay)
+                await self._limit.acquire()
+            else:
+                await self._limit.release()
+                for result, rows in zip(results, page_rows):
+                    result.rows = rows
+                return results
@@ -1,16 +1,31 @@
-from typing import List
-import base64
+from typing import List, Optional, Union
 import os
+from contextlib import aclosing
 from tqdm.notebook import tqdm
 from dotenv import load_dotenv
 import pandas as pd
 import asyncio
-import fitz  # Add this import at the top with other imports
 
 import logging
 from datetime import datetime
 
-from ocr import extract_from_encoding_async
+from ocr import (
+    OCREntry,
+    OcrCache,
+    OcrCheckpoint,
+    OcrScheduler,
+    PageResult,
+    extract_from_encoding_async,
+    extract_from_encodings_async,
+    ocr_scope,
+)
+from settings import load_settings
+from pdf_rasterizer import (
+    ImageEncoding,
+    count_pages,
+    iter_encoded_pages,
+    prefetch_encoded_pages,
+)
 
 # Set up logging
 log_directory = "logs"
@@ -50,54 +65,33 @@ config = {"BASE_THRESHOLD": 85, "TOP_CROP": 0.385, "BOTTOM_CROP": 0.725}
 
 def collecting_pdf_encoded_images(file_path: str) -> List[str]:
     """Convert PDF pages to encoded images, cropping to target area.
-    Returns list of base64 encoded image strings."""
+    Returns list of base64 encoded image strings.
 
-    logger.info(f"Starting PDF conversion for file: {file_path}")
-    encoded_image_list = []
+    Every page is held in memory; `collect_ocr_data` streams the pages with
+    `prefetch_encoded_pages` instead."""
 
-    # Open PDF document
-    pdf_document = fitz.open(file_path)
-    logger.info(f"PDF opened successfully. Total pages: {len(pdf_document)}")
+    logger.info(f"Starting PDF conversion for file: {file_path}")
 
     print("\nCropping Images and Converting to Bytes Objects")
-    # Process each page
-    for page in tqdm(pdf_document):
-        # Get page dimensions
-        rect = page.rect
-        width = rect.width
-        height = rect.height
-
-        # Calculate crop rectangle
-        crop_rect = fitz.Rect(
-            0,  # left
-            height * config["TOP_CROP"],  # top
-            width,  # right
-            height * config["BOTTOM_CROP"],  # bottom
-        )
-
-        # Get pixmap with cropped area and grayscale
-        pix = page.get_pixmap(
-            matrix=fitz.Matrix(1, 1),  # zoom factors of 1 = 72 dpi
-            colorspace="gray",  # convert to grayscale
-            clip=crop_rect,  # crop to our target area
-        )
-
-        # Convert to bytes and encode
-        img_bytes = pix.tobytes(output="jpeg")
-        encoded = base64.b64encode(img_bytes).decode("utf-8")
-        encoded_image_list.append(encoded)
+    encoded_image_list = list(
+        tqdm(iter_encoded_pages(file_path), total=count_pages(file_path))
+    )
 
-    pdf_document.close()
     logger.info(
         f"Completed PDF conversion. Generated {len(encoded_image_list)} encoded images"
     )
     return encoded_image_list
 
 
+METADATA_COLUMNS = ["Page Number", "Row Number", "Filename"]
+
+
 # function for adding data
 def add_metadata(initial_data: List[dict], page_no: int, filename: str) -> List[dict]:
     """
-    Adds page number, row number, and filename metadata to the recognized signatures
+    Adds page number, row number, and filename metadata to the recognized signatures.
+    Rows are numbered in order, so the rows of the strips of a page, joined top to
+    bottom, keep their row number on the page.
 
     Args:
         initial_data (List[dict]): The initial data to add metadata to.
@@ -119,17 +113,6 @@ def add_metadata(initial_data: List[dict], page_no: int, filename: str) -> List[
     return final_data
 
 
-async def process_batch_async(encodings: List[str]) -> List[List[dict]]:
-    """
-    Process a batch of images concurrently
-    """
-    tasks = []
-    for encoding in encodings:
-        tasks.append(extract_from_encoding_async(encoding))
-    results = await asyncio.gather(*tasks)
-    return results
-
-
 def get_or_create_event_loop() -> asyncio.AbstractEventLoop:
     try:
         return asyncio.get_event_loop()
@@ -139,76 +122,242 @@ def get_or_create_event_loop() -> asyncio.AbstractEventLoop:
         return loop
 
 
-def collect_ocr_data(
+async def extract_from_strips_async(
+    strips: List[str], image_encoding: Optional[ImageEncoding] = None
+) -> List[dict]:
+    """
+    OCRs a page from its horizontal strips, cut between its signature rows by
+    `encode_page_strips`. The strips are OCR'd at the same time, so a long page
+    takes about as long as its longest strip.
+
+    Args:
+        strips (List[str]): The base64 encoded image of each strip, top to bottom.
+        image_encoding (ImageEncoding): The format of the strips. Defaults to JPEG.
+
+    Returns:
+        List[dict]: The rows of the page, top to bottom.
+    """
+    image_encoding = image_encoding or ImageEncoding()
+    strip_rows = await asyncio.gather(
+        *(
+            extract_from_encoding_async(strip, image_encoding.mime_type)
+            for strip in strips
+        )
+    )
+    return [row for rows in strip_rows for row in rows]
+
+
+async def _collect_ocr_pages_async(
+    file_path: str,
+    total_pages: int,
+    scheduler: OcrScheduler,
+    st_bar=None,
+    render_workers: Optional[int] = None,
+    ocr_cache: Optional[OcrCache] = None,
+    checkpoint_scope: Optional[str] = None,
+    strips_per_page: int = 1,
+    detect_table: bool = False,
+    image_encoding: Optional[ImageEncoding] = None,
+) -> List[PageResult]:
+    """
+    OCRs the pages through the scheduler as they are rendered. Rendering stays at
+    most `max_concurrency` requests ahead of the OCR, and pages found in the job
+    checkpoints or in `ocr_cache` are not requested. With a `checkpoint_scope`,
+    the results are saved as pages finish and rebuilt from the checkpoints. When
+    pages are sent one per request, they are rendered as `strips_per_page` strips,
+    OCR'd at the same time. With `detect_table`, pages are cropped to their
+    signature table when rendered, and they are rendered and encoded as set by
+    `image_encoding`.
+    """
+    image_encoding = image_encoding or ImageEncoding()
+    if scheduler.pack_size > 1:
+        strips_per_page = 1
+    done = 0
+    checkpoint = None
+    if checkpoint_scope is not None:
+        try:
+            checkpoint = await OcrCheckpoint.open(
+                file_path, os.path.basename(file_path), total_pages, checkpoint_scope
+            )
+        except Exception as e:
+            logger.warning(f"OCR checkpoints unavailable, not resumable: {e}")
+
+    def lookup(page_no: int, encoding: Union[str, List[str]]) -> Optional[List[dict]]:
+        rows = checkpoint.get(page_no) if checkpoint is not None else None
+        if rows is None and ocr_cache is not None:
+            rows = ocr_cache.get(encoding)
+        return rows
+
+    async def ocr(encoding: Union[str, List[str]]) -> List[dict]:
+        if isinstance(encoding, list):
+            rows = await extract_from_strips_async(encoding, image_encoding)
+        else:
+            rows = await extract_from_encoding_async(encoding, image_encoding.mime_type)
+        if ocr_cache is not None:
+            ocr_cache.set(encoding, rows)
+        return rows
+
+    async def ocr_pack(encodings: List[str]) -> List[List[dict]]:
+        page_rows = await extract_from_encodings_async(
+            encodings, image_encoding.mime_type
+        )
+        if ocr_cache is not None:
+            for encoding, rows in zip(encodings, page_rows):
+                ocr_cache.set(encoding, rows)
+        return page_rows
+
+    def report_progress(result: PageResult) -> None:
+        nonlocal done
+        done += 1
+        if checkpoint is not None:
+            checkpoint.add(result)
+        if st_bar:
+            st_bar.progress(
+                done / total_pages,
+                text="Processed {} of {} pages".format(done, total_pages),
+            )
+
+    async with aclosing(
+        prefetch_encoded_pages(
+            file_path,
+            total_pages,
+            prefetch=scheduler.max_concurrency * scheduler.pack_size,
+            max_workers=render_workers,
+            detect_table=detect_table,
+            image_encoding=image_encoding,
+            strips_per_page=strips_per_page,
+        )
+    ) as pages:
+        page_results = await scheduler.run(
+            pages, ocr, on_page_done=report_progress, lookup=lookup, ocr_pack=ocr_pack
+        )
+
+    if checkpoint is not None:
+        page_results = await checkpoint.finish(total_pages)
+    return page_results
+
+
+def collect_ocr_pages(
     filedir: str,
     filename: str,
-    max_page_num: int = None,
-    batch_size: int = 10,
+    max_page_num: Optional[int] = None,
+    batch_size: Optional[int] = None,
     st_bar=None,
-) -> List[dict]:
+    render_workers: Optional[int] = None,
+    resume: bool = True,
+) -> List[PageResult]:
     """
-    Collects OCR data from a PDF file.
+    OCRs every page of a PDF file and keeps the outcome of each page.
+
+    Pages are rendered lazily, just ahead of the OCR requests, so memory does not
+    grow with the length of the PDF. Requests are scheduled by an `OcrScheduler`
+    configured in the `[ocr]` section of the settings file: a new page starts as
+    soon as a request finishes, within the provider rate limits, and pages that keep
+    failing are recorded in their result instead of stopping the run. With
+    `pages_per_request` above 1, several pages are sent in each request, and with
+    `strips_per_page` above 1, each page is sent as strips of its rows. With
+    `detect_table`, each page is cropped to its signature table instead of the
+    fixed crop, so shifted or rescaled scans keep every row. Pages are rendered at
+    `image_dpi` and encoded as `image_format`, optionally binarized. Results are
+    cached by page image, engine, model and prompt, up to `cache_size_mb`, so pages
+    OCR'd before are read from the cache instead of being requested again.
+
+    The result of every page is also checkpointed in the `OcrJob` and `OcrPage`
+    tables as it finishes. If the run is interrupted, OCR'ing the same PDF again
+    resumes the job and only requests the pages not done yet.
 
     Args:
         filedir (str): The directory of the PDF file.
         filename (str): The name of the PDF file.
         max_page_num (int): The maximum number of pages to process.
-        batch_size (int): The number of pages to process in each batch.
+        batch_size (int): Maximum number of pages OCR'd at the same time. Defaults
+            to `max_concurrency` in the settings.
         st_bar (st.progress): A progress bar to display the progress of the OCR process.
+        render_workers (int): Number of processes rendering the pages. Defaults to
+            the CPU count.
+        resume (bool): Whether to checkpoint the pages and resume an unfinished
+            job of the same PDF.
 
     Returns:
-        list: A list of dictionaries with the OCR data.
+        List[PageResult]: The result of every page, in page order, with the page
+            number, row number and filename added to its rows.
     """
     logger.info(f"Starting OCR collection for {filename}")
     logger.info(f"Parameters - max_page_num: {max_page_num}, batch_size: {batch_size}")
 
-    # collecting images
-    encoded_images = collecting_pdf_encoded_images(os.path.join(filedir, filename))
+    file_path = os.path.join(filedir, filename)
+    total_pages = count_pages(file_path)
 
     # selecting pages
     if max_page_num:
-        encoded_images = encoded_images[:max_page_num]
+        total_pages = min(total_pages, max_page_num)
         logger.info(f"Limited processing to {max_page_num} pages")
 
     print()
-    print("Files Successfully Converted to Bytes")
     print("Performing OCR to read Names and Addresses")
 
-    full_data = []
-    total_pages = len(encoded_images)
+    settings = load_settings()
+    scheduler = OcrScheduler.from_config(settings.ocr, batch_size)
+    ocr_cache = OcrCache.from_config(settings)
+    logger.info(
+        f"Processing {total_pages} pages, up to {scheduler.max_concurrency} at a time"
+    )
 
     # getting event loop
     loop = get_or_create_event_loop()
-
-    # Process in batches
-    logger.info(f"Processing {total_pages} pages in batches of {batch_size}")
-    for i in tqdm(range(0, total_pages, batch_size)):
-        batch = encoded_images[i : i + batch_size]
+    page_results = loop.run_until_complete(
+        _collect_ocr_pages_async(
+            file_path,
+            total_pages,
+            scheduler,
+            st_bar,
+            render_workers,
+            ocr_cache,
+            checkpoint_scope=ocr_scope(settings) if resume else None,
+            strips_per_page=settings.ocr.strips_per_page,
+            detect_table=settings.ocr.detect_table,
+            image_encoding=ImageEncoding.from_config(settings.ocr),
+        )
+    )
+    if ocr_cache is not None:
         logger.info(
-            f"Processing batch {i // batch_size + 1} of {(total_pages + batch_size - 1) // batch_size}"
+            f"OCR cache: {ocr_cache.hits} pages cached, {ocr_cache.misses} requested"
         )
 
-        if st_bar:
-            st_bar.progress(
-                i / total_pages,
-                text="Processing pages {} to {} (of {})".format(
-                    i + 1, i + batch_size, total_pages
-                ),
-            )
+    for result in page_results:
+        result.rows = add_metadata(result.rows, result.page_no, filename)
+    return page_results
 
-        # Run async batch processing using the event loop
-        batch_results = loop.run_until_complete(process_batch_async(batch))
 
-        # Add metadata for each result in the batch
-        for page_idx, result in enumerate(batch_results):
-            current_page = i + page_idx
-            ocr_data = add_metadata(result, current_page, filename)
-            full_data.extend(ocr_data)
+def collect_ocr_data(
+    filedir: str,
+    filename: str,
+    max_page_num: Optional[int] = None,
+    batch_size: Optional[int] = None,
+    st_bar=None,
+    render_workers: Optional[int] = None,
+) -> List[dict]:
+    """
+    Collects OCR data from a PDF file, see `collect_ocr_pages`. Pages whose OCR
+    failed contribute no rows.
 
-        logger.info(
-            f"Batch {i // batch_size + 1} complete. Processed {len(batch_results)} pages"
-        )
+    Args:
+        filedir (str): The directory of the PDF file.
+        filename (str): The name of the PDF file.
+        max_page_num (int): The maximum number of pages to process.
+        batch_size (int): Maximum number of pages OCR'd at the same time. Defaults
+            to `max_concurrency` in the settings.
+        st_bar (st.progress): A progress bar to display the progress of the OCR process.
+        render_workers (int): Number of processes rendering the pages. Defaults to
+            the CPU count.
 
+    Returns:
+        list: A list of dictionaries with the OCR data.
+    """
+    page_results = collect_ocr_pages(
+        filedir, filename, max_page_num, batch_size, st_bar, render_workers
+    )
+    full_data = [row for result in page_results for row in result.rows]
     logger.info(f"OCR collection complete. Total entries: {len(full_data)}")
     return full_data
 
@@ -216,19 +365,26 @@ def collect_ocr_data(
 def create_ocr_df(
     filedir: str,
     filename: str,
-    max_page_num: int = None,
-    batch_size: int = 10,
+    max_page_num: Optional[int] = None,
+    batch_size: Optional[int] = None,
     st_bar=None,
+    render_workers: Optional[int] = None,
 ) -> pd.DataFrame:
     """
     Creates a dataframe from OCR data.
 
+    Pages whose OCR failed are listed in `ocr_df.attrs["failed_pages"]`, with their
+    page number and error, instead of failing the whole run.
+
     Args:
         filedir (str): The directory of the PDF file.
         filename (str): The name of the PDF file.
         max_page_num (int): The maximum number of pages to process.
-        batch_size (int): The number of pages to process in each batch.
+        batch_size (int): Maximum number of pages OCR'd at the same time. Defaults
+            to `max_concurrency` in the settings.
         st_bar (st.progress): A progress bar to display the progress of the OCR process.
+        render_workers (int): Number of processes rendering the pages. Defaults to
+            the CPU count.
 
     Returns:
         pd.DataFrame: A dataframe with the OCR data.
@@ -236,16 +392,26 @@ def create_ocr_df(
     logger.info("Starting OCR DataFrame creation")
 
     # gathering ocr_data
-    ocr_data = collect_ocr_data(
+    page_results = collect_ocr_pages(
         filedir,
         filename,
         max_page_num=max_page_num,
         batch_size=batch_size,
         st_bar=st_bar,
+        render_workers=render_workers,
     )
 
     # convert dataframe
-    ocr_df = pd.DataFrame(data=ocr_data)
+    ocr_data = [row for result in page_results for row in result.rows]
+    ocr_df = pd.DataFrame(
+        data=ocr_data,
+        columns=None if ocr_data else [*OCREntry.model_fields, *METADATA_COLUMNS],
+    )
+    ocr_df.attrs["failed_pages"] = [
+        {"Page Number": result.page_no + 1, "Error": result.error}
+        for result in page_results
+        if result.error
+    ]
     logger.info(f"Created DataFrame with shape: {ocr_df.shape}")
 
     # renaming columns
@@ -11,7 +11,9 @@ import fitz  # PyMuPDF
 from PIL import Image
 
 from ocr_helper import create_ocr_df
-from fuzzy_match_helper import create_select_voter_records, create_ocr_matched_df
+from fuzzy_match_helper import VoterRoll, load_voter_match_index, create_ocr_matched_df
+from matching import MatchCache, ScorerCascade, hash_voter_file
+from settings import load_settings
 
 
 # setting up logger for benchmarking, comment in to write logs to data/logs/benchmark_logs.log
@@ -53,6 +55,8 @@ def wipe_all_temp_files():
             del st.session_state.voter_records_df
         if "processed_results" in st.session_state:
             del st.session_state.processed_results
+        if "failed_pages" in st.session_state:
+            del st.session_state.failed_pages
         if "signature_file" in st.session_state:
             del st.session_state.signature_file
         if "voter_records_file" in st.session_state:
@@ -128,6 +132,8 @@ if "progress_text" not in st.session_state:
 def load_voter_records(voter_records_file):
     """Cache and process voter records file"""
     df = pd.read_csv(voter_records_file, dtype=str)
+    # Hashed once per upload, to find the match index of the roll
+    df.attrs["roll_hash"] = hash_voter_file(voter_records_file)
 
     # Create necessary columns
     df["Full Name"] = df["First_Name"] + " " + df["Last_Name"]
@@ -143,6 +149,14 @@ def load_voter_records(voter_records_file):
     return df
 
 
+@st.cache_resource
+def load_voter_roll(roll_hash, _voter_records):
+    """Cache the voter roll opened from its match index"""
+    return VoterRoll.from_index(
+        load_voter_match_index(_voter_records, roll_hash=roll_hash)
+    )
+
+
 @st.cache_data
 def load_signatures(signatures_file):
     """Cache and process signatures PDF file"""
@@ -180,6 +194,7 @@ with st.sidebar:
             - Street_Name
             - Street_Type
             - Street_Dir_Suffix
+            - Ward (optional, enables ward-aware matching)
         - *Example: Download a sample of fake voter records [here](https://github.com/Civic-Tech-Ballot-Inititiave/Ballot-Initiative/blob/main/sample_data/fake_voter_records.csv).*
         """)
 
@@ -229,7 +244,8 @@ with col1:
     #### 📄 Voter Records
     Upload your CSV file containing voter registration data.
     Required columns: `First_Name`, `Last_Name`, `Street_Number`, 
-                             `Street_Name`, `Street_Type`, `Street_Dir_Suffix`
+                             `Street_Name`, `Street_Type`, `Street_Dir_Suffix`.
+    Optional column: `Ward`
     """)
 
     voter_records = st.file_uploader(
@@ -412,8 +428,9 @@ with col2:
                         text=st.session_state.progress_text,
                     )
 
-                    select_voter_records = create_select_voter_records(
-                        st.session_state.voter_records_df
+                    voter_records_df = st.session_state.voter_records_df
+                    voter_roll = load_voter_roll(
+                        voter_records_df.attrs["roll_hash"], voter_records_df
                     )
 
                     if st.session_state.processing_cancelled:
@@ -428,9 +445,23 @@ with col2:
                         text=st.session_state.progress_text,
                     )
 
-                    ocr_matched_df = create_ocr_matched_df(
-                        ocr_df, select_voter_records, threshold=config["BASE_THRESHOLD"]
-                    )
+                    matching_config = load_settings().matching
+                    with voter_roll.process_pool(
+                        matching_config.workers
+                    ) as process_pool:
+                        ocr_matched_df = create_ocr_matched_df(
+                            ocr_df,
+                            voter_roll.store,
+                            threshold=config["BASE_THRESHOLD"],
+                            exact_index=voter_roll.exact_index,
+                            process_pool=process_pool,
+                            ward_index=voter_roll.ward_index,
+                            tfidf_index=voter_roll.tfidf_index(matching_config),
+                            scorer_cascade=ScorerCascade.from_config(matching_config),
+                            match_cache=MatchCache.from_config(
+                                matching_config, voter_roll.roll_hash
+                            ),
+                        )
 
                     st.session_state.current_progress = 1.0
                     st.session_state.progress_text = "Complete!"
@@ -440,6 +471,7 @@ with col2:
                     )
 
                     st.session_state.processed_results = ocr_matched_df
+                    st.session_state.failed_pages = ocr_df.attrs.get("failed_pages", [])
                     matching_bar.empty()
                     st.session_state.is_processing = False
                     st.session_state.is_processing_complete = True
@@ -477,6 +509,14 @@ if st.session_state.get("processed_results") is not None:
     results_df = st.session_state.processed_results.copy()
     results_df["Valid"] = results_df["Match Score"] >= config["BASE_THRESHOLD"]
 
+    failed_pages = st.session_state.get("failed_pages")
+    if failed_pages:
+        st.warning(
+            f"⚠️ OCR failed for {len(failed_pages)} pages, their signatures are "
+            "missing: pages "
+            + ", ".join(str(page["Page Number"]) for page in failed_pages)
+        )
+
     tabs = st.tabs(["📊 Data Table", "📈 Statistics"])
     if st.session_state.processing_time:
         st.caption(f"Processing time: {st.session_state.processing_time:.2f} seconds")
@@ -0,0 +1,605 @@
+import asyncio
+import base64
+import io
+import multiprocessing
+import os
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import AsyncIterator, Iterator, List, Optional, Tuple, Union
+
+import fitz  # PyMuPDF
+import numpy as np
+
+from settings.settings_repo import config
+from utils import logger
+
+# Marks the end of the pages in the prefetch queue
+_DONE = object()
+
+# Share of ink pixels below which a pixel row is blank, and share of inked or
+# grey pixels, as thin lines are anti-aliased at 72 dpi, above which it is a ruled
+# line of the signature table
+_BLANK_ROW_INK = 0.005
+_RULE_ROW_INK = 0.6
+
+# Pixels kept around a detected signature table
+_TABLE_MARGIN = 2
+
+# MIME type of each image format pages can be encoded in
+IMAGE_FORMATS = {"jpeg": "image/jpeg", "png": "image/png", "webp": "image/webp"}
+
+
+@dataclass(frozen=True)
+class ImageEncoding:
+    """
+    How rendered pages are encoded for the OCR: the resolution, the image format
+    and its quality, from 1 to 100 for JPEG and WebP, and whether the page is
+    binarized to black ink on white before encoding. The defaults are grayscale
+    JPEGs at 72 dpi.
+    """
+
+    dpi: int = 72
+    format: str = "jpeg"
+    quality: int = 95
+    binarize: bool = False
+
+    def __post_init__(self):
+        if self.format not in IMAGE_FORMATS:
+            raise ValueError(
+                f"Unknown image format {self.format!r}, "
+                f"expected one of {', '.join(IMAGE_FORMATS)}"
+            )
+
+    @property
+    def mime_type(self) -> str:
+        return IMAGE_FORMATS[self.format]
+
+    @classmethod
+    def from_config(cls, ocr_config) -> "ImageEncoding":
+        """
+        Builds the encoding from the `[ocr]` section of the settings file.
+
+        Args:
+            ocr_config (OcrConfig): The OCR settings.
+
+        Returns:
+            ImageEncoding: The configured encoding.
+        """
+        return cls(
+            dpi=ocr_config.image_dpi,
+            format=ocr_config.image_format,
+            quality=ocr_config.image_quality,
+            binarize=ocr_config.binarize,
+        )
+
+
+def count_pages(file_path: str) -> int:
+    """
+    Counts the pages of a PDF without rendering them.
+
+    Args:
+        file_path (str): Path to the PDF file.
+
+    Returns:
+        int: The number of pages.
+    """
+    with fitz.open(file_path) as pdf_document:
+        return len(pdf_document)
+
+
+def _gray_array(pix: fitz.Pixmap) -> np.ndarray:
+    # Pixel values of a grayscale pixmap, of shape (height, width)
+    if pix.n != 1:
+        pix = fitz.Pixmap(fitz.csGRAY, pix)
+    gray = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.stride)
+    return gray[:, : pix.width]
+
+
+def _otsu_threshold(gray: np.ndarray) -> int:
+    # Grey level best separating ink from paper, maximizing the between-class
+    # variance of the histogram
+    histogram = np.bincount(gray.ravel(), minlength=256).astype(float)
+    weights = np.cumsum(histogram)
+    means = np.cumsum(histogram * np.arange(256))
+    total = weights[-1]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        variance = (means[-1] * weights - means * total) ** 2 / (
+            weights * (total - weights)
+        )
+    return int(np.nan_to_num(variance[:-1]).argmax())
+
+
+def _encode_gray(
+    gray: np.ndarray, image_encoding: Optional[ImageEncoding] = None
+) -> str:
+    # Base64 encoded grayscale image of pixel values
+    image_encoding = image_encoding or ImageEncoding()
+    if image_encoding.binarize:
+        gray = np.where(gray > _otsu_threshold(gray), 255, 0).astype(np.uint8)
+    height, width = gray.shape
+    gray = np.ascontiguousarray(gray)
+
+    if image_encoding.format == "webp":
+        # MuPDF does not write WebP
+        from PIL import Image
+
+        buffer = io.BytesIO()
+        Image.fromarray(gray).save(
+            buffer, format="WEBP", quality=image_encoding.quality
+        )
+        data = buffer.getvalue()
+    else:
+        pix = fitz.Pixmap(fitz.csGRAY, width, height, gray.tobytes(), False)
+        if image_encoding.format == "png":
+            data = pix.tobytes(output="png")
+        else:
+            data = pix.tobytes(output="jpeg", jpg_quality=image_encoding.quality)
+    return base64.b64encode(data).decode("utf-8")
+
+
+def decode_page(encoding: str) -> np.ndarray:
+    """
+    Decodes an encoded page image, in any of the `IMAGE_FORMATS`.
+
+    Args:
+        encoding (str): The base64 encoded page image.
+
+    Returns:
+        np.ndarray: The grayscale pixel values, of shape (height, width).
+    """
+    data = base64.b64decode(encoding)
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        from PIL import Image
+
+        with Image.open(io.BytesIO(data)) as image:
+            return np.asarray(image.convert("L"))
+    return _gray_array(fitz.Pixmap(data))
+
+
+def find_table_region(
+    gray: np.ndarray, min_rows: int = 3
+) -> Optional[Tuple[int, int, int, int]]:
+    """
+    Finds the signature table of a rendered page from its horizontal projection
+    profile. Ruled lines are pixel rows with one dark run across at least half the
+    page, and the table is the longest sequence of ruled lines evenly spaced like
+    signature rows. Text lines never form such runs, as words are separated.
+
+    Args:
+        gray (np.ndarray): The grayscale page, of shape (height, width).
+        min_rows (int): The minimum number of rows, header included, of a table.
+
+    Returns:
+        Optional[Tuple[int, int, int, int]]: The left, top, right and bottom pixel
+            of the table with a small margin, or None if no table was found.
+    """
+    height, width = gray.shape
+    dark = gray < 230
+    # Tolerates lines skewed by a pixel across the page
+    dark[1:] |= gray[:-1] < 230
+    dark[:-1] |= gray[1:] < 230
+
+    # Longest dark run of every row, and the column where it ends
+    columns = np.arange(width)
+    runs = columns - np.maximum.accumulate(np.where(dark, -1, columns), axis=1)
+    run_lengths = runs.max(axis=1)
+    run_ends = runs.argmax(axis=1)
+    lines = _run_middles(run_lengths >= width / 2)
+
+    # Longest sequence of lines spaced like rows, each gap within a third of the
+    # mean gap so far
+    best = []
+    for start in range(len(lines)):
+        sequence = [lines[start]]
+        for line in lines[start + 1 :]:
+            gap = line - sequence[-1]
+            if not 0.015 * height <= gap <= 0.1 * height:
+                break
+            if len(sequence) > 1:
+                mean_gap = (sequence[-1] - sequence[0]) / (len(sequence) - 1)
+                if not 0.75 <= gap / mean_gap <= 1.33:
+                    break
+            sequence.append(line)
+        if len(sequence) > len(best):
+            best = sequence
+    if len(best) < min_rows + 1:
+        return None
+
+    best = np.array(best)
+    left = int((run_ends[best] - run_lengths[best] + 1).min())
+    right = int(run_ends[best].max()) + 1
+    return (
+        max(0, left - _TABLE_MARGIN),
+        max(0, int(best[0]) - _TABLE_MARGIN),
+        min(width, right + _TABLE_MARGIN),
+        min(height, int(best[-1]) + 1 + _TABLE_MARGIN),
+    )
+
+
+def _render_gray(
+    page: fitz.Page,
+    top_crop: float,
+    bottom_crop: float,
+    detect_table: bool,
+    image_encoding: ImageEncoding,
+) -> np.ndarray:
+    # Grayscale pixel values of the signature area of a page, before any encoding
+    # PDF pages measure 72 points per inch
+    zoom = fitz.Matrix(image_encoding.dpi / 72, image_encoding.dpi / 72)
+    if detect_table:
+        gray = _gray_array(page.get_pixmap(matrix=zoom, colorspace="gray"))
+        region = find_table_region(gray)
+        if region is not None:
+            left, top, right, bottom = region
+            return gray[top:bottom, left:right]
+        logger.debug(f"No signature table found on page {page.number + 1}")
+
+    rect = page.rect
+    crop_rect = fitz.Rect(
+        0, rect.height * top_crop, rect.width, rect.height * bottom_crop
+    )
+    pix = page.get_pixmap(matrix=zoom, colorspace="gray", clip=crop_rect)
+    return _gray_array(pix)
+
+
+def encode_page(
+    page: fitz.Page,
+    top_crop: float = config["TOP_CROP"],
+    bottom_crop: float = config["BOTTOM_CROP"],
+    detect_table: bool = False,
+    image_encoding: Optional[ImageEncoding] = None,
+) -> str:
+    """
+    Renders the signature area of a page to a base64 encoded grayscale image, a
+    JPEG at 72 dpi unless an `image_encoding` is given.
+
+    Args:
+        page (fitz.Page): The PDF page.
+        top_crop (float): Top of the signature table, as a fraction of the height.
+        bottom_crop (float): Bottom of the signature table, as a fraction of the
+            height.
+        detect_table (bool): Whether to crop to the signature table found by
+            `find_table_region`, so shifted scans keep every row. The fixed crop
+            is used when no table is found.
+        image_encoding (ImageEncoding): The resolution and format of the image.
+
+    Returns:
+        str: The base64 encoded image.
+    """
+    image_encoding = image_encoding or ImageEncoding()
+    gray = _render_gray(page, top_crop, bottom_crop, detect_table, image_encoding)
+    return _encode_gray(gray, image_encoding)
+
+
+def encode_page_strips(
+    page: fitz.Page,
+    n_strips: int,
+    top_crop: float = config["TOP_CROP"],
+    bottom_crop: float = config["BOTTOM_CROP"],
+    detect_table: bool = False,
+    image_encoding: Optional[ImageEncoding] = None,
+) -> List[str]:
+    """
+    Renders the signature area of a page, see `encode_page`, as `n_strips`
+    horizontal strips cut between its signature rows, see `find_strip_boundaries`.
+    The strips are cut from the rendered pixels and encoded once, so lossy formats
+    are not decoded and compressed a second time.
+
+    Args:
+        page (fitz.Page): The PDF page.
+        n_strips (int): The number of strips.
+        top_crop (float): Top of the signature table, as a fraction of the height.
+        bottom_crop (float): Bottom of the signature table, as a fraction of the
+            height.
+        detect_table (bool): Whether to crop to the signature table found by
+            `find_table_region`.
+        image_encoding (ImageEncoding): The resolution and format of the strips.
+
+    Returns:
+        List[str]: The base64 encoded image of each strip, top to bottom.
+    """
+    image_encoding = image_encoding or ImageEncoding()
+    gray = _render_gray(page, top_crop, bottom_crop, detect_table, image_encoding)
+    return _encode_strips(gray, n_strips, image_encoding)
+
+
+def find_strip_boundaries(gray: np.ndarray, n_strips: int) -> List[int]:
+    """
+    Chooses where to cut a page image into `n_strips` horizontal strips of about
+    the same height, without cutting through a signature row: each cut is moved to
+    the nearest ruled line of the table, or else to the nearest blank gap. Without
+    either, the strip is cut at its even height.
+
+    Args:
+        gray (np.ndarray): The grayscale image, of shape (height, width).
+        n_strips (int): The number of strips.
+
+    Returns:
+        List[int]: The pixel rows where the strips start and end, from 0 to the
+            height, in increasing order.
+    """
+    height = gray.shape[0]
+    rules = _run_middles((gray < 230).mean(axis=1) >= _RULE_ROW_INK)
+    gaps = _run_middles((gray < 128).mean(axis=1) <= _BLANK_ROW_INK)
+
+    boundaries = [0]
+    for strip in range(1, n_strips):
+        target = height * strip // n_strips
+        cut = target
+        for separators in (rules, gaps):
+            candidates = separators[separators > boundaries[-1]]
+            if not len(candidates):
+                continue
+            nearest = int(candidates[np.abs(candidates - target).argmin()])
+            # Only within half a strip, so strips keep about the same height
+            if abs(nearest - target) <= height / n_strips / 2:
+                cut = nearest
+                break
+        if boundaries[-1] < cut < height:
+            boundaries.append(cut)
+    boundaries.append(height)
+    return boundaries
+
+
+def _run_middles(rows: np.ndarray) -> np.ndarray:
+    # Middle index of every run of True values
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], rows, [0]))))
+    return (edges[0::2] + edges[1::2]) // 2
+
+
+def split_encoded_page(
+    encoding: str, n_strips: int, image_encoding: Optional[ImageEncoding] = None
+) -> List[str]:
+    """
+    Splits an encoded page image into horizontal strips along the gaps between
+    signature rows, see `find_strip_boundaries`, so the strips can be OCR'd at the
+    same time. Pages still to be rendered are better split by `encode_page_strips`,
+    which does not encode the image twice.
+
+    Args:
+        encoding (str): The base64 encoded grayscale page image.
+        n_strips (int): The number of strips.
+        image_encoding (ImageEncoding): The format of the strips, which should be
+            the one of the page. Defaults to JPEG.
+
+    Returns:
+        List[str]: The base64 encoded grayscale image of each strip, top to bottom.
+    """
+    return _encode_strips(decode_page(encoding), n_strips, image_encoding)
+
+
+def _encode_strips(
+    gray: np.ndarray, n_strips: int, image_encoding: Optional[ImageEncoding]
+) -> List[str]:
+    boundaries = find_strip_boundaries(gray, n_strips)
+    return [
+        _encode_gray(gray[top:bottom], image_encoding)
+        for top, bottom in zip(boundaries, boundaries[1:])
+    ]
+
+
+def _encode(
+    page: fitz.Page,
+    top_crop: float,
+    bottom_crop: float,
+    detect_table: bool,
+    image_encoding: Optional[ImageEncoding],
+    strips_per_page: int,
+) -> Union[str, List[str]]:
+    # The page image, or the images of its strips when split
+    if strips_per_page > 1:
+        return encode_page_strips(
+            page, strips_per_page, top_crop, bottom_crop, detect_table, image_encoding
+        )
+    return encode_page(page, top_crop, bottom_crop, detect_table, image_encoding)
+
+
+def iter_encoded_pages(
+    file_path: str,
+    max_page_num: Optional[int] = None,
+    detect_table: bool = False,
+    image_encoding: Optional[ImageEncoding] = None,
+    strips_per_page: int = 1,
+) -> Iterator[Union[str, List[str]]]:
+    """
+    Renders the pages of a PDF one at a time, see `encode_page`. Only the page being
+    rendered is held in memory, whatever the length of the document.
+
+    Args:
+        file_path (str): Path to the PDF file.
+        max_page_num (int): Optional number of pages to render from the start.
+        detect_table (bool): Whether to crop each page to its signature table.
+        image_encoding (ImageEncoding): The resolution and format of the images.
+        strips_per_page (int): Number of strips each page is split into, see
+            `encode_page_strips`. 1 keeps whole pages.
+
+    Yields:
+        Union[str, List[str]]: The base64 encoded image of each page, or of its
+            strips when split, in page order.
+    """
+    pdf_document = fitz.open(file_path)
+    try:
+        logger.info(f"Rendering {file_path}, {len(pdf_document)} pages")
+        for page_no, page in enumerate(pdf_document):
+            if max_page_num and page_no >= max_page_num:
+                break
+            yield _encode(
+                page,
+                config["TOP_CROP"],
+                config["BOTTOM_CROP"],
+                detect_table,
+                image_encoding,
+                strips_per_page,
+            )
+    finally:
+        pdf_document.close()
+
+
+def _encode_page_range(
+    file_path: str,
+    start: int,
+    stop: int,
+    top_crop: float,
+    bottom_crop: float,
+    detect_table: bool = False,
+    image_encoding: Optional[ImageEncoding] = None,
+    strips_per_page: int = 1,
+) -> List[Union[str, List[str]]]:
+    # Runs in a worker process, which opens its own copy of the document
+    with fitz.open(file_path) as pdf_document:
+        return [
+            _encode(
+                pdf_document[page_no],
+                top_crop,
+                bottom_crop,
+                detect_table,
+                image_encoding,
+                strips_per_page,
+            )
+            for page_no in range(start, stop)
+        ]
+
+
+def iter_encoded_pages_parallel(
+    file_path: str,
+    max_page_num: Optional[int] = None,
+    max_workers: Optional[int] = None,
+    pages_per_task: int = 8,
+    detect_table: bool = False,
+    image_encoding: Optional[ImageEncoding] = None,
+    strips_per_page: int = 1,
+) -> Iterator[Union[str, List[str]]]:
+    """
+    Renders the pages of a PDF across worker processes, see `encode_page`.
+
+    PyMuPDF documents can not be shared between threads, so each worker opens the
+    file itself and renders ranges of `pages_per_task` pages. At most two ranges
+    per worker are in flight, so memory stays bounded for long documents. Small
+    documents and a single worker are rendered in this process.
+
+    Args:
+        file_path (str): Path to the PDF file.
+        max_page_num (int): Optional number of pages to render from the start.
+        max_workers (int): Number of worker processes. Defaults to the CPU count.
+        pages_per_task (int): Number of consecutive pages rendered per task.
+        detect_table (bool): Whether to crop each page to its signature table,
+            which is detected in the workers.
+        image_encoding (ImageEncoding): The resolution and format of the images,
+            which are encoded in the workers.
+        strips_per_page (int): Number of strips each page is split into in the
+            workers, see `encode_page_strips`. 1 keeps whole pages.
+
+    Yields:
+        Union[str, List[str]]: The base64 encoded image of each page, or of its
+            strips when split, in page order.
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    total_pages = count_pages(file_path)
+    if max_page_num:
+        total_pages = min(total_pages, max_page_num)
+    if max_workers == 1 or total_pages <= pages_per_task:
+        yield from iter_encoded_pages(
+            file_path, max_page_num, detect_table, image_encoding, strips_per_page
+        )
+        return
+
+    logger.info(
+        f"Rendering {file_path}, {total_pages} pages across {max_workers} processes"
+    )
+    # Spawned rather than forked: the caller may render from a background thread
+    executor = ProcessPoolExecutor(
+        max_workers=max_workers, mp_context=multiprocessing.get_context("spawn")
+    )
+    try:
+        in_flight = deque()
+        for start in range(0, total_pages, pages_per_task):
+            in_flight.append(
+                executor.submit(
+                    _encode_page_range,
+                    file_path,
+                    start,
+                    min(start + pages_per_task, total_pages),
+                    config["TOP_CROP"],
+                    config["BOTTOM_CROP"],
+                    detect_table,
+                    image_encoding,
+                    strips_per_page,
+                )
+            )
+            if len(in_flight) >= 2 * max_workers:
+                yield from in_flight.popleft().result()
+        while in_flight:
+            yield from in_flight.popleft().result()
+    finally:
+        executor.shutdown(cancel_futures=True)
+
+
+async def prefetch_encoded_pages(
+    file_path: str,
+    max_page_num: Optional[int] = None,
+    prefetch: int = 10,
+    max_workers: Optional[int] = 1,
+    detect_table: bool = False,
+    image_encoding: Optional[ImageEncoding] = None,
+    strips_per_page: int = 1,
+) -> AsyncIterator[Union[str, List[str]]]:
+    """
+    Renders the pages of a PDF in a background thread, at most `prefetch` pages
+    ahead of the consumer, so OCR of the first pages starts while the rest of the
+    document is rendered and memory stays bounded.
+
+    Args:
+        file_path (str): Path to the PDF file.
+        max_page_num (int): Optional number of pages to render from the start.
+        prefetch (int): Maximum number of rendered pages waiting to be consumed.
+        max_workers (int): Number of rendering processes, see
+            `iter_encoded_pages_parallel`. None uses every CPU.
+        detect_table (bool): Whether to crop each page to its signature table.
+        image_encoding (ImageEncoding): The resolution and format of the images.
+        strips_per_page (int): Number of strips each page is split into, see
+            `encode_page_strips`. 1 keeps whole pages.
+
+    Yields:
+        Union[str, List[str]]: The base64 encoded image of each page, or of its
+            strips when split, in page order.
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=prefetch)
+    stopped = threading.Event()
+
+    def put(item) -> None:
+        # Blocks the rendering thread while the queue is full
+        asyncio.run_coroutine_threadsafe(queue.put(item), loop).result()
+
+    def render() -> None:
+        try:
+            for encoded in iter_encoded_pages_parallel(
+                file_path,
+                max_page_num,
+                max_workers,
+                detect_table=detect_table,
+                image_encoding=image_encoding,
+                strips_per_page=strips_per_page,
+            ):
+                if stopped.is_set():
+                    return
+                put(encoded)
+        except Exception as e:
+            put(e)
+        put(_DONE)
+
+    producer = loop.run_in_executor(None, render)
+    try:
+        while (item := await queue.get()) is not _DONE:
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        # Unblock the rendering thread if the consumer stopped early
+        stopped.set()
+        while not producer.done():
+            while not queue.empty():
+                queue.get_nowait()
+            await asyncio.wait({producer}, timeout=0.01)
@@ -1,3 +1,4 @@
+import asyncio
 import os
 from enum import Enum
 from io import BytesIO
@@ -5,7 +6,8 @@ from io import BytesIO
 from fastapi.responses import FileResponse
 import pandas as pd
 from fastapi import APIRouter, Request, Response, UploadFile
-from app.voter_records.tables import Ballot, VoterRecord
+from voter_records.tables import Ballot, VoterRecord
+from fuzzy_match_helper import load_voter_roll_file
 from utils import logger
 
 router = APIRouter(tags=["File Upload"])
@@ -14,6 +16,8 @@ if not os.path.exists("temp"):
     os.makedirs("temp")
     logger.info("Created temporary directory: temp")
 
+VOTER_RECORDS_PATH = "temp/voter_records.csv"
+
 
 class UploadFileTypes(str, Enum):
     voter_records = "voter_records"
@@ -25,7 +29,9 @@ def clear_all_files(request: Request):
     """
     Delete all files
     """
-    request.state.voter_records_df = None
+    request.app.state.voter_roll = None
+    if os.path.exists(VOTER_RECORDS_PATH):
+        os.remove(VOTER_RECORDS_PATH)
     if os.path.exists("temp/ballot.pdf"):
         os.remove("temp/ballot.pdf")
         logger.info("Deleted all files")
@@ -80,8 +86,14 @@ async def upload_file(
             for row in data:
                 instance = VoterRecord(**row)
                 await instance.save()
+
+            # Hashed and indexed once here, so OCR requests reuse the loaded roll
+            with open(VOTER_RECORDS_PATH, "wb") as voter_records_file:
+                voter_records_file.write(contents)
+            request.app.state.voter_roll = await asyncio.to_thread(
+                load_voter_roll_file, VOTER_RECORDS_PATH
+            )
             return {"message": f"{len(data)} voter records uploaded successfully"}
-            
 
     return {"filename": file.filename}
 
@@ -102,6 +114,6 @@ def get_uploaded_file(filetype: UploadFileTypes, request: Request):
                 return {"error": "No PDF file found for petition signatures"}
             return FileResponse("temp/ballot.pdf")
         case UploadFileTypes.voter_records:
-            if request.app.state.voter_records_df is None:
+            if not os.path.exists(VOTER_RECORDS_PATH):
                 return {"error": "No voter records file found"}
-            return request.app.state.voter_records_df.to_csv(index=False)
+            return FileResponse(VOTER_RECORDS_PATH)
@@ -2,6 +2,8 @@ from .settings_repo import OpenAiConfig
 from .settings_repo import MistralAiConfig
 from .settings_repo import GeminiAiConfig
 from .settings_repo import SettingsData
+from .settings_repo import MatchingConfig
+from .settings_repo import OcrConfig
 from .settings_repo import load_settings
 
 __all__ = [
@@ -10,4 +12,6 @@ __all__ = [
     "OpenAiConfig",
     "MistralAiConfig",
     "GeminiAiConfig",
+    "MatchingConfig",
+    "OcrConfig",
 ]
@@ -2,7 +2,7 @@ import os
 from typing import Optional
 import tomllib
 import pathlib
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from utils import (
     enable_debug_logging,
     logger,
@@ -29,10 +29,40 @@ class GeminiAiConfig:
     model: str
 
 
+@dataclass
+class MatchingConfig:
+    prefilter_scorer: str = "none"
+    prefilter_limit: int = 300
+    scorer: str = "ratio"
+    cache_size_mb: int = 256
+    workers: int = 0
+    tfidf: str = "none"
+    tfidf_limit: int = 50
+
+
+@dataclass
+class OcrConfig:
+    max_concurrency: int = 10
+    requests_per_minute: int = 0
+    tokens_per_minute: int = 0
+    tokens_per_page: int = 1500
+    max_retries: int = 5
+    cache_size_mb: int = 512
+    pages_per_request: int = 1
+    strips_per_page: int = 1
+    detect_table: bool = False
+    image_dpi: int = 72
+    image_format: str = "jpeg"
+    image_quality: int = 95
+    binarize: bool = False
+
+
 @dataclass
 class SettingsData:
     selected_config: OpenAiConfig | MistralAiConfig | GeminiAiConfig
     debug_mode: bool = False
+    matching: MatchingConfig = field(default_factory=MatchingConfig)
+    ocr: OcrConfig = field(default_factory=OcrConfig)
 
 
 _current_settings: Optional[SettingsData] = None
@@ -116,6 +146,34 @@ def load_settings(
 
     _current_settings.debug_mode = settings.get("debug_mode", False)
 
+    matching_config = settings.get("matching", {})
+    _current_settings.matching = MatchingConfig(
+        prefilter_scorer=matching_config.get("prefilter_scorer", "none"),
+        prefilter_limit=matching_config.get("prefilter_limit", 300),
+        scorer=matching_config.get("scorer", "ratio"),
+        cache_size_mb=matching_config.get("cache_size_mb", 256),
+        workers=matching_config.get("workers", 0),
+        tfidf=matching_config.get("tfidf", "none"),
+        tfidf_limit=matching_config.get("tfidf_limit", 50),
+    )
+
+    ocr_config = settings.get("ocr", {})
+    _current_settings.ocr = OcrConfig(
+        max_concurrency=ocr_config.get("max_concurrency", 10),
+        requests_per_minute=ocr_config.get("requests_per_minute", 0),
+        tokens_per_minute=ocr_config.get("tokens_per_minute", 0),
+        tokens_per_page=ocr_config.get("tokens_per_page", 1500),
+        max_retries=ocr_config.get("max_retries", 5),
+        cache_size_mb=ocr_config.get("cache_size_mb", 512),
+        pages_per_request=ocr_config.get("pages_per_request", 1),
+        strips_per_page=ocr_config.get("strips_per_page", 1),
+        detect_table=ocr_config.get("detect_table", False),
+        image_dpi=ocr_config.get("image_dpi", 72),
+        image_format=ocr_config.get("image_format", "jpeg"),
+        image_quality=ocr_config.get("image_quality", 95),
+        binarize=ocr_config.get("binarize", False),
+    )
+
     logger.debug(f"Loaded settings: {_current_settings}")
     logger.info(
         "Selected OCR engine {x} with model {y}:".format(
@@ -1,4 +1,5 @@
 from .app_logger import logger
 from .app_logger import enable_debug_logging
+from .cache import SqliteLruCache
 
-__all__ = ["logger", "enable_debug_logging"]
+__all__ = ["logger", "enable_debug_logging", "SqliteLruCache"]
@@ -0,0 +1,220 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable
+
+from .app_logger import logger
+
+# SQLite limits the number of parameters of one statement
+_MAX_VARIABLES = 500
+
+
+class SqliteLruCache:
+    """
+    Persistent key-value cache: an in-process LRU dictionary in front of a SQLite
+    file. Values are stored as JSON, so anything `json.dumps` accepts can be cached.
+
+    The file is shared by every process opening the same path. When its entries
+    grow past `max_bytes`, the least recently read entries are deleted.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_bytes: int = 256 * 1024 * 1024,
+        memory_items: int = 4096,
+    ):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.memory_items = memory_items
+        self._memory: "OrderedDict[str, Any]" = OrderedDict()
+        # Read times of memory hits, written to the file with the next write
+        self._touched: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        with self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "size INTEGER NOT NULL, accessed REAL NOT NULL)"
+            )
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)"
+            )
+        # Running size of the entries, so writes do not sum the whole table
+        self._total = self._stored_size()
+        logger.debug(f"Opened cache {path}")
+
+    def __len__(self) -> int:
+        with self._lock:
+            (count,) = self._connection.execute(
+                "SELECT COUNT(*) FROM entries"
+            ).fetchone()
+        return count
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """
+        Reads one entry.
+
+        Args:
+            key (str): The entry key.
+            default: Returned when the key is not cached.
+
+        Returns:
+            The cached value, or `default`.
+        """
+        return self.get_many([key]).get(key, default)
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        """
+        Reads several entries, from memory when possible and from SQLite otherwise.
+
+        Args:
+            keys (Iterable[str]): The entry keys.
+
+        Returns:
+            Dict[str, Any]: The values of the cached keys. Missing keys are left out.
+        """
+        found = {}
+        with self._lock:
+            missing = []
+            for key in dict.fromkeys(keys):
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    self._touched[key] = time.time()
+                    found[key] = self._memory[key]
+                else:
+                    missing.append(key)
+
+            stored = {}
+            for start in range(0, len(missing), _MAX_VARIABLES):
+                chunk = missing[start : start + _MAX_VARIABLES]
+                stored.update(
+                    self._connection.execute(
+                        "SELECT key, value FROM entries "
+                        f"WHERE key IN ({', '.join('?' * len(chunk))})",
+                        chunk,
+                    ).fetchall()
+                )
+            if stored:
+                with self._connection:
+                    self._connection.executemany(
+                        "UPDATE entries SET accessed = ? WHERE key = ?",
+                        [(time.time(), key) for key in stored],
+                    )
+            for key, value in stored.items():
+                found[key] = json.loads(value)
+                self._remember(key, found[key])
+        return found
+
+    def set(self, key: str, value: Any) -> None:
+        """
+        Writes one entry.
+
+        Args:
+            key (str): The entry key.
+            value: The value, serializable with `json.dumps`.
+        """
+        self.set_many({key: value})
+
+    def set_many(self, items: Dict[str, Any]) -> None:
+        """
+        Writes several entries in one transaction, then evicts the least recently
+        read entries if the file grew past `max_bytes`.
+
+        Args:
+            items (Dict[str, Any]): The values to cache by key.
+        """
+        if not items:
+            return
+        now = time.time()
+        encoded = {key: json.dumps(value) for key, value in items.items()}
+        rows = [
+            (key, value, len(key) + len(value), now) for key, value in encoded.items()
+        ]
+
+        with self._lock:
+            with self._connection:
+                self._flush_touched()
+                self._connection.executemany(
+                    "INSERT OR REPLACE INTO entries (key, value, size, accessed) "
+                    "VALUES (?, ?, ?, ?)",
+                    rows,
+                )
+            self._total += sum(row[2] for row in rows)
+            # Kept decoded, so memory hits look exactly like disk hits
+            for key, value in encoded.items():
+                self._remember(key, json.loads(value))
+            self._evict()
+
+    def clear(self) -> None:
+        """Deletes every entry, in memory and on disk."""
+        with self._lock:
+            self._memory.clear()
+            self._touched.clear()
+            with self._connection:
+                self._connection.execute("DELETE FROM entries")
+            self._total = 0
+
+    def close(self) -> None:
+        """Closes the SQLite connection."""
+        with self._lock:
+            with self._connection:
+                self._flush_touched()
+            self._connection.close()
+
+    def _flush_touched(self) -> None:
+        self._connection.executemany(
+            "UPDATE entries SET accessed = ? WHERE key = ?",
+            [(accessed, key) for key, accessed in self._touched.items()],
+        )
+        self._touched.clear()
+
+    def _remember(self, key: str, value: Any) -> None:
+        if self.memory_items <= 0:
+            return
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def _stored_size(self) -> int:
+        return self._connection.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM entries"
+        ).fetchone()[0]
+
+    def _evict(self) -> None:
+        if self._total <= self.max_bytes:
+            return
+        # The running total counts replaced entries twice and misses the writes of
+        # other processes, so it is corrected before evicting
+        total = self._total = self._stored_size()
+        if total <= self.max_bytes:
+            return
+
+        # Oldest entries first, until the rest fits
+        excess = total - self.max_bytes
+        evicted = []
+        for key, size in self._connection.execute(
+            "SELECT key, size FROM entries ORDER BY accessed"
+        ):
+            evicted.append(key)
+            excess -= size
+            if excess <= 0:
+                break
+        with self._connection:
+            self._connection.executemany(
+                "DELETE FROM entries WHERE key = ?", [(key,) for key in evicted]
+            )
+        # What is left past the evicted entries, at most max_bytes
+        self._total = self.max_bytes + excess
+        for key in evicted:
+            self._memory.pop(key, None)
+        logger.debug(f"Evicted {len(evicted)} entries from cache {self.path}")
@@ -0,0 +1,38 @@
+from piccolo.apps.migrations.auto.migration_manager import MigrationManager
+from piccolo.columns.column_types import Varchar
+from piccolo.columns.indexes import IndexMethod
+
+
+ID = "2026-10-18T20:40:12:431207"
+VERSION = "1.26.1"
+DESCRIPTION = ""
+
+
+async def forwards():
+    manager = MigrationManager(
+        migration_id=ID, app_name="voter_records", description=DESCRIPTION
+    )
+
+    manager.add_column(
+        table_class_name="VoterRecord",
+        tablename="voter_record",
+        column_name="Ward",
+        db_column_name="Ward",
+        column_class_name="Varchar",
+        column_class=Varchar,
+        params={
+            "length": 10,
+            "default": "",
+            "null": True,
+            "primary_key": False,
+            "unique": False,
+            "index": False,
+            "index_method": IndexMethod.btree,
+            "choices": None,
+            "db_column_name": None,
+            "secret": False,
+        },
+        schema=None,
+    )
+
+    return manager
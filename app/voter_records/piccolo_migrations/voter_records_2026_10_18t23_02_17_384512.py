@@ -0,0 +1,36 @@
+from piccolo.apps.migrations.auto.migration_manager import MigrationManager
+from piccolo.table import Table
+
+
+ID = "2026-10-18T23:02:17:384512"
+VERSION = "1.26.1"
+DESCRIPTION = "One checkpoint row per page of an OCR job"
+
+
+class RawTable(Table):
+    pass
+
+
+async def forwards():
+    manager = MigrationManager(
+        migration_id=ID, app_name="voter_records", description=DESCRIPTION
+    )
+
+    async def run():
+        # Keeps the latest attempt of pages written twice before the index existed
+        await RawTable.raw(
+            "DELETE FROM ocr_page WHERE id NOT IN "
+            "(SELECT MAX(id) FROM ocr_page GROUP BY job, page_no)"
+        )
+        await RawTable.raw(
+            "CREATE UNIQUE INDEX IF NOT EXISTS ocr_page_job_page_no "
+            "ON ocr_page (job, page_no)"
+        )
+
+    async def run_backwards():
+        await RawTable.raw("DROP INDEX IF EXISTS ocr_page_job_page_no")
+
+    manager.add_raw(run)
+    manager.add_raw_backwards(run_backwards)
+
+    return manager
@@ -1,5 +1,15 @@
 from piccolo.table import Table
-from piccolo.columns import Varchar, Bytea
+from piccolo.columns import (
+    JSON,
+    Boolean,
+    Bytea,
+    ForeignKey,
+    Integer,
+    OnDelete,
+    Text,
+    Timestamptz,
+    Varchar,
+)
 
 
 class VoterRecord(Table):
@@ -9,8 +19,33 @@ class VoterRecord(Table):
     Street_Name = Varchar(length=100, null=False)
     Street_Type = Varchar(length=50, null=True)
     Street_Dir_Suffix = Varchar(length=10, null=True)
+    Ward = Varchar(length=10, null=True)
 
 
 class Ballot(Table):
     name = Varchar(length=255, null=False)
     pdf_data = Bytea(null=False)
+
+
+class OcrJob(Table):
+    # Hash of the PDF and of the OCR engine, model and prompts
+    key = Varchar(length=64, null=False, index=True)
+    filename = Varchar(length=255, null=False)
+    total_pages = Integer(null=False)
+    completed = Boolean(default=False)
+    created_at = Timestamptz()
+
+
+# Piccolo has no unique constraint over several columns, so each page of a job is
+# kept unique by this index, created by a migration
+OCR_PAGE_UNIQUE_INDEX = (
+    "CREATE UNIQUE INDEX IF NOT EXISTS ocr_page_job_page_no ON ocr_page (job, page_no)"
+)
+
+
+class OcrPage(Table):
+    # One row per page of a job, see OCR_PAGE_UNIQUE_INDEX
+    job = ForeignKey(references=OcrJob, on_delete=OnDelete.cascade)
+    page_no = Integer(null=False)
+    rows = JSON(null=False)
+    error = Text(null=True)
@@ -0,0 +1,80 @@
+"""
+Benchmarks the name blocking index against a full scan of the voter roll.
+
+Reports, over the registered signers in `sample_data/all_petition_signers.csv`:
+- candidate recall: the signer's voter row is in the blocked candidate set
+- match recall: the best match is the signer's voter row
+- the average fraction of the roll that is scored per signature
+
+Usage:
+    uv run python benchmarks/blocking_recall.py
+"""
+
+import numpy as np
+
+from common import load_ocr_signers, load_voter_records, timed
+from fuzzy_match_helper import (
+    config,
+    create_select_voter_records,
+    get_matched_name_address_batch,
+)
+from matching import BlockingIndex
+
+
+def main():
+    voter_records = load_voter_records()
+    signers = load_ocr_signers(voter_records)
+    select_voter_records = create_select_voter_records(voter_records)
+    registered = signers[signers["Voter Position"] >= 0]
+    names = signers["OCR Name"].tolist()
+    addresses = signers["OCR Address"].tolist()
+
+    with timed("Build blocking index"):
+        blocking_index = BlockingIndex.from_select_voter_records(select_voter_records)
+
+    candidate_sets = [blocking_index.candidates(name) for name in names]
+    candidate_fraction = np.mean([len(c) for c in candidate_sets]) / len(
+        select_voter_records
+    )
+    candidate_recall = np.mean(
+        [
+            position in candidate_sets[row]
+            for row, position in registered["Voter Position"].items()
+        ]
+    )
+
+    with timed("Full scan matching"):
+        full_results = get_matched_name_address_batch(
+            names, addresses, select_voter_records
+        )
+    with timed("Blocked matching (no fallback)"):
+        blocked_results = get_matched_name_address_batch(
+            names,
+            addresses,
+            select_voter_records,
+            blocking_index=blocking_index,
+            fallback_threshold=None,
+        )
+    with timed(f"Blocked matching (fallback below {config['BASE_THRESHOLD']})"):
+        fallback_results = get_matched_name_address_batch(
+            names, addresses, select_voter_records, blocking_index=blocking_index
+        )
+
+    def match_recall(results):
+        return np.mean(
+            [
+                results[row][0][3] == position
+                for row, position in registered["Voter Position"].items()
+            ]
+        )
+
+    print(f"Registered signers: {len(registered)} of {len(signers)}")
+    print(f"Average candidate set: {candidate_fraction:.2%} of the roll")
+    print(f"Candidate recall: {candidate_recall:.2%}")
+    print(f"Match recall, full scan: {match_recall(full_results):.2%}")
+    print(f"Match recall, blocked: {match_recall(blocked_results):.2%}")
+    print(f"Match recall, blocked with fallback: {match_recall(fallback_results):.2%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+"""
+Shared helpers for the matching benchmarks.
+
+The benchmarks run against the synthetic data in `sample_data`: the 100,000 row
+`fake_voter_records.csv` roll and the 500 signers in `all_petition_signers.csv`, of
+which 400 are registered voters and 100 are spurious. OCR errors are simulated with
+seeded random character edits so runs are reproducible.
+"""
+
+import asyncio
+import math
+import os
+import random
+import sys
+import time
+import typing
+from contextlib import contextmanager
+from typing import Callable, List
+
+import pandas as pd
+
+REPODIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPODIR, "app"))
+
+VOTER_RECORDS_PATH = os.path.join(REPODIR, "sample_data", "fake_voter_records.csv")
+SIGNERS_PATH = os.path.join(REPODIR, "sample_data", "all_petition_signers.csv")
+SCANNED_PAGE_PATH = os.path.join(REPODIR, "sample_data", "page-0.jpg")
+
+NAME_COLUMNS = ["First_Name", "Last_Name"]
+ADDRESS_COLUMNS = ["Street_Number", "Street_Name", "Street_Type", "Street_Dir_Suffix"]
+
+
+def load_voter_records() -> pd.DataFrame:
+    return pd.read_csv(VOTER_RECORDS_PATH, dtype=str)
+
+
+def load_voter_store(voter_records: pd.DataFrame):
+    """
+    Builds the `VoterStringStore` of a roll. Its distinct name and address tables,
+    built on first use, are built here so they are not counted in timed runs.
+    """
+    from fuzzy_match_helper import create_select_voter_records
+    from matching import VoterStringStore
+
+    store = VoterStringStore.from_select_voter_records(
+        create_select_voter_records(voter_records)
+    )
+    unique_names, _ = store.unique_names
+    unique_addresses, _ = store.unique_addresses
+    print(
+        f"{len(store)} voters, {len(unique_names)} distinct names, "
+        f"{len(unique_addresses)} distinct addresses"
+    )
+    return store
+
+
+def add_ocr_noise(text: str, rng: random.Random, max_edits: int = 2) -> str:
+    """Applies up to `max_edits` random substitutions, deletions or insertions."""
+    chars = list(text)
+    for _ in range(rng.randint(0, max_edits)):
+        position = rng.randrange(len(chars) + 1)
+        edit = rng.choice(["substitute", "delete", "insert"])
+        if edit == "insert" or position == len(chars):
+            chars.insert(position, rng.choice("abcdefghijklmnopqrstuvwxyz"))
+        elif edit == "delete":
+            del chars[position]
+        else:
+            chars[position] = rng.choice("abcdefghijklmnopqrstuvwxyz")
+    return "".join(chars)
+
+
+def load_ocr_signers(
+    voter_records: pd.DataFrame, seed: int = 0, max_edits: int = 2
+) -> pd.DataFrame:
+    """
+    Returns the petition signers as OCR output with simulated errors, together with
+    the row position of the signer in the voter roll (-1 for spurious signers).
+    """
+    rng = random.Random(seed)
+    signers = pd.read_csv(SIGNERS_PATH, dtype=str).fillna("")
+
+    positions = (
+        voter_records.fillna("")
+        .reset_index(drop=True)
+        .reset_index()
+        .drop_duplicates(NAME_COLUMNS + ADDRESS_COLUMNS)
+    )
+    signers = signers.merge(positions, how="left", on=NAME_COLUMNS + ADDRESS_COLUMNS)
+
+    names = signers[NAME_COLUMNS].agg(" ".join, axis=1)
+    addresses = signers[["Street_Number", "Street_Name"]].agg(" ".join, axis=1)
+    return pd.DataFrame(
+        {
+            "OCR Name": [add_ocr_noise(name, rng, max_edits) for name in names],
+            "OCR Address": [
+                add_ocr_noise(address, rng, max_edits) for address in addresses
+            ],
+            "Voter Position": signers["index"].fillna(-1).astype(int),
+        }
+    )
+
+
+def make_scanned_pdf(path: str, n_pages: int, shift: float = 0) -> str:
+    """
+    Writes a letter-size PDF whose every page is the scanned sample page, moved
+    down by `shift` points, or up when negative, as a misaligned scan would be.
+    """
+    import fitz
+
+    with fitz.open() as pdf_document:
+        xref = 0
+        for _ in range(n_pages):
+            page = pdf_document.new_page(width=612, height=792)
+            # The image is stored once and referenced by every page
+            xref = page.insert_image(
+                page.rect + (0, shift, 0, shift),
+                filename=SCANNED_PAGE_PATH,
+                xref=xref,
+            )
+        pdf_document.save(path)
+    return path
+
+
+def estimate_image_tokens(encoding: str, provider: str = "open_ai") -> int:
+    """
+    Estimates the prompt tokens of a base64 encoded image from the published image
+    token formulas of each provider:
+    - open_ai: 85 tokens plus 170 per 512 pixel tile, once scaled to fit
+      2048 x 2048 with the shortest side at most 768 pixels, in high detail.
+    - gemini_ai: 258 tokens for images up to 384 pixels, and 258 per 768 pixel
+      tile above.
+    - mistral_ai: one token per 16 x 16 pixel patch plus one per patch row, once
+      scaled to fit 1024 x 1024.
+    """
+    from pdf_rasterizer import decode_page
+
+    height, width = decode_page(encoding).shape
+    if provider == "gemini_ai":
+        if max(width, height) <= 384:
+            return 258
+        return 258 * math.ceil(width / 768) * math.ceil(height / 768)
+    if provider == "mistral_ai":
+        scale = min(1, 1024 / max(width, height))
+        columns = math.ceil(width * scale / 16)
+        rows = math.ceil(height * scale / 16)
+        return columns * rows + rows
+    scale = min(1, 2048 / max(width, height))
+    scale = min(scale, 768 / min(width * scale, height * scale), 1)
+    width, height = width * scale, height * scale
+    return 85 + 170 * math.ceil(width / 512) * math.ceil(height / 512)
+
+
+class ReplayChatModel:
+    """
+    Stand-in for the LangChain chat model of the OCR engine, used to benchmark the
+    OCR pipeline offline. Every image of a request is answered with the recorded
+    rows of `rows_for_image`, after a latency of `request_latency` seconds plus
+    `row_latency` per returned row, as generating structured output dominates the
+    response time. Requests, prompt tokens and image bytes are counted.
+    """
+
+    def __init__(
+        self,
+        rows_for_image: Callable[[str], List[dict]],
+        request_latency: float = 0.5,
+        row_latency: float = 0.02,
+    ):
+        self.rows_for_image = rows_for_image
+        self.request_latency = request_latency
+        self.row_latency = row_latency
+        self.requests = 0
+        self.text_tokens = 0
+        self.image_tokens = 0
+        self.image_bytes = 0
+
+    def with_structured_output(self, schema):
+        model = self
+        # Rows of several pages per request carry the number of their image
+        (entry,) = typing.get_args(schema.model_fields["Data"].annotation)
+        packed = "Page" in entry.model_fields
+
+        class StructuredOutput:
+            async def ainvoke(self, messages):
+                return await model.reply(schema, packed, messages)
+
+        return StructuredOutput()
+
+    async def reply(self, schema, packed: bool, messages):
+        self.requests += 1
+        rows = []
+        image_no = 0
+        for part in messages[0].content:
+            if part["type"] == "text":
+                # About four characters per token
+                self.text_tokens += len(part["text"]) // 4
+                continue
+            image_no += 1
+            encoding = part["image_url"]["url"].split(",", 1)[1]
+            self.image_tokens += estimate_image_tokens(encoding)
+            self.image_bytes += len(encoding)
+            for row in self.rows_for_image(encoding):
+                rows.append({**row, "Page": image_no} if packed else row)
+        await asyncio.sleep(self.request_latency + self.row_latency * len(rows))
+        return schema.model_validate({"Data": rows})
+
+
+def use_replay_model(model: ReplayChatModel) -> None:
+    """Answers the OCR requests that follow with `model` instead of the engine."""
+    from ocr import ocr_client_factory
+
+    ocr_client_factory._create_ocr_client = lambda settings: model
+    ocr_client_factory._clients.clear()
+
+
+def recorded_ocr_rows(n_rows: int = 13) -> List[dict]:
+    """The OCR rows of one petition page, recorded from the sample signers."""
+    signers = pd.read_csv(SIGNERS_PATH, dtype=str, nrows=n_rows).fillna("")
+    return [
+        {
+            "Name": f"{signer.First_Name} {signer.Last_Name}",
+            "Address": f"{signer.Street_Number} {signer.Street_Name}",
+            "Date": "1/1/2025",
+            "Ward": 2,
+        }
+        for signer in signers.itertuples()
+    ]
+
+
+@contextmanager
+def timed(label: str):
+    start = time.perf_counter()
+    yield
+    print(f"{label}: {time.perf_counter() - start:.3f} s")
@@ -0,0 +1,78 @@
+"""
+Benchmarks unique-string deduplication of the voter names in the scoring path.
+
+The synthetic sample roll has almost no repeated strings, so a DC-style roll is
+derived from it: voters are grouped into households sharing an address and a last
+name, and first names are drawn from the roll's own name frequencies. Reports the
+scorer calls and time of matching the petition signers with and without
+deduplication, and checks that the results are identical.
+
+Usage:
+    uv run python benchmarks/dedup_scoring.py
+"""
+
+import numpy as np
+import pandas as pd
+
+from common import load_ocr_signers, load_voter_records, timed
+from fuzzy_match_helper import create_select_voter_records
+from matching import VoterStringStore, match_name_then_address_batch
+
+
+def household_roll(voter_records: pd.DataFrame, seed: int = 0) -> pd.DataFrame:
+    """Regroups the roll into households of one to five voters at one address."""
+    rng = np.random.default_rng(seed)
+    select_voter_records = create_select_voter_records(voter_records)
+    n_voters = len(select_voter_records)
+
+    household_sizes = rng.integers(1, 6, size=n_voters)
+    household = np.repeat(np.arange(n_voters), household_sizes)[:n_voters]
+    # A small pool of first names, so common names recur across households
+    first_names = voter_records["First_Name"].to_numpy(dtype=object)[:2000]
+    last_names = voter_records["Last_Name"].to_numpy(dtype=object)
+
+    names = (
+        first_names[rng.integers(0, len(first_names), size=n_voters)]
+        + " "
+        + last_names[household]
+    )
+    addresses = select_voter_records["Full Address"].to_numpy(dtype=object)[household]
+    return pd.DataFrame({"Full Name": names, "Full Address": addresses}, dtype=object)
+
+
+def main():
+    voter_records = load_voter_records()
+    signers = load_ocr_signers(voter_records)
+    roll = household_roll(voter_records)
+    names = signers["OCR Name"].tolist()
+    addresses = signers["OCR Address"].tolist()
+
+    store = VoterStringStore.from_select_voter_records(roll)
+    with timed("Build unique name table"):
+        unique_names, _ = store.unique_names
+    print(
+        f"{len(store)} voters, {len(unique_names)} distinct names, "
+        f"{len(store.unique_addresses[0])} distinct addresses"
+    )
+    print(
+        f"Name scorer calls: {len(names) * len(store)} without dedup, "
+        f"{len(names) * len(unique_names)} with dedup"
+    )
+
+    with timed("Match without dedup"):
+        full = match_name_then_address_batch(
+            names, addresses, store.names, store.addresses
+        )
+    with timed("Match with dedup"):
+        deduplicated = match_name_then_address_batch(
+            names,
+            addresses,
+            store.names,
+            store.addresses,
+            unique_names=store.unique_names,
+        )
+    print(f"Identical results: {full == deduplicated}")
+
+
+if __name__ == "__main__":
+    main()
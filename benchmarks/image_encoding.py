@@ -0,0 +1,173 @@
+"""
+Sweeps the image encoding of OCR'd pages: resolution, format, quality and
+binarization.
+
+Renders the fake petition pages, cropped to their signature table, with every
+combination of the given settings, and OCRs them through
+`extract_from_encoding_async` with the chat model replaced by a local replay stub.
+Reports, for each setting, the bytes and the estimated image tokens of each
+provider per page, and the accuracy of the replayed rows against the reference
+setting, the one with the largest images.
+
+The stub answers every page with the rows recorded for its setting. Record them
+once against the OCR engine selected in settings.toml with `--record`, which
+makes one real request per page and setting; the sweep then runs offline from
+the recording. Without a recording, every setting is answered with the rows of
+the sample signers, so only the sizes and tokens are meaningful.
+
+Usage:
+    uv run python benchmarks/image_encoding.py --record --responses encodings.json
+    uv run python benchmarks/image_encoding.py --responses encodings.json \\
+        --dpi 72 100 150 --formats jpeg png webp --quality 50 75 95 --binarize
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import os
+import tempfile
+import time
+from typing import Dict, List
+
+from rapidfuzz import fuzz
+
+from common import (
+    REPODIR,
+    ReplayChatModel,
+    estimate_image_tokens,
+    make_scanned_pdf,
+    recorded_ocr_rows,
+    use_replay_model,
+)
+from ocr import ocr_client_factory
+from pdf_rasterizer import ImageEncoding, iter_encoded_pages
+
+PETITIONS_PATH = os.path.join(REPODIR, "sample_data", "fake_signed_petitions.pdf")
+PROVIDERS = ["open_ai", "gemini_ai", "mistral_ai"]
+
+
+def label(encoding: ImageEncoding) -> str:
+    text = f"{encoding.format} {encoding.dpi} dpi"
+    if encoding.format != "png":
+        text += f" q{encoding.quality}"
+    return text + (" binarized" if encoding.binarize else "")
+
+
+def sweep(args) -> List[ImageEncoding]:
+    encodings = []
+    for dpi in args.dpi:
+        for image_format in args.formats:
+            qualities = [100] if image_format == "png" else args.quality
+            for quality in qualities:
+                for binarize in [False, True] if args.binarize else [False]:
+                    encodings.append(
+                        ImageEncoding(dpi, image_format, quality, binarize)
+                    )
+    return encodings
+
+
+def row_text(row: dict) -> str:
+    return f"{row.get('Name', '')} {row.get('Address', '')}".lower()
+
+
+def accuracy(pages: List[List[dict]], reference: List[List[dict]]) -> float:
+    # Mean similarity of every reference row to its closest row on the same page
+    scores = []
+    for rows, reference_rows in zip(pages, reference):
+        texts = [row_text(row) for row in rows]
+        for reference_row in reference_rows:
+            expected = row_text(reference_row)
+            scores.append(
+                max((fuzz.ratio(expected, text) for text in texts), default=0) / 100
+            )
+    return sum(scores) / len(scores) if scores else 1.0
+
+
+async def ocr_pages(pages: List[str], mime_type: str) -> List[List[dict]]:
+    return [
+        await ocr_client_factory.extract_from_encoding_async(page, mime_type)
+        for page in pages
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pdf", default=PETITIONS_PATH)
+    parser.add_argument("--pages", type=int, default=5)
+    parser.add_argument("--dpi", type=int, nargs="+", default=[72, 100, 150])
+    parser.add_argument("--formats", nargs="+", default=["jpeg", "png", "webp"])
+    parser.add_argument("--quality", type=int, nargs="+", default=[50, 75, 95])
+    parser.add_argument("--binarize", action="store_true")
+    parser.add_argument("--responses", help="JSON file of the recorded rows")
+    parser.add_argument("--record", action="store_true")
+    args = parser.parse_args()
+    if args.record and not args.responses:
+        parser.error("--record needs --responses to write the recording to")
+
+    encodings = sweep(args)
+    sample_rows = recorded_ocr_rows()
+    responses: Dict[str, List[List[dict]]] = {}
+    if args.responses and os.path.exists(args.responses) and not args.record:
+        with open(args.responses) as responses_file:
+            responses = json.load(responses_file)
+    elif not args.record:
+        print("No recorded responses, replaying the sample signers on every page")
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = args.pdf
+        if not os.path.exists(path):
+            # Copies of the scanned sample page stand in for the petitions
+            path = make_scanned_pdf(os.path.join(directory, "petition.pdf"), args.pages)
+
+        results = []
+        for encoding in encodings:
+            start = time.perf_counter()
+            pages = list(iter_encoded_pages(path, args.pages, True, encoding))
+            elapsed = time.perf_counter() - start
+
+            if args.record:
+                rows = asyncio.run(ocr_pages(pages, encoding.mime_type))
+                responses[label(encoding)] = rows
+            else:
+                recorded = responses.get(label(encoding)) or [sample_rows] * len(pages)
+                use_replay_model(
+                    ReplayChatModel(
+                        dict(zip(pages, recorded)).__getitem__,
+                        request_latency=0,
+                        row_latency=0,
+                    )
+                )
+                rows = asyncio.run(ocr_pages(pages, encoding.mime_type))
+
+            payload = sum(len(base64.b64decode(page)) for page in pages)
+            tokens = {
+                provider: sum(estimate_image_tokens(page, provider) for page in pages)
+                for provider in PROVIDERS
+            }
+            results.append((encoding, payload, tokens, elapsed, rows))
+
+        if args.record:
+            with open(args.responses, "w") as responses_file:
+                json.dump(responses, responses_file)
+            print(f"Recorded {len(encodings)} settings to {args.responses}")
+
+    reference = max(results, key=lambda result: result[1])
+    print(f"Accuracy against {label(reference[0])}")
+    for encoding, payload, tokens, elapsed, rows in sorted(
+        results, key=lambda result: result[1]
+    ):
+        n_pages = len(rows)
+        print(
+            f"{label(encoding):>26}: {payload / n_pages / 1024:6.1f} KiB, "
+            + ", ".join(
+                f"{tokens[provider] / n_pages:5.0f} {provider}"
+                for provider in PROVIDERS
+            )
+            + f" tokens, {elapsed / n_pages * 1000:5.1f} ms per page, "
+            f"accuracy {accuracy(rows, reference[4]):.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Benchmarks joint name and address candidate generation against the name-first
+funnel.
+
+Reports, over the petition signers with simulated OCR errors:
+- match recall: the best match of a registered signer is their voter row
+- false accepts: spurious signers whose best match scores above the threshold
+- throughput in signatures per second
+
+A second run adds heavier errors to the names only, the case where the funnel can
+not recover a voter whose name fell out of the top 10.
+
+Usage:
+    uv run python benchmarks/joint_matching.py
+"""
+
+import random
+import time
+
+import numpy as np
+
+from common import add_ocr_noise, load_ocr_signers, load_voter_records, load_voter_store
+from fuzzy_match_helper import (
+    config,
+    get_matched_name_address_batch,
+)
+
+
+def report(label, signers, store, joint):
+    names = signers["OCR Name"].tolist()
+    addresses = signers["OCR Address"].tolist()
+    start = time.perf_counter()
+    results = get_matched_name_address_batch(names, addresses, store, joint=joint)
+    elapsed = time.perf_counter() - start
+
+    best_positions = np.array([result[0][3] for result in results])
+    best_scores = np.array([result[0][2] for result in results])
+    registered = signers["Voter Position"].to_numpy() >= 0
+    recall = np.mean(
+        best_positions[registered] == signers["Voter Position"].to_numpy()[registered]
+    )
+    false_accepts = np.sum(best_scores[~registered] >= config["BASE_THRESHOLD"])
+    print(
+        f"{label:24s} | recall {recall:6.2%} | false accepts {false_accepts:3d} "
+        f"| {len(names) / elapsed:8.1f} signatures/s"
+    )
+
+
+def main():
+    voter_records = load_voter_records()
+    store = load_voter_store(voter_records)
+
+    signers = load_ocr_signers(voter_records)
+    rng = random.Random(1)
+    garbled = signers.assign(
+        **{
+            "OCR Name": [
+                add_ocr_noise(name, rng, max_edits=6) for name in signers["OCR Name"]
+            ]
+        }
+    )
+
+    for label, data in [("OCR errors", signers), ("heavy name errors", garbled)]:
+        print(label)
+        report("  name-first funnel", data, store, joint=False)
+        report("  joint name + address", data, store, joint=True)
+
+
+if __name__ == "__main__":
+    main()
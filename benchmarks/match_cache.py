@@ -0,0 +1,63 @@
+"""
+Benchmarks the match cache on a rerun of the same petition.
+
+Matches the petition signers against the voter roll three times: without a cache,
+with an empty cache, and again with the filled cache, as after a threshold tweak or
+when the same signers appear on another petition. Then reopens the cache file in
+a fresh cache, to time the SQLite tier alone.
+
+Usage:
+    uv run python benchmarks/match_cache.py
+"""
+
+import os
+import tempfile
+
+import pandas as pd
+
+from common import load_ocr_signers, load_voter_records, timed
+from fuzzy_match_helper import create_ocr_matched_df, create_select_voter_records
+from matching import MatchCache, VoterStringStore, hash_voter_records
+from utils import SqliteLruCache
+
+
+def main():
+    voter_records = load_voter_records()
+    roll_hash = hash_voter_records(voter_records)
+    store = VoterStringStore.from_select_voter_records(
+        create_select_voter_records(voter_records)
+    )
+    signers = load_ocr_signers(voter_records)
+    ocr_df = pd.DataFrame(
+        {
+            "OCR Name": signers["OCR Name"],
+            "OCR Address": signers["OCR Address"],
+            "Date": "",
+            "Page Number": 1,
+            "Row Number": range(1, len(signers) + 1),
+            "Filename": "petition.pdf",
+        }
+    )
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "match_cache.sqlite")
+        match_cache = MatchCache(SqliteLruCache(path), roll_hash)
+
+        with timed("No cache"):
+            uncached = create_ocr_matched_df(ocr_df, store)
+        with timed("Empty cache"):
+            create_ocr_matched_df(ocr_df, store, match_cache=match_cache)
+        with timed("Rerun, memory tier"):
+            cached = create_ocr_matched_df(ocr_df, store, match_cache=match_cache)
+        with timed("Rerun, SQLite tier"):
+            create_ocr_matched_df(
+                ocr_df, store, match_cache=MatchCache(SqliteLruCache(path), roll_hash)
+            )
+
+        agreement = (uncached["Match Score"] == cached["Match Score"]).mean()
+        print(f"Cached scores equal to uncached scores: {agreement:.2%}")
+        print(f"Cache file size: {os.path.getsize(path) / 1024:.0f} KB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""
+Tracks Python memory allocation of signature matching as the number of signatures
+grows. Matching through a `VoterStringStore` holds the voter strings once, so peak
+allocation stays flat instead of growing with the signature count.
+
+Usage:
+    uv run python benchmarks/matching_memory.py
+"""
+
+import tracemalloc
+
+from common import load_ocr_signers, load_voter_records
+from fuzzy_match_helper import create_select_voter_records, get_matched_name_address
+from matching import VoterStringStore
+
+
+def traced_match(signers, voter_records, count):
+    tracemalloc.start()
+    for name, address in zip(
+        signers["OCR Name"][:count], signers["OCR Address"][:count]
+    ):
+        get_matched_name_address(name, address, voter_records)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return current, peak
+
+
+def main():
+    voter_records = load_voter_records()
+    signers = load_ocr_signers(voter_records)
+    select_voter_records = create_select_voter_records(voter_records)
+    store = VoterStringStore.from_select_voter_records(select_voter_records)
+
+    print("signatures | DataFrame: retained / peak MB | store: retained / peak MB")
+    for count in [50, 100, 200, 400]:
+        frame_current, frame_peak = traced_match(signers, select_voter_records, count)
+        store_current, store_peak = traced_match(signers, store, count)
+        print(
+            f"{count:10d} | {frame_current / 1e6:9.2f} / {frame_peak / 1e6:6.2f}"
+            f" | {store_current / 1e6:9.2f} / {store_peak / 1e6:6.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
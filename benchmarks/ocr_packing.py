@@ -0,0 +1,68 @@
+"""
+Benchmarks sending several pages per OCR request against one page per request.
+
+OCRs a petition of copies of the scanned sample page through `collect_ocr_pages`,
+with the chat model replaced by a local replay stub that answers every image with
+recorded rows after a simulated latency. Reports the number of requests, the
+prompt tokens per page and the time of each `pages_per_request`. The OCR cache and
+job checkpoints are disabled so every page is requested.
+
+Usage:
+    uv run python benchmarks/ocr_packing.py --pages 200 --pack-sizes 1 2 4 8
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from common import (
+    ReplayChatModel,
+    make_scanned_pdf,
+    recorded_ocr_rows,
+    use_replay_model,
+)
+from ocr_helper import collect_ocr_pages
+from settings import load_settings
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--pack-sizes", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--request-latency", type=float, default=0.5)
+    parser.add_argument("--row-latency", type=float, default=0.02)
+    args = parser.parse_args()
+
+    settings = load_settings()
+    settings.ocr.cache_size_mb = 0
+    rows = recorded_ocr_rows()
+
+    with tempfile.TemporaryDirectory() as directory:
+        make_scanned_pdf(os.path.join(directory, "petition.pdf"), args.pages)
+
+        for pack_size in args.pack_sizes:
+            model = ReplayChatModel(
+                lambda encoding: rows, args.request_latency, args.row_latency
+            )
+            use_replay_model(model)
+            settings.ocr.pages_per_request = pack_size
+
+            start = time.perf_counter()
+            results = collect_ocr_pages(
+                directory, "petition.pdf", render_workers=1, resume=False
+            )
+            elapsed = time.perf_counter() - start
+
+            n_rows = sum(len(result.rows) for result in results)
+            assert n_rows == len(rows) * args.pages, "rows lost splitting packs"
+            print(
+                f"{pack_size} pages per request: {model.requests} requests, "
+                f"{model.text_tokens / args.pages:.0f} text + "
+                f"{model.image_tokens / args.pages:.0f} image prompt tokens per "
+                f"page, {elapsed:.2f} s"
+            )
+
+
+if __name__ == "__main__":
+    main()
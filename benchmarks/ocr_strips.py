@@ -0,0 +1,81 @@
+"""
+Benchmarks OCR'ing pages as row strips against OCR'ing whole pages.
+
+OCRs a petition of copies of the scanned sample page through `collect_ocr_pages`
+one page at a time, with the chat model replaced by a local replay stub whose
+response time grows with the rows it writes out. Each strip is answered with the
+share of the recorded rows of the page that matches its height. Reports the
+requests and the OCR time per page for each `strips_per_page`.
+
+Usage:
+    uv run python benchmarks/ocr_strips.py --pages 20 --strips 1 2 3 5
+"""
+
+import argparse
+import base64
+import os
+import tempfile
+import time
+
+import fitz
+
+from common import (
+    ReplayChatModel,
+    make_scanned_pdf,
+    recorded_ocr_rows,
+    use_replay_model,
+)
+from ocr_helper import collect_ocr_pages
+from settings import load_settings
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--strips", type=int, nargs="+", default=[1, 2, 3, 5])
+    parser.add_argument("--request-latency", type=float, default=0.3)
+    parser.add_argument("--row-latency", type=float, default=0.1)
+    args = parser.parse_args()
+
+    settings = load_settings()
+    settings.ocr.cache_size_mb = 0
+    settings.ocr.pages_per_request = 1
+    rows = recorded_ocr_rows(5)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = make_scanned_pdf(os.path.join(directory, "petition.pdf"), args.pages)
+        with fitz.open(path) as pdf_document:
+            page_height = (
+                pdf_document[0]
+                .get_pixmap(clip=fitz.Rect(0, 792 * 0.385, 612, 792 * 0.725))
+                .height
+            )
+
+        def rows_for_image(encoding):
+            height = fitz.Pixmap(base64.b64decode(encoding)).height
+            return rows[: round(len(rows) * height / page_height)]
+
+        for n_strips in args.strips:
+            model = ReplayChatModel(
+                rows_for_image, args.request_latency, args.row_latency
+            )
+            use_replay_model(model)
+            settings.ocr.strips_per_page = n_strips
+
+            start = time.perf_counter()
+            collect_ocr_pages(
+                directory,
+                "petition.pdf",
+                batch_size=1,
+                render_workers=1,
+                resume=False,
+            )
+            elapsed = time.perf_counter() - start
+            print(
+                f"{n_strips} strips per page: {model.requests} requests, "
+                f"{elapsed / args.pages:.2f} s per page"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""
+Measures PDF rendering throughput as the number of rasterizer processes grows.
+
+Renders a petition of copies of the scanned sample page with
+`iter_encoded_pages_parallel` and reports pages per second for each worker count.
+
+Usage:
+    uv run python benchmarks/pdf_rasterizer_scaling.py --pages 1000 --workers 1 2 4 8
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from common import make_scanned_pdf
+from pdf_rasterizer import iter_encoded_pages_parallel
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=1000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = make_scanned_pdf(os.path.join(directory, "petition.pdf"), args.pages)
+
+        baseline = None
+        for workers in args.workers:
+            start = time.perf_counter()
+            n_pages = sum(
+                1 for _ in iter_encoded_pages_parallel(path, max_workers=workers)
+            )
+            elapsed = time.perf_counter() - start
+            baseline = baseline or elapsed
+            print(
+                f"{workers} workers: {n_pages / elapsed:.0f} pages/s, "
+                f"speedup {baseline / elapsed:.2f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
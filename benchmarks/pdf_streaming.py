@@ -0,0 +1,71 @@
+"""
+Benchmarks streaming PDF rendering against rendering every page up front.
+
+Renders a petition of copies of the scanned sample page, first into a list of
+encoded pages like `collecting_pdf_encoded_images`, then through the bounded
+prefetch queue used by `collect_ocr_data`. Reports the time until the first page is
+available to OCR and the peak Python memory of each approach.
+
+Usage:
+    uv run python benchmarks/pdf_streaming.py --pages 2000
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+import tracemalloc
+from contextlib import aclosing
+
+from common import make_scanned_pdf
+from pdf_rasterizer import iter_encoded_pages, prefetch_encoded_pages
+
+
+def render_all(path: str) -> float:
+    start = time.perf_counter()
+    pages = list(iter_encoded_pages(path))
+    print(f"  {len(pages)} pages rendered")
+    return time.perf_counter() - start
+
+
+async def stream(path: str, prefetch: int) -> float:
+    start = time.perf_counter()
+    first_page = None
+    async with aclosing(prefetch_encoded_pages(path, prefetch=prefetch)) as pages:
+        async for _ in pages:
+            if first_page is None:
+                first_page = time.perf_counter() - start
+            # Stands in for sending the page to the OCR provider
+            await asyncio.sleep(0)
+    return first_page
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=500)
+    parser.add_argument("--prefetch", type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = make_scanned_pdf(os.path.join(directory, "petition.pdf"), args.pages)
+
+        tracemalloc.start()
+        print("Render every page up front")
+        first_page = render_all(path)
+        _, peak = tracemalloc.get_traced_memory()
+        print(f"  first page after {first_page:.3f} s, peak {peak / 2**20:.1f} MB")
+
+        tracemalloc.reset_peak()
+        print(f"Stream with a prefetch queue of {args.prefetch} pages")
+        start = time.perf_counter()
+        first_page = asyncio.run(stream(path, args.prefetch))
+        _, peak = tracemalloc.get_traced_memory()
+        print(
+            f"  first page after {first_page:.3f} s, all pages after "
+            f"{time.perf_counter() - start:.3f} s, peak {peak / 2**20:.1f} MB"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Measures signature matching throughput of the process pool backend as the number of
+worker processes grows.
+
+The sample roll can be tiled up to a larger size to approximate a city-wide roll.
+
+Usage:
+    uv run python benchmarks/process_pool_scaling.py --voters 1000000 --workers 1 2 4 8
+"""
+
+import argparse
+import time
+
+import pandas as pd
+
+from common import load_ocr_signers, load_voter_records
+from fuzzy_match_helper import create_select_voter_records
+from matching import ProcessPoolMatcher
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--voters", type=int, default=100_000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    args = parser.parse_args()
+
+    voter_records = load_voter_records()
+    signers = load_ocr_signers(voter_records)
+    repeats = -(-args.voters // len(voter_records))
+    voter_records = pd.concat([voter_records] * repeats, ignore_index=True)
+    select_voter_records = create_select_voter_records(voter_records.head(args.voters))
+
+    names = signers["OCR Name"].tolist()
+    addresses = signers["OCR Address"].tolist()
+    baseline = None
+    for workers in args.workers:
+        start = time.perf_counter()
+        with ProcessPoolMatcher(select_voter_records, max_workers=workers) as pool:
+            attached = time.perf_counter()
+            # Warm up so every worker has attached to the voter roll
+            pool.match(
+                names[: workers * pool.chunk_size],
+                addresses[: workers * pool.chunk_size],
+            )
+            warm = time.perf_counter()
+            pool.match(names, addresses)
+            elapsed = time.perf_counter() - warm
+        baseline = baseline or elapsed
+        print(
+            f"{workers} workers: start {attached - start:.2f} s, "
+            f"{len(names) / elapsed:.1f} signatures/s, "
+            f"speedup {baseline / elapsed:.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+Benchmarks the two-stage scorer cascade against scoring every voter with an
+expensive scorer.
+
+For each prefilter, reports the time to find the top 10 `WRatio` name matches of
+the petition signers, and how often the cascade's best match and top 10 agree
+with scoring the whole roll with `WRatio`.
+
+Usage:
+    uv run python benchmarks/scorer_cascade.py
+"""
+
+import numpy as np
+
+from common import load_ocr_signers, load_voter_records, timed
+from fuzzy_match_helper import create_select_voter_records
+from matching import PREFILTER_SCORERS, ScorerCascade
+from settings import MatchingConfig
+
+
+def main():
+    voter_records = load_voter_records()
+    signers = load_ocr_signers(voter_records)
+    voter_names = create_select_voter_records(voter_records)["Full Name"].to_numpy(
+        dtype=object
+    )
+    queries = signers["OCR Name"].tolist()
+
+    with timed("WRatio on every voter"):
+        full_indices, full_scores = ScorerCascade.from_config(
+            MatchingConfig(scorer="WRatio")
+        ).top_k(queries, voter_names)
+
+    for prefilter in PREFILTER_SCORERS:
+        cascade = ScorerCascade.from_config(
+            MatchingConfig(prefilter_scorer=prefilter, scorer="WRatio")
+        )
+        with timed(f"{prefilter} prefilter, WRatio on {cascade.prefilter_limit}"):
+            indices, scores = cascade.top_k(queries, voter_names)
+        best = np.mean(scores[:, 0] == full_scores[:, 0])
+        top_10 = np.mean(
+            [
+                len(set(row) & set(full_row)) / len(full_row)
+                for row, full_row in zip(indices, full_indices)
+            ]
+        )
+        print(f"  best score agreement {best:.2%}, top 10 overlap {top_10:.2%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Benchmarks building the full names and addresses of the voter roll with
+`create_select_voter_records` as the roll grows.
+
+The sample roll is tiled to each size. The vectorized implementation is compared
+with the former row-wise `" ".join` up to `--row-wise-max`, beyond which the
+row-wise join takes minutes.
+
+Usage:
+    uv run python benchmarks/select_voter_records.py --voters 100000 1000000 5000000
+"""
+
+import argparse
+
+import pandas as pd
+
+from common import ADDRESS_COLUMNS, NAME_COLUMNS, load_voter_records, timed
+from fuzzy_match_helper import create_select_voter_records
+
+
+def row_wise_select_voter_records(voter_records: pd.DataFrame) -> pd.DataFrame:
+    """The former implementation, one Python `" ".join` call per row."""
+    return pd.DataFrame(
+        {
+            "Full Name": voter_records[NAME_COLUMNS]
+            .fillna("")
+            .astype(str)
+            .agg(" ".join, axis=1),
+            "Full Address": voter_records[ADDRESS_COLUMNS]
+            .fillna("")
+            .astype(str)
+            .agg(" ".join, axis=1),
+        }
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--voters", type=int, nargs="+", default=[100_000, 1_000_000, 5_000_000]
+    )
+    parser.add_argument("--row-wise-max", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    sample = load_voter_records()
+    for voters in args.voters:
+        repeats = -(-voters // len(sample))
+        voter_records = pd.concat([sample] * repeats, ignore_index=True).head(voters)
+        columns = list(voter_records.columns)
+
+        with timed(f"{voters:>9} voters, vectorized"):
+            select_voter_records = create_select_voter_records(voter_records)
+        assert list(voter_records.columns) == columns
+
+        if voters <= args.row_wise_max:
+            with timed(f"{voters:>9} voters, row-wise"):
+                expected = row_wise_select_voter_records(voter_records)
+            assert select_voter_records.equals(expected)
+
+
+if __name__ == "__main__":
+    main()
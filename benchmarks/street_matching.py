@@ -0,0 +1,79 @@
+"""
+Benchmarks street-local matching against a full scan of the voter roll.
+
+The synthetic sample roll has almost one street per voter, so a DC-style roll is
+derived from it by moving the voters onto 3,000 streets. Signatures are sampled
+from that roll with simulated OCR errors. Reports:
+- candidate recall: the signer's voter row lives on a matched street
+- match recall: the best match is the signer's voter row, with the full scan
+  fallback below the threshold
+- the average fraction of the roll scored per signature, and the time per signature
+
+Usage:
+    uv run python benchmarks/street_matching.py
+"""
+
+import random
+import time
+
+import numpy as np
+
+from common import add_ocr_noise, load_voter_records, load_voter_store
+from fuzzy_match_helper import (
+    config,
+    get_matched_name_address_batch,
+)
+from matching import StreetIndex
+
+
+def street_roll(voter_records, n_streets=3000, seed=0):
+    rng = np.random.default_rng(seed)
+    streets = voter_records[["Street_Name", "Street_Type", "Street_Dir_Suffix"]]
+    pool = streets.drop_duplicates().sample(n_streets, random_state=seed)
+    assigned = pool.iloc[rng.integers(0, n_streets, size=len(voter_records))]
+    roll = voter_records.copy()
+    roll[pool.columns] = assigned.to_numpy()
+    return roll
+
+
+def main():
+    voter_records = street_roll(load_voter_records())
+    store = load_voter_store(voter_records)
+
+    rng = random.Random(0)
+    positions = rng.sample(range(len(store)), 400)
+    names = [add_ocr_noise(store.names[p], rng) for p in positions]
+    addresses = [add_ocr_noise(store.addresses[p].strip(), rng) for p in positions]
+
+    street_index = StreetIndex.from_voter_records(voter_records)
+    sizes = [len(rows) for rows in street_index.residents.values()]
+    print(f"{len(sizes)} streets, {np.mean(sizes):.1f} voters per street on average")
+
+    candidate_sets = [street_index.candidates(address) for address in addresses]
+    candidate_recall = np.mean(
+        [position in rows for position, rows in zip(positions, candidate_sets)]
+    )
+    scored = np.mean([len(rows) for rows in candidate_sets]) / len(store)
+    print(f"Candidate recall: {candidate_recall:.2%}, roll scored: {scored:.2%}")
+
+    for label, index in [("full scan", None), ("street-local", street_index)]:
+        start = time.perf_counter()
+        results = get_matched_name_address_batch(
+            names,
+            addresses,
+            store,
+            street_index=index,
+            fallback_threshold=config["BASE_THRESHOLD"],
+        )
+        elapsed = time.perf_counter() - start
+        recall = np.mean(
+            [result[0][3] == position for result, position in zip(results, positions)]
+        )
+        print(
+            f"{label:12s} | match recall {recall:.2%} "
+            f"| {elapsed / len(names) * 1000:.2f} ms per signature"
+        )
+
+
+if __name__ == "__main__":
+    main()
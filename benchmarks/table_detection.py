@@ -0,0 +1,79 @@
+"""
+Benchmarks cropping pages to their detected signature table against the fixed crop.
+
+Renders petitions of copies of the scanned sample page, moved up and down as a
+misaligned scan would be, with and without `detect_table`. Reports the pixels and
+estimated image tokens sent per page, the rendering time per page, and how many
+pixel rows of the signature table are left out of the image sent to the OCR.
+
+Usage:
+    uv run python benchmarks/table_detection.py --pages 20 --shifts 0 -40 40
+"""
+
+import argparse
+import base64
+import os
+import tempfile
+import time
+
+import fitz
+
+from common import estimate_image_tokens, make_scanned_pdf
+from pdf_rasterizer import _gray_array, find_table_region, iter_encoded_pages
+
+
+def table_region(path: str) -> tuple:
+    # Pixel rows of the table on the first page, from its top to its bottom line
+    with fitz.open(path) as pdf_document:
+        gray = _gray_array(pdf_document[0].get_pixmap(colorspace="gray"))
+    _, top, _, bottom = find_table_region(gray)
+    return top, bottom
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--shifts", type=float, nargs="+", default=[0, -40, 40])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        # Where the table of the sample page is, as pages are rendered at 72 dpi
+        reference = make_scanned_pdf(os.path.join(directory, "reference.pdf"), 1)
+        reference_top, reference_bottom = table_region(reference)
+
+        for shift in args.shifts:
+            path = make_scanned_pdf(
+                os.path.join(directory, "petition.pdf"), args.pages, shift
+            )
+            table_top = reference_top + shift
+            table_bottom = reference_bottom + shift
+
+            for detect_table in (False, True):
+                start = time.perf_counter()
+                pages = list(iter_encoded_pages(path, detect_table=detect_table))
+                elapsed = time.perf_counter() - start
+
+                if detect_table:
+                    crop_top, crop_bottom = table_region(path)
+                else:
+                    crop_top, crop_bottom = 792 * 0.385, 792 * 0.725
+                missed = max(0, crop_top - table_top) + max(
+                    0, table_bottom - crop_bottom
+                )
+                pixmaps = [fitz.Pixmap(base64.b64decode(page)) for page in pages]
+                pixels = sum(pixmap.width * pixmap.height for pixmap in pixmaps)
+                tokens = sum(estimate_image_tokens(page) for page in pages)
+                jpeg_bytes = sum(len(base64.b64decode(page)) for page in pages)
+                label = "detected table" if detect_table else "fixed crop"
+                print(
+                    f"shift {shift:+.0f} pt, {label}: "
+                    f"{pixels / len(pages):,.0f} pixels, "
+                    f"{jpeg_bytes / len(pages) / 1024:.1f} KiB, "
+                    f"{tokens / len(pages):.0f} image tokens, "
+                    f"{elapsed / len(pages) * 1000:.1f} ms per page, "
+                    f"{missed:.0f} pixel rows of the table cut off"
+                )
+
+
+if __name__ == "__main__":
+    main()
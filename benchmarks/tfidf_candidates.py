@@ -0,0 +1,73 @@
+"""
+Benchmarks TF-IDF character n-gram candidate retrieval against a full scan.
+
+Reports, over the petition signers with simulated OCR errors:
+- candidate recall: the signer's voter row is among the TF-IDF candidates
+- match recall: the best match is the signer's voter row
+- agreement: the best match equals that of the full scan
+- the time to build the index and to match the signers
+
+Usage:
+    uv run python benchmarks/tfidf_candidates.py --limit 50 --field name_address
+"""
+
+import argparse
+
+import numpy as np
+
+from common import load_ocr_signers, load_voter_records, load_voter_store, timed
+from fuzzy_match_helper import (
+    get_matched_name_address_batch,
+)
+from matching import TFIDF_FIELDS, TfidfCandidateIndex
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--field", choices=TFIDF_FIELDS, default="name")
+    args = parser.parse_args()
+
+    voter_records = load_voter_records()
+    signers = load_ocr_signers(voter_records)
+    store = load_voter_store(voter_records)
+    names = signers["OCR Name"].tolist()
+    addresses = signers["OCR Address"].tolist()
+    positions = signers["Voter Position"].to_numpy()
+    registered = positions >= 0
+
+    with timed("Build TF-IDF index"):
+        tfidf_index = TfidfCandidateIndex.from_voter_strings(
+            store.names,
+            store.addresses if args.field == "name_address" else None,
+            limit=args.limit,
+        )
+    with timed("Retrieve candidates"):
+        candidates = tfidf_index.candidates(names, addresses)
+    candidate_recall = np.mean(
+        [
+            position in row
+            for position, row in zip(positions[registered], candidates[registered])
+        ]
+    )
+    print(f"Candidate recall: {candidate_recall:.2%}")
+
+    with timed("Match with a full scan"):
+        full = get_matched_name_address_batch(names, addresses, store)
+    with timed("Match TF-IDF candidates"):
+        tfidf = get_matched_name_address_batch(
+            names, addresses, store, tfidf_index=tfidf_index
+        )
+
+    for label, results in [("full scan", full), ("TF-IDF", tfidf)]:
+        best = np.array([result[0][3] for result in results])
+        print(
+            f"{label:9s} match recall: "
+            f"{np.mean(best[registered] == positions[registered]):.2%}"
+        )
+    agreement = np.mean([a[0][3] == b[0][3] for a, b in zip(full, tfidf)])
+    print(f"Best match agreement with the full scan: {agreement:.2%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+Compares preparing the voter roll from the CSV with opening its saved match index.
+
+Usage:
+    uv run python benchmarks/voter_index_cold_start.py
+"""
+
+import tempfile
+
+import pandas as pd
+
+from common import VOTER_RECORDS_PATH, timed
+from fuzzy_match_helper import (
+    VoterRoll,
+    create_select_voter_records,
+    load_voter_match_index,
+    load_voter_roll_file,
+)
+from matching import VoterMatchIndex, hash_voter_file
+
+
+def main():
+    with timed("CSV parse + create_select_voter_records"):
+        create_select_voter_records(pd.read_csv(VOTER_RECORDS_PATH, dtype=str))
+
+    directory = tempfile.mkdtemp()
+    roll_hash = hash_voter_file(VOTER_RECORDS_PATH)
+    with timed("First run: build and save index"):
+        index = load_voter_match_index(
+            pd.read_csv(VOTER_RECORDS_PATH, dtype=str), directory, roll_hash
+        )
+
+    with timed("Hash voter file"):
+        hash_voter_file(VOTER_RECORDS_PATH)
+    with timed("Open index"):
+        index = VoterMatchIndex.open(index.path)
+    with timed("Open the voter strings and the saved indexes"):
+        VoterRoll.from_index(index)
+    with timed("Warm start: hash, open and load the roll"):
+        voter_roll = load_voter_roll_file(VOTER_RECORDS_PATH, directory)
+    with timed("First match: decode the distinct names and addresses"):
+        voter_roll.store.unique_names
+        voter_roll.store.unique_addresses
+    with timed("Blocking index from stored keys"):
+        index.blocking_index()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+import numpy as np
+import pandas as pd
+import pytest
+from rapidfuzz import fuzz
+
+from fuzzy_match_helper import (
+    create_ocr_matched_df,
+    create_select_voter_records,
+    get_matched_name_address,
+    get_matched_name_address_batch,
+    load_voter_match_index,
+    score_fuzzy_match_slim,
+)
+from matching import (
+    BlockingIndex,
+    ExactMatchIndex,
+    StreetIndex,
+    VoterStringStore,
+    WardIndex,
+    normalize_ward,
+    ocr_street,
+    soundex,
+)
+
+
+@pytest.fixture(scope="module")
+def select_voter_records():
+    voter_records = pd.read_csv(
+        "sample_data/fake_voter_records.csv", dtype=str, nrows=2000
+    )
+    return create_select_voter_records(voter_records)
+
+
+@pytest.fixture(scope="module")
+def ocr_df(select_voter_records):
+    names = list(select_voter_records["Full Name"].values[:20]) + [
+        "Erika Masey",
+        "Terry Osbourne",
+        "Nobody Atall",
+    ]
+    addresses = list(select_voter_records["Full Address"].values[:20]) + [
+        "6071 Martin Isl",
+        "395 Kathryn Mal",
+        "1 Nowhere",
+    ]
+    return pd.DataFrame(
+        {
+            "OCR Name": names,
+            "OCR Address": addresses,
+            "Date": "",
+            "Page Number": 1,
+            "Row Number": range(1, len(names) + 1),
+            "Filename": "test.pdf",
+        }
+    )
+
+
+def test_create_select_voter_records_leaves_its_input_unchanged():
+    voter_records = pd.DataFrame(
+        {
+            "First_Name": ["Ana", None],
+            "Last_Name": ["Diaz", "Lee"],
+            "Street_Number": ["12", "7"],
+            "Street_Name": ["Oak", "Elm"],
+            "Street_Type": ["St", None],
+            "Street_Dir_Suffix": [None, "NW"],
+        }
+    )
+    original = voter_records.copy()
+
+    select_voter_records = create_select_voter_records(voter_records)
+
+    assert select_voter_records["Full Name"].tolist() == ["Ana Diaz", " Lee"]
+    assert select_voter_records["Full Address"].tolist() == ["12 Oak St ", "7 Elm  NW"]
+    pd.testing.assert_frame_equal(voter_records, original)
+
+
+def vectorized_reference(ocr_result, comparison_list, limit_=10):
+    comparison_array = np.array(comparison_list)
+    scores = np.vectorize(lambda x: fuzz.ratio(ocr_result, x))(comparison_array)
+    # Best first, equal scores in list order
+    top_indices = np.argsort(-scores, kind="stable")[:limit_]
+    return [(comparison_array[i], scores[i], i) for i in top_indices]
+
+
+def test_score_fuzzy_match_slim_matches_vectorized_scorer(select_voter_records):
+    voter_names = select_voter_records["Full Name"].values
+    for ocr_name in ["Erika Masey", "Terry Osbourne", voter_names[5]]:
+        assert score_fuzzy_match_slim(ocr_name, voter_names) == vectorized_reference(
+            ocr_name, voter_names
+        )
+
+
+def test_batch_matching_matches_single_row_matching(select_voter_records, ocr_df):
+    batch_results = get_matched_name_address_batch(
+        ocr_df["OCR Name"].tolist(),
+        ocr_df["OCR Address"].tolist(),
+        select_voter_records,
+    )
+    for (_, row), batch_result in zip(ocr_df.iterrows(), batch_results):
+        assert batch_result == get_matched_name_address(
+            row["OCR Name"], row["OCR Address"], select_voter_records
+        )
+
+
+def test_create_ocr_matched_df_finds_exact_records(select_voter_records, ocr_df):
+    matched_df = create_ocr_matched_df(ocr_df, select_voter_records)
+    assert matched_df["Valid"].iloc[:20].all()
+    assert not matched_df["Valid"].iloc[-1]
+    assert (
+        matched_df["Matched Name"].iloc[:20]
+        == select_voter_records["Full Name"].iloc[:20]
+    ).all()
+
+
+@pytest.mark.parametrize(
+    "name, code",
+    [("Robert", "R163"), ("Rupert", "R163"), ("Ashcraft", "A261"), ("Tymczak", "T522")],
+)
+def test_soundex(name, code):
+    assert soundex(name) == code
+
+
+def test_blocking_candidates_share_soundex_or_trigrams():
+    blocking_index = BlockingIndex.from_select_voter_records(
+        pd.DataFrame({"Full Name": ["Erica Massey", "Brian Mathis", "Tom Lee"]})
+    )
+    # Both leading letters misread: only the trigrams still match
+    assert blocking_index.candidates("Frica Nassey").tolist() == [0]
+    assert blocking_index.candidates("Matt Hiss").tolist() == [1]
+
+
+def test_blocked_matching_agrees_with_full_scan(select_voter_records, ocr_df):
+    blocking_index = BlockingIndex.from_select_voter_records(select_voter_records)
+    blocked_results = get_matched_name_address_batch(
+        ocr_df["OCR Name"].tolist(),
+        ocr_df["OCR Address"].tolist(),
+        select_voter_records,
+        blocking_index=blocking_index,
+    )
+    full_results = get_matched_name_address_batch(
+        ocr_df["OCR Name"].tolist(),
+        ocr_df["OCR Address"].tolist(),
+        select_voter_records,
+    )
+    for blocked, full in zip(blocked_results, full_results):
+        assert blocked[0][2] == full[0][2]
+
+
+def test_exact_index_ignores_case_punctuation_and_spacing(select_voter_records):
+    exact_index = ExactMatchIndex.from_select_voter_records(select_voter_records)
+    name = select_voter_records["Full Name"].iloc[3]
+    address = select_voter_records["Full Address"].iloc[3]
+    positions = exact_index.lookup(
+        [name.upper(), f" {name}.", name], [address.strip(), address, "1 Nowhere"]
+    )
+    assert positions.tolist() == [3, 3, -1]
+
+
+def test_ocr_street_drops_the_house_number():
+    assert ocr_street("6071 Martin Isl.") == "MARTIN ISL"
+    assert ocr_street("12B Shaw Wall") == "SHAW WALL"
+    assert ocr_street("Shaw Wall") == "SHAW WALL"
+
+
+def test_street_local_matching_finds_residents():
+    voter_records = pd.read_csv(
+        "sample_data/fake_voter_records.csv", dtype=str, nrows=2000
+    )
+    street_index = StreetIndex.from_voter_records(voter_records)
+    select_voter_records = create_select_voter_records(voter_records)
+
+    candidates = street_index.candidates("6071 Martin Isl")
+    assert 0 in candidates
+    assert len(candidates) < 10
+
+    results = get_matched_name_address(
+        "Erika Masey",
+        "6071 Martin Isl",
+        select_voter_records,
+        street_index=street_index,
+    )
+    assert results[0][3] == 0
+    assert street_index.candidates("").size == 0
+
+
+@pytest.mark.parametrize(
+    "ward, normalized",
+    [("3", "3"), (3, "3"), ("Ward 03", "3"), (" ward 8 ", "8"), (None, ""), ("", "")],
+)
+def test_normalize_ward(ward, normalized):
+    assert normalize_ward(ward) == normalized
+
+
+def test_ward_matching_falls_back_city_wide():
+    voter_records = pd.read_csv(
+        "sample_data/fake_voter_records.csv", dtype=str, nrows=2000
+    )
+    voter_records["Ward"] = [str(row % 8 + 1) for row in range(len(voter_records))]
+    ward_index = WardIndex.from_voter_records(voter_records)
+    select_voter_records = create_select_voter_records(voter_records)
+    assert sum(len(rows) for rows in ward_index.residents.values()) == 2000
+
+    # Voter 0 lives in ward 1; the wrong ward and the missing ward fall back
+    results = get_matched_name_address_batch(
+        ["Erika Masey"] * 3,
+        ["6071 Martin Isl"] * 3,
+        select_voter_records,
+        ward_index=ward_index,
+        ocr_wards=[1, 2, None],
+    )
+    assert [result[0][3] for result in results] == [0, 0, 0]
+
+    # Without a fallback threshold, only confident ward matches are kept
+    results = get_matched_name_address_batch(
+        ["Erika Masey"] * 2,
+        ["6071 Martin Isl"] * 2,
+        select_voter_records,
+        fallback_threshold=None,
+        ward_index=ward_index,
+        ocr_wards=[1, 2],
+    )
+    assert [result[0][3] for result in results] == [0, 0]
+
+
+def test_voter_match_index_keeps_the_wards(tmp_path):
+    voter_records = pd.read_csv(
+        "sample_data/fake_voter_records.csv", dtype=str, nrows=200
+    )
+    assert load_voter_match_index(voter_records, str(tmp_path)).ward_index() is None
+
+    voter_records["Ward"] = [f"Ward {row % 8 + 1}" for row in range(200)]
+    ward_index = load_voter_match_index(voter_records, str(tmp_path)).ward_index()
+    expected = WardIndex.from_voter_records(voter_records)
+    assert ward_index.residents.keys() == expected.residents.keys()
+    for ward, residents in expected.residents.items():
+        np.testing.assert_array_equal(ward_index.residents[ward], residents)
+
+    # The voters of a ward are gathered once per store
+    store = VoterStringStore.from_select_voter_records(
+        create_select_voter_records(voter_records)
+    )
+    ward_store = ward_index.ward_store("1", store)
+    assert ward_index.ward_store("1", store) is ward_store
+    assert list(ward_store.names) == list(store.names[expected.residents["1"]])
@@ -0,0 +1,393 @@
+import numpy as np
+import pandas as pd
+import pytest
+from rapidfuzz import fuzz
+
+from fuzzy_match_helper import (
+    VoterRoll,
+    create_ocr_matched_df,
+    create_select_voter_records,
+    get_matched_name_address,
+    get_matched_name_address_batch,
+    load_voter_match_index,
+    load_voter_roll_file,
+)
+from matching import (
+    BlockingIndex,
+    ExactMatchIndex,
+    MatchCache,
+    PackedStrings,
+    ProcessPoolMatcher,
+    ScorerCascade,
+    TfidfCandidateIndex,
+    VoterMatchIndex,
+    VoterStringStore,
+    hash_voter_file,
+    hash_voter_records,
+    match_name_then_address_batch,
+    top_k_matches,
+)
+from settings import MatchingConfig
+from utils import SqliteLruCache
+
+
+@pytest.fixture(scope="module")
+def select_voter_records():
+    voter_records = pd.read_csv(
+        "sample_data/fake_voter_records.csv", dtype=str, nrows=2000
+    )
+    return create_select_voter_records(voter_records)
+
+
+def test_packed_strings_round_trip():
+    strings = ["Adam Welch", "", "Zoë Ångström", "5211 Shaw Wall  "]
+    packed = PackedStrings.from_strings(strings)
+    buffer = bytearray(packed.serialized_size)
+    packed.write_to(buffer)
+
+    unpacked = PackedStrings.from_buffer(buffer)
+    assert len(unpacked) == len(strings)
+    assert unpacked[2] == "Zoë Ångström"
+    assert unpacked.to_list() == strings
+    assert unpacked[1:3] == strings[1:3]
+    assert unpacked[np.array([[3, 0], [2, 2]])].tolist() == [
+        [strings[3], strings[0]],
+        [strings[2], strings[2]],
+    ]
+
+
+def test_top_k_matches_streams_packed_choices(select_voter_records):
+    names = select_voter_records["Full Name"].tolist()
+    queries = ["Erika Masey", "Terry Osbourne"]
+    indices, scores = top_k_matches(
+        queries, PackedStrings.from_strings(names), max_chunk_cells=500
+    )
+    expected_indices, expected_scores = top_k_matches(queries, names)
+    np.testing.assert_array_equal(scores, expected_scores)
+    assert indices[:, 0].tolist() == expected_indices[:, 0].tolist()
+
+
+def test_process_pool_matches_in_process_matching(select_voter_records):
+    ocr_names = ["Erika Masey", "Terry Osbourne", "Nobody Atall"]
+    ocr_addresses = ["6071 Martin Isl", "395 Kathryn Mal", "1 Nowhere"]
+    ocr_df = pd.DataFrame(
+        {
+            "OCR Name": ocr_names,
+            "OCR Address": ocr_addresses,
+            "Date": "",
+            "Page Number": 1,
+            "Row Number": range(1, len(ocr_names) + 1),
+            "Filename": "test.pdf",
+        }
+    )
+    blocking_index = BlockingIndex.from_select_voter_records(select_voter_records)
+    scorer_cascade = ScorerCascade.from_config(
+        MatchingConfig(prefilter_scorer="indel", prefilter_limit=50)
+    )
+    with ProcessPoolMatcher(select_voter_records, max_workers=1, chunk_size=2) as pool:
+        pool_results = pool.match(ocr_names, ocr_addresses)
+        pool_matched_df = create_ocr_matched_df(
+            ocr_df,
+            select_voter_records,
+            process_pool=pool,
+            blocking_index=blocking_index,
+            scorer_cascade=scorer_cascade,
+        )
+        with pytest.raises(ValueError, match="tfidf_index"):
+            create_ocr_matched_df(
+                ocr_df,
+                select_voter_records,
+                process_pool=pool,
+                tfidf_index=TfidfCandidateIndex.from_strings(
+                    select_voter_records["Full Name"]
+                ),
+            )
+
+    # Equal scores are ranked in voter order, however the roll is split into blocks
+    assert pool_results == get_matched_name_address_batch(
+        ocr_names, ocr_addresses, select_voter_records
+    )
+    pd.testing.assert_frame_equal(
+        pool_matched_df,
+        create_ocr_matched_df(
+            ocr_df,
+            select_voter_records,
+            blocking_index=blocking_index,
+            scorer_cascade=scorer_cascade,
+        ),
+    )
+
+
+def test_voter_match_index_round_trip(select_voter_records, tmp_path):
+    path = str(tmp_path / "roll.idx")
+    VoterMatchIndex.build(select_voter_records, "roll-hash").save(path)
+
+    index = VoterMatchIndex.open(path)
+    assert index.roll_hash == "roll-hash"
+    assert len(index) == len(select_voter_records)
+    pd.testing.assert_frame_equal(
+        index.to_select_voter_records(),
+        select_voter_records.reset_index(drop=True),
+        check_dtype=False,
+    )
+
+    expected = BlockingIndex.from_select_voter_records(select_voter_records)
+    assert index.blocking_index().buckets.keys() == expected.buckets.keys()
+
+
+def test_voter_roll_reads_the_saved_indexes(select_voter_records, tmp_path):
+    path = str(tmp_path / "roll.idx")
+    VoterMatchIndex.build(select_voter_records, "roll-hash").save(path)
+    voter_roll = VoterRoll.from_index(VoterMatchIndex.open(path))
+    assert isinstance(voter_roll.store.names, PackedStrings)
+
+    names = select_voter_records["Full Name"]
+    addresses = select_voter_records["Full Address"]
+    ocr_names = [names.iloc[5].upper(), names.iloc[6], "Erika Masey"]
+    ocr_addresses = [addresses.iloc[5], addresses.iloc[5], "6071 Martin Isl"]
+    assert voter_roll.exact_index.lookup(ocr_names, ocr_addresses).tolist() == (
+        ExactMatchIndex.from_select_voter_records(select_voter_records)
+        .lookup(ocr_names, ocr_addresses)
+        .tolist()
+    )
+
+    ocr_df = pd.DataFrame(
+        {
+            "OCR Name": ocr_names,
+            "OCR Address": ocr_addresses,
+            "Date": "",
+            "Page Number": 1,
+            "Row Number": range(1, len(ocr_names) + 1),
+            "Filename": "test.pdf",
+        }
+    )
+    pd.testing.assert_frame_equal(
+        create_ocr_matched_df(
+            ocr_df, voter_roll.store, exact_index=voter_roll.exact_index
+        ),
+        create_ocr_matched_df(ocr_df, select_voter_records),
+    )
+
+
+def test_load_voter_match_index_is_keyed_by_roll_content(tmp_path):
+    voter_records = pd.read_csv(
+        "sample_data/fake_voter_records.csv", dtype=str, nrows=100
+    )
+    index = load_voter_match_index(voter_records, str(tmp_path))
+    assert index.roll_hash == hash_voter_records(voter_records)
+    assert load_voter_match_index(voter_records, str(tmp_path)).path == index.path
+
+    changed = load_voter_match_index(voter_records.head(50), str(tmp_path))
+    assert changed.path != index.path
+    assert len(changed) == 50
+
+
+def test_voter_roll_file_is_hashed_and_parsed_once(tmp_path, monkeypatch):
+    path = tmp_path / "voter_records.csv"
+    pd.read_csv("sample_data/fake_voter_records.csv", dtype=str, nrows=100).to_csv(
+        path, index=False
+    )
+    with open(path, "rb") as upload:
+        assert hash_voter_file(upload) == hash_voter_file(str(path))
+        assert upload.tell() == 0
+
+    voter_roll = load_voter_roll_file(str(path), str(tmp_path))
+    assert voter_roll.roll_hash == hash_voter_file(str(path))
+    assert voter_roll.store.names[0] == "Erica Massey"
+    assert voter_roll.ward_index is None
+
+    # The saved index is opened without reading the CSV again
+    monkeypatch.setattr(pd, "read_csv", None)
+    reloaded = load_voter_roll_file(str(path), str(tmp_path))
+    assert reloaded.index.path == voter_roll.index.path
+    assert list(reloaded.store.addresses) == list(voter_roll.store.addresses)
+
+
+def test_voter_string_store_matches_like_the_dataframe(select_voter_records):
+    store = VoterStringStore.from_select_voter_records(select_voter_records)
+    assert len(store) == len(select_voter_records)
+    assert store[7].name == select_voter_records["Full Name"].iloc[7]
+    assert store[7].address == select_voter_records["Full Address"].iloc[7]
+
+    assert get_matched_name_address(
+        "Erika Masey", "6071 Martin Isl", store
+    ) == get_matched_name_address(
+        "Erika Masey", "6071 Martin Isl", select_voter_records
+    )
+
+
+def test_unique_name_scoring_matches_full_scoring():
+    store = VoterStringStore(
+        np.array(["Adam Welch", "Ann Lee", "Adam Welch", "Ann Le", "Ann Lee"], object),
+        np.array(["1 A St", "2 B St", "3 C St", "2 B St", "2 B St"], object),
+    )
+    unique_names, name_inverse = store.unique_names
+    assert list(unique_names) == ["Adam Welch", "Ann Lee", "Ann Le"]
+    assert list(unique_names[name_inverse]) == list(store.names)
+
+    ocr_names, ocr_addresses = ["Adam Welsh", "Ann Lee"], ["3 C St", "2 B St"]
+    assert match_name_then_address_batch(
+        ocr_names, ocr_addresses, store.names, store.addresses, limit=4
+    ) == match_name_then_address_batch(
+        ocr_names,
+        ocr_addresses,
+        store.names,
+        store.addresses,
+        limit=4,
+        unique_names=store.unique_names,
+    )
+    frame = pd.DataFrame({"Full Name": store.names, "Full Address": store.addresses})
+    assert get_matched_name_address(
+        "Ann Lee", "2 B St", store
+    ) == get_matched_name_address("Ann Lee", "2 B St", frame)
+
+
+def test_joint_matching_rescues_a_garbled_name_by_its_address(select_voter_records):
+    store = VoterStringStore.from_select_voter_records(select_voter_records)
+    name, address = store.names[42], store.addresses[42]
+    garbled = name.upper()
+    funnel_results = get_matched_name_address_batch([garbled], [address], store)
+    assert funnel_results[0][0][3] != 42
+
+    results = get_matched_name_address_batch(
+        [garbled], [address], store, limit_=5, joint=True
+    )[0]
+    assert results[0][:2] == (name, address)
+    assert results[0][3] == 42
+    name_score = fuzz.ratio(garbled, name)
+    assert results[0][2] == pytest.approx(2 * name_score * 100 / (name_score + 100))
+    assert [r[2] for r in results] == sorted((r[2] for r in results), reverse=True)
+
+
+def test_tfidf_candidates_feed_the_name_funnel(select_voter_records):
+    store = VoterStringStore.from_select_voter_records(select_voter_records)
+    tfidf_index = TfidfCandidateIndex.from_strings(store.names)
+
+    indices, similarities = tfidf_index.top_k(["Erika Masey", "!!!"], limit=20)
+    assert 0 in indices[0]
+    assert np.all(np.diff(similarities[0]) <= 0)
+    assert np.all(indices[1] == -1)
+
+    # Chunking the products by their size does not change the candidates
+    queries = ["Erika Masey", "Terry Osbourne", "Anna Lee", "!!!"]
+    chunked = tfidf_index.top_k(queries, max_product_nnz=1)
+    for expected, found in zip(tfidf_index.top_k(queries), chunked):
+        np.testing.assert_array_equal(found, expected)
+    assert chunked[0].shape == (4, tfidf_index.limit)
+
+    ocr_names = ["Erika Masey", "Terry Osbourne", "!!!"]
+    ocr_addresses = ["6071 Martin Isl", "395 Kathryn Mal", "1 Nowhere"]
+    results = get_matched_name_address_batch(
+        ocr_names, ocr_addresses, store, tfidf_index=tfidf_index
+    )
+    full_results = get_matched_name_address_batch(ocr_names, ocr_addresses, store)
+    assert [r[0][3] for r in results[:2]] == [r[0][3] for r in full_results[:2]]
+    # Rows without candidates are scored against the whole roll
+    assert results[2] == full_results[2]
+
+
+def test_tfidf_index_over_names_and_addresses(select_voter_records):
+    store = VoterStringStore.from_select_voter_records(select_voter_records)
+    matching_config = MatchingConfig(tfidf="name_address", tfidf_limit=5)
+    tfidf_index = TfidfCandidateIndex.from_config(
+        matching_config, store.names, store.addresses
+    )
+    assert tfidf_index.config_key == "name_address:5"
+    assert TfidfCandidateIndex.from_config(MatchingConfig(), store.names, []) is None
+    with pytest.raises(ValueError, match="Unknown TF-IDF field"):
+        TfidfCandidateIndex.from_config(MatchingConfig(tfidf="address"), [], [])
+
+    # A misread name is still retrieved from its address
+    ocr_names = ["Xxxx Yyyy", store.names[3]]
+    ocr_addresses = [store.addresses[7], store.addresses[3]]
+    candidates = tfidf_index.candidates(ocr_names, ocr_addresses)
+    assert 7 in candidates[0]
+    assert candidates[1][0] == 3
+    results = get_matched_name_address_batch(
+        ocr_names, ocr_addresses, store, tfidf_index=tfidf_index
+    )
+    assert results[1][0][3] == 3
+
+
+def test_scorer_cascade_runs_the_final_scorer_on_the_shortlist(select_voter_records):
+    voter_names = select_voter_records["Full Name"].to_numpy(dtype=object)
+    queries = ["Erika Masey", "Terry Osbourne"]
+
+    single_stage = ScorerCascade.from_config(MatchingConfig())
+    indices, scores = single_stage.top_k(queries, voter_names)
+    _, expected_scores = top_k_matches(queries, voter_names)
+    np.testing.assert_array_equal(scores, expected_scores)
+
+    cascade = ScorerCascade.from_config(
+        MatchingConfig(
+            prefilter_scorer="jaro_winkler", prefilter_limit=50, scorer="WRatio"
+        )
+    )
+    indices, scores = cascade.top_k(queries, voter_names, limit=5)
+    assert indices[0][0] == 0
+    for row, query in enumerate(queries):
+        assert list(scores[row]) == [
+            fuzz.WRatio(query, voter_names[i]) for i in indices[row]
+        ]
+
+    results = get_matched_name_address(
+        "Erika Masey", "6071 Martin Isl", select_voter_records, scorer_cascade=cascade
+    )
+    assert results[0][3] == 0
+
+
+def test_scorer_cascade_rejects_unknown_scorers():
+    with pytest.raises(ValueError, match="Unknown scorer"):
+        ScorerCascade.from_config(MatchingConfig(scorer="nope"))
+    with pytest.raises(ValueError, match="Unknown prefilter scorer"):
+        ScorerCascade.from_config(MatchingConfig(prefilter_scorer="nope"))
+
+
+def test_sqlite_lru_cache_evicts_the_least_recently_read_entries(tmp_path):
+    cache = SqliteLruCache(str(tmp_path / "cache.sqlite"), max_bytes=300)
+    for key in "abc":
+        cache.set(key, ["x" * 80])
+    cache.get("a")
+    cache.set("d", ["x" * 80])
+
+    reopened = SqliteLruCache(str(tmp_path / "cache.sqlite"))
+    assert set(reopened.get_many("abcd")) == {"a", "c", "d"}
+    assert reopened.get("a") == cache.get("a") == ["x" * 80]
+
+    # Rewriting an entry replaces its size instead of adding to it
+    for _ in range(5):
+        cache.set("d", ["x" * 80])
+    assert set(SqliteLruCache(str(tmp_path / "cache.sqlite")).get_many("acd")) == {
+        "a",
+        "c",
+        "d",
+    }
+
+
+def test_match_cache_answers_repeated_signatures(select_voter_records, tmp_path):
+    match_cache = MatchCache(SqliteLruCache(str(tmp_path / "cache.sqlite")), "roll")
+    name = select_voter_records["Full Name"].iloc[7]
+    address = select_voter_records["Full Address"].iloc[7]
+
+    first = get_matched_name_address(
+        f" {name}", address, select_voter_records, match_cache=match_cache
+    )
+    repeated = get_matched_name_address(
+        name, f"{address}  ", select_voter_records, match_cache=match_cache
+    )
+    assert repeated == first
+    assert (match_cache.hits, match_cache.misses) == (1, 1)
+    # Only the key is normalized: rows are matched on the text as read
+    assert first == get_matched_name_address(f" {name}", address, select_voter_records)
+
+    # Another roll or scorer does not read these results
+    other_roll = MatchCache(match_cache.cache, "other roll")
+    assert other_roll.get_many([name], [address], ["{}"]) == [None]
+    get_matched_name_address(
+        name,
+        address,
+        select_voter_records,
+        scorer_cascade=ScorerCascade(fuzz.WRatio),
+        match_cache=match_cache,
+    )
+    assert match_cache.misses == 2
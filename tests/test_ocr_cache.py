@@ -0,0 +1,58 @@
+import base64
+
+from ocr import OcrCache
+from settings import load_settings
+
+
+def encode(image: bytes) -> str:
+    return base64.b64encode(image).decode("utf-8")
+
+
+def open_cache(settings_path, cache_path):
+    settings = load_settings(settings_path, reload_settings=True)
+    return OcrCache.from_config(settings, path=str(cache_path))
+
+
+def test_ocr_cache_round_trip(tmp_path):
+    cache = open_cache("tests/data/test_settings_open_ai.toml", tmp_path / "ocr.sqlite")
+    rows = [{"Name": "JANE DOE", "Address": "1 Main St", "Date": "", "Ward": 2}]
+
+    assert cache.get(encode(b"page one")) is None
+    cache.set(encode(b"page one"), rows)
+
+    assert cache.get(encode(b"page one")) == rows
+    assert cache.get(encode(b"page two")) is None
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_ocr_cache_is_keyed_by_engine(tmp_path):
+    cache_path = tmp_path / "ocr.sqlite"
+    open_ai = open_cache("tests/data/test_settings_open_ai.toml", cache_path)
+    mistral = open_cache("tests/data/test_settings_mistral.toml", cache_path)
+
+    open_ai.set(encode(b"page one"), [])
+
+    assert open_ai.get(encode(b"page one")) == []
+    assert mistral.get(encode(b"page one")) is None
+
+
+def test_ocr_cache_is_keyed_by_strips(tmp_path):
+    settings = load_settings(
+        "tests/data/test_settings_open_ai.toml", reload_settings=True
+    )
+    whole = OcrCache.from_config(settings, path=str(tmp_path / "ocr.sqlite"))
+    settings.ocr.strips_per_page = 2
+    strips = OcrCache.from_config(settings, path=str(tmp_path / "ocr.sqlite"))
+
+    whole.set(encode(b"page one"), [])
+    strips.set([encode(b"page "), encode(b"one")], [])
+
+    assert strips.scope != whole.scope
+    assert strips.get([encode(b"page "), encode(b"one")]) == []
+    # The same pixels cut at another row
+    assert strips.get([encode(b"page"), encode(b" one")]) is None
+
+
+def test_ocr_cache_disabled():
+    settings = load_settings("tests/data/test_settings_ocr.toml", reload_settings=True)
+    assert OcrCache.from_config(settings) is None
@@ -0,0 +1,79 @@
+import asyncio
+
+import pytest
+
+from ocr import ocr_client_factory
+from settings import load_settings
+
+
+@pytest.fixture
+def built_clients(monkeypatch):
+    built = []
+
+    class ChatModel:
+        def with_structured_output(self, schema):
+            return object()
+
+    def create_ocr_client(settings):
+        built.append(settings.selected_config)
+        return ChatModel()
+
+    monkeypatch.setattr(ocr_client_factory, "_create_ocr_client", create_ocr_client)
+    return built
+
+
+def use_settings(monkeypatch, path):
+    settings = load_settings(path, reload_settings=True)
+    monkeypatch.setattr(ocr_client_factory, "load_settings", lambda: settings)
+
+
+def test_client_is_reused_within_an_event_loop(monkeypatch, built_clients):
+    use_settings(monkeypatch, "tests/data/test_settings_open_ai.toml")
+
+    async def run():
+        return [ocr_client_factory.get_ocr_client() for _ in range(5)]
+
+    clients = asyncio.run(run())
+
+    assert len(built_clients) == 1
+    assert all(client is clients[0] for client in clients)
+
+
+def test_client_is_rebuilt_when_the_settings_change(monkeypatch, built_clients):
+    async def run():
+        use_settings(monkeypatch, "tests/data/test_settings_open_ai.toml")
+        first = ocr_client_factory.get_ocr_client()
+        use_settings(monkeypatch, "tests/data/test_settings_mistral.toml")
+        second = ocr_client_factory.get_ocr_client()
+        return first, second
+
+    first, second = asyncio.run(run())
+
+    assert first is not second
+    assert [type(config).__name__ for config in built_clients] == [
+        "OpenAiConfig",
+        "MistralAiConfig",
+    ]
+
+
+def test_mistral_client_sends_through_the_shared_pool(monkeypatch):
+    pools = []
+
+    def create_http_client(max_connections, base_url="", headers=None):
+        pools.append((max_connections, base_url, headers))
+        return f"pool {len(pools)}"
+
+    monkeypatch.setattr(ocr_client_factory, "_create_http_client", create_http_client)
+    monkeypatch.setattr(ocr_client_factory, "ChatMistralAI", dict)
+    settings = load_settings(
+        "tests/data/test_settings_mistral.toml", reload_settings=True
+    )
+
+    client = ocr_client_factory._create_ocr_client(settings)
+
+    assert client["async_client"] == "pool 1"
+    assert client["max_concurrent_requests"] == settings.ocr.max_concurrency
+    max_connections, base_url, headers = pools[0]
+    assert max_connections == settings.ocr.max_concurrency
+    assert base_url == client["endpoint"] == ocr_client_factory.MISTRAL_ENDPOINT
+    assert headers["Authorization"] == "Bearer Your Mistral API key"
@@ -0,0 +1,154 @@
+import asyncio
+
+import pytest
+from piccolo.engine.sqlite import SQLiteEngine
+
+from ocr import OcrCheckpoint, PageResult
+from voter_records.tables import OCR_PAGE_UNIQUE_INDEX, OcrJob, OcrPage
+
+
+@pytest.fixture
+def job_tables(tmp_path, monkeypatch):
+    engine = SQLiteEngine(path=str(tmp_path / "jobs.sqlite"))
+    for table in (OcrJob, OcrPage):
+        monkeypatch.setattr(table._meta, "_db", engine)
+
+    async def create():
+        await OcrJob.create_table()
+        await OcrPage.create_table()
+        await OcrPage.raw(OCR_PAGE_UNIQUE_INDEX)
+
+    asyncio.run(create())
+
+
+@pytest.fixture
+def pdf_path(tmp_path):
+    path = tmp_path / "ballot.pdf"
+    path.write_bytes(b"%PDF petition")
+    return str(path)
+
+
+def test_checkpoint_resumes_unfinished_job(job_tables, pdf_path):
+    async def interrupted_run():
+        checkpoint = await OcrCheckpoint.open(
+            pdf_path, "ballot.pdf", 4, "scope", batch_size=2
+        )
+        checkpoint.add(PageResult(0, [{"Name": "A"}], attempts=1))
+        checkpoint.add(PageResult(1, [], error="HTTP 500", attempts=6))
+        await asyncio.gather(*checkpoint._flushes)
+        # The process dies before the batch of page 2 is written
+        checkpoint.add(PageResult(2, [{"Name": "C"}], attempts=1))
+
+    async def resumed_run():
+        checkpoint = await OcrCheckpoint.open(pdf_path, "ballot.pdf", 4, "scope")
+        done = dict(checkpoint.completed)
+        for page_no in range(4):
+            if checkpoint.get(page_no) is None:
+                checkpoint.add(PageResult(page_no, [{"Name": f"page {page_no}"}]))
+        return done, await checkpoint.finish(4)
+
+    asyncio.run(interrupted_run())
+    done, results = asyncio.run(resumed_run())
+
+    assert done == {0: [{"Name": "A"}]}
+    assert [result.rows for result in results] == [
+        [{"Name": "A"}],
+        [{"Name": "page 1"}],
+        [{"Name": "page 2"}],
+        [{"Name": "page 3"}],
+    ]
+    assert not any(result.error for result in results)
+
+
+def test_completed_job_is_not_resumed(job_tables, pdf_path):
+    async def run():
+        checkpoint = await OcrCheckpoint.open(pdf_path, "ballot.pdf", 1, "scope")
+        checkpoint.add(PageResult(0, [{"Name": "A"}]))
+        await checkpoint.finish(1)
+        rerun = await OcrCheckpoint.open(pdf_path, "ballot.pdf", 1, "scope")
+        other_scope = await OcrCheckpoint.open(pdf_path, "ballot.pdf", 1, "other")
+        return rerun, other_scope, checkpoint
+
+    rerun, other_scope, checkpoint = asyncio.run(run())
+
+    assert rerun.job_id != checkpoint.job_id
+    assert rerun.completed == {}
+    assert other_scope.job_id not in (checkpoint.job_id, rerun.job_id)
+
+
+def test_failed_writes_are_retried_then_kept_in_memory(
+    job_tables, pdf_path, monkeypatch
+):
+    insert = OcrPage.insert
+    failures = {"left": 1}
+
+    def flaky_insert(*rows):
+        if failures["left"]:
+            failures["left"] -= 1
+            raise ConnectionError("database is down")
+        return insert(*rows)
+
+    monkeypatch.setattr(OcrPage, "insert", flaky_insert)
+
+    async def run(total_pages):
+        checkpoint = await OcrCheckpoint.open(
+            pdf_path, "ballot.pdf", total_pages, f"scope {total_pages}", batch_size=1
+        )
+        for page_no in range(total_pages):
+            checkpoint.add(PageResult(page_no, [{"Name": f"page {page_no}"}]))
+        return await checkpoint.finish(total_pages)
+
+    # The first batch fails and is written again with the last one
+    results = asyncio.run(run(2))
+    assert [result.rows for result in results] == [
+        [{"Name": "page 0"}],
+        [{"Name": "page 1"}],
+    ]
+    assert not any(result.error for result in results)
+
+    # The database never comes back: the pages of the run are still returned
+    failures["left"] = 10
+    results = asyncio.run(run(3))
+    assert [result.rows for result in results] == [
+        [{"Name": "page 0"}],
+        [{"Name": "page 1"}],
+        [{"Name": "page 2"}],
+    ]
+    assert not any(result.error for result in results)
+
+
+def test_pages_are_written_once_per_job(job_tables, pdf_path, monkeypatch):
+    insert = OcrPage.insert
+    lost_replies = {"left": 1}
+
+    class LostReply:
+        # The write commits, but the connection drops before it is acknowledged
+        def __init__(self, query):
+            self.query = query
+
+        def on_conflict(self, **kwargs):
+            self.query = self.query.on_conflict(**kwargs)
+            return self
+
+        def __await__(self):
+            yield from self.query.__await__()
+            if lost_replies["left"]:
+                lost_replies["left"] -= 1
+                raise ConnectionError("connection reset")
+
+    monkeypatch.setattr(OcrPage, "insert", lambda *rows: LostReply(insert(*rows)))
+
+    async def run():
+        checkpoint = await OcrCheckpoint.open(
+            pdf_path, "ballot.pdf", 2, "scope", batch_size=1
+        )
+        checkpoint.add(PageResult(0, [{"Name": "A"}]))
+        await asyncio.gather(*checkpoint._flushes)
+        checkpoint.add(PageResult(1, [{"Name": "B"}]))
+        results = await checkpoint.finish(2)
+        return results, await OcrPage.count().where(OcrPage.job == checkpoint.job_id)
+
+    results, n_rows = asyncio.run(run())
+
+    assert [result.rows for result in results] == [[{"Name": "A"}], [{"Name": "B"}]]
+    assert n_rows == 2
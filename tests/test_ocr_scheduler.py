@@ -0,0 +1,116 @@
+import asyncio
+
+from ocr import OcrScheduler
+
+
+class ProviderError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+async def pages(n_pages):
+    for page_no in range(n_pages):
+        yield f"page {page_no}"
+
+
+def test_scheduler_keeps_a_sliding_window_of_requests():
+    in_flight, peak = 0, 0
+
+    async def ocr(encoding):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        # Later pages finish first
+        await asyncio.sleep(0.001 * (20 - int(encoding.split()[1])))
+        in_flight -= 1
+        return [{"Name": encoding}]
+
+    results = asyncio.run(OcrScheduler(max_concurrency=4).run(pages(20), ocr))
+
+    assert peak == 4
+    assert [result.rows[0]["Name"] for result in results] == [
+        f"page {page_no}" for page_no in range(20)
+    ]
+
+
+def test_scheduler_retries_throttled_pages_and_records_failures():
+    attempts = {}
+
+    async def ocr(encoding):
+        attempts[encoding] = attempts.get(encoding, 0) + 1
+        if encoding == "page 1" and attempts[encoding] < 3:
+            raise ProviderError(429)
+        if encoding == "page 2":
+            raise ProviderError(400)
+        if encoding == "page 3":
+            raise ProviderError(503)
+        return [{"Name": encoding}]
+
+    scheduler = OcrScheduler(max_concurrency=4, max_retries=2, base_delay=0.001)
+    results = asyncio.run(scheduler.run(pages(5), ocr))
+
+    assert [result.error is None for result in results] == [
+        True,
+        True,
+        False,
+        False,
+        True,
+    ]
+    assert results[1].attempts == 3
+    assert results[2].attempts == 1
+    assert "400" in results[2].error
+    assert results[3].attempts == 3
+
+
+def test_scheduler_does_not_request_pages_found_by_lookup():
+    requested = []
+
+    async def ocr(encoding):
+        requested.append(encoding)
+        return [{"Name": encoding}]
+
+    def lookup(page_no, encoding):
+        return [{"Name": "cached"}] if page_no % 2 == 0 else None
+
+    results = asyncio.run(OcrScheduler().run(pages(6), ocr, lookup=lookup))
+
+    assert requested == ["page 1", "page 3", "page 5"]
+    assert [result.rows[0]["Name"] for result in results] == [
+        "cached",
+        "page 1",
+        "cached",
+        "page 3",
+        "cached",
+        "page 5",
+    ]
+    assert [result.attempts for result in results] == [0, 1, 0, 1, 0, 1]
+
+
+def test_scheduler_packs_pages_into_requests():
+    requests = []
+
+    async def ocr(encoding):
+        requests.append([encoding])
+        return [{"Name": encoding}]
+
+    async def ocr_pack(encodings):
+        requests.append(encodings)
+        return [[{"Name": encoding}] for encoding in encodings]
+
+    def lookup(page_no, encoding):
+        return [{"Name": "cached"}] if page_no == 1 else None
+
+    results = asyncio.run(
+        OcrScheduler(pack_size=3).run(pages(6), ocr, lookup=lookup, ocr_pack=ocr_pack)
+    )
+
+    assert requests == [["page 0", "page 2", "page 3"], ["page 4", "page 5"]]
+    assert [result.rows[0]["Name"] for result in results] == [
+        "page 0",
+        "cached",
+        "page 2",
+        "page 3",
+        "page 4",
+        "page 5",
+    ]
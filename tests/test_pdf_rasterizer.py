@@ -0,0 +1,192 @@
+import asyncio
+import base64
+from contextlib import aclosing
+
+import fitz
+import numpy as np
+import pytest
+
+from pdf_rasterizer import (
+    ImageEncoding,
+    count_pages,
+    decode_page,
+    encode_page,
+    encode_page_strips,
+    find_strip_boundaries,
+    find_table_region,
+    iter_encoded_pages,
+    iter_encoded_pages_parallel,
+    prefetch_encoded_pages,
+    split_encoded_page,
+)
+
+
+@pytest.fixture(scope="module")
+def petition_pdf(tmp_path_factory):
+    path = tmp_path_factory.mktemp("pdf") / "petition.pdf"
+    with fitz.open() as pdf_document:
+        for page_no in range(12):
+            page = pdf_document.new_page(width=612, height=792)
+            page.insert_text((72, 400), f"Signer {page_no}")
+        pdf_document.save(path)
+    return str(path)
+
+
+def test_iter_encoded_pages_crops_every_page(petition_pdf):
+    pages = list(iter_encoded_pages(petition_pdf))
+    assert len(pages) == count_pages(petition_pdf) == 12
+
+    pixmap = fitz.Pixmap(base64.b64decode(pages[0]))
+    assert pixmap.width == 612
+    assert pixmap.height == pytest.approx(792 * (0.725 - 0.385), abs=2)
+    assert len(list(iter_encoded_pages(petition_pdf, max_page_num=5))) == 5
+
+
+def test_parallel_rendering_keeps_the_page_order(petition_pdf):
+    pages = iter_encoded_pages_parallel(
+        petition_pdf, max_page_num=11, max_workers=2, pages_per_task=3
+    )
+    assert list(pages) == list(iter_encoded_pages(petition_pdf, max_page_num=11))
+
+
+def test_prefetch_yields_the_pages_in_order(petition_pdf):
+    async def collect(limit=None):
+        pages = []
+        async with aclosing(prefetch_encoded_pages(petition_pdf, prefetch=2)) as it:
+            async for page in it:
+                pages.append(page)
+                if len(pages) == limit:
+                    break
+        return pages
+
+    assert asyncio.run(collect()) == list(iter_encoded_pages(petition_pdf))
+    # Stopping early releases the rendering thread
+    assert len(asyncio.run(collect(limit=3))) == 3
+
+
+def ruled_table(row_height=40, n_rows=6, width=300):
+    # White table with a ruled line under every row and handwriting in every row
+    gray = np.full((row_height * n_rows, width), 255, dtype=np.uint8)
+    for row in range(n_rows):
+        gray[row * row_height + 10 : row * row_height + 30, 20:120] = 0
+        gray[(row + 1) * row_height - 1, :] = 0
+    return gray
+
+
+def test_strip_boundaries_follow_the_ruled_lines():
+    gray = ruled_table()
+    boundaries = find_strip_boundaries(gray, 4)
+
+    assert boundaries[0] == 0 and boundaries[-1] == gray.shape[0]
+    assert len(boundaries) == 5
+    assert all(boundary % 40 == 39 for boundary in boundaries[1:-1])
+
+
+def test_strip_boundaries_fall_back_to_blank_gaps():
+    # Without its ruled lines
+    gray = ruled_table()
+    gray[39::40] = 255
+
+    for boundary in find_strip_boundaries(gray, 3)[1:-1]:
+        # Never inside the handwriting of a row
+        assert not 10 <= boundary % 40 < 30
+
+
+def test_split_encoded_page_keeps_every_pixel_row():
+    pix = fitz.Pixmap(fitz.csGRAY, 300, 240, ruled_table().tobytes(), False)
+    encoding = base64.b64encode(pix.tobytes(output="jpeg")).decode("utf-8")
+
+    strips = split_encoded_page(encoding, 3)
+    heights = [fitz.Pixmap(base64.b64decode(strip)).height for strip in strips]
+
+    assert len(strips) == 3
+    assert sum(heights) == 240
+
+
+def test_encode_page_strips_splits_the_rendered_page(petition_pdf):
+    png = ImageEncoding(format="png")
+    with fitz.open(petition_pdf) as pdf_document:
+        strips = encode_page_strips(pdf_document[0], 3, image_encoding=png)
+        whole = decode_page(encode_page(pdf_document[0], image_encoding=png))
+
+    # Lossless strips hold exactly the pixels of the whole page
+    assert len(strips) == 3
+    assert np.array_equal(np.vstack([decode_page(strip) for strip in strips]), whole)
+
+    pages = list(iter_encoded_pages(petition_pdf, 4, strips_per_page=3))
+    assert all(len(page) == 3 for page in pages)
+    assert (
+        list(
+            iter_encoded_pages_parallel(
+                petition_pdf, 4, max_workers=2, pages_per_task=1, strips_per_page=3
+            )
+        )
+        == pages
+    )
+
+
+def test_find_table_region_on_a_ruled_table():
+    # A 6 row table in a page with a title and ruled lines of a footer
+    gray = np.full((792, 612), 255, dtype=np.uint8)
+    gray[100:110, 100:500:8] = 0
+    gray[350:590, 50:450] = ruled_table(width=400)
+    gray[349, 50:450] = 0
+    gray[700, 50:560] = 0
+
+    assert find_table_region(gray) == (48, 347, 452, 592)
+
+
+def test_find_table_region_without_a_table():
+    gray = np.full((792, 612), 255, dtype=np.uint8)
+    gray[300:310, 100:500:8] = 0
+
+    assert find_table_region(gray) is None
+
+
+def test_encode_page_crops_to_a_shifted_table():
+    with fitz.open() as pdf_document:
+        page = pdf_document.new_page(width=612, height=792)
+        # Rows well below the fixed crop
+        for y in range(500, 760, 40):
+            page.draw_line((40, y), (570, y), width=1)
+
+        pixmap = fitz.Pixmap(base64.b64decode(encode_page(page, detect_table=True)))
+        assert pixmap.width == pytest.approx(530, abs=6)
+        assert pixmap.height == pytest.approx(240, abs=6)
+
+        blank = pdf_document.new_page(width=612, height=792)
+        pixmap = fitz.Pixmap(base64.b64decode(encode_page(blank, detect_table=True)))
+        assert pixmap.height == pytest.approx(792 * (0.725 - 0.385), abs=2)
+
+
+def test_image_encoding_sets_resolution_and_format(petition_pdf):
+    with fitz.open(petition_pdf) as pdf_document:
+        page = pdf_document[0]
+        encoding = ImageEncoding(dpi=144, format="png", binarize=True)
+        data = base64.b64decode(encode_page(page, image_encoding=encoding))
+
+        assert data.startswith(b"\x89PNG")
+        gray = decode_page(base64.b64encode(data).decode("utf-8"))
+        assert gray.shape[1] == 2 * 612
+        assert set(np.unique(gray)) <= {0, 255}
+        # The signer's name is kept as ink
+        assert (gray == 0).any()
+
+
+def test_image_encoding_rejects_unknown_formats():
+    with pytest.raises(ValueError):
+        ImageEncoding(format="gif")
+    assert ImageEncoding(format="webp").mime_type == "image/webp"
+
+
+def test_webp_pages_split_into_webp_strips(petition_pdf):
+    encoding = ImageEncoding(format="webp", quality=80)
+    with fitz.open(petition_pdf) as pdf_document:
+        page = encode_page(pdf_document[0], image_encoding=encoding)
+
+    strips = split_encoded_page(page, 2, encoding)
+    assert all(base64.b64decode(strip)[8:12] == b"WEBP" for strip in strips)
+    assert (
+        sum(decode_page(strip).shape[0] for strip in strips)
+        == (decode_page(page).shape[0])
+    )
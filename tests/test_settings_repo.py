@@ -1,5 +1,12 @@
 import pytest
-from app.settings import load_settings, OpenAiConfig, MistralAiConfig, GeminiAiConfig
+from app.settings import (
+    load_settings,
+    OpenAiConfig,
+    MistralAiConfig,
+    GeminiAiConfig,
+    MatchingConfig,
+    OcrConfig,
+)
 
 
 def test_open_ai_selected_config():
@@ -59,3 +66,37 @@ def test_return_same_settings_if_no_reload():
     )
     second_settings = load_settings("tests/data/test_settings_invalid.toml")
     assert settings == second_settings
+
+
+def test_load_settings_with_matching_section():
+    settings = load_settings(
+        "tests/data/test_settings_matching.toml", reload_settings=True
+    )
+    assert settings.matching == MatchingConfig(
+        prefilter_scorer="jaro_winkler",
+        prefilter_limit=200,
+        scorer="WRatio",
+        workers=4,
+        tfidf="name_address",
+        tfidf_limit=100,
+    )
+
+
+def test_load_settings_without_matching_section_uses_ratio():
+    settings = load_settings(
+        "tests/data/test_settings_default.toml", reload_settings=True
+    )
+    assert settings.matching == MatchingConfig()
+    assert settings.matching.scorer == "ratio"
+    assert settings.matching.prefilter_scorer == "none"
+
+
+def test_load_settings_with_ocr_section():
+    settings = load_settings("tests/data/test_settings_ocr.toml", reload_settings=True)
+    assert settings.ocr == OcrConfig(
+        max_concurrency=4,
+        requests_per_minute=500,
+        tokens_per_minute=200000,
+        cache_size_mb=0,
+    )
+    assert settings.matching == MatchingConfig()
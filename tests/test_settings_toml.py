@@ -31,3 +31,26 @@ def test_gemini_api_key():
 
 def test_gemini_model_selection():
     assert settings["gemini_ai"]["model"] == "default"
+
+
+def test_matching_scorers():
+    assert settings["matching"]["prefilter_scorer"] == "none"
+    assert settings["matching"]["prefilter_limit"] == 300
+    assert settings["matching"]["scorer"] == "ratio"
+    assert settings["matching"]["workers"] == 0
+    assert settings["matching"]["tfidf"] == "none"
+    assert settings["matching"]["tfidf_limit"] == 50
+
+
+def test_ocr_scheduling():
+    assert settings["ocr"]["max_concurrency"] == 10
+    assert settings["ocr"]["requests_per_minute"] == 0
+    assert settings["ocr"]["max_retries"] == 5
+    assert settings["ocr"]["cache_size_mb"] == 512
+    assert settings["ocr"]["pages_per_request"] == 1
+    assert settings["ocr"]["strips_per_page"] == 1
+    assert settings["ocr"]["detect_table"] is False
+    assert settings["ocr"]["image_dpi"] == 72
+    assert settings["ocr"]["image_format"] == "jpeg"
+    assert settings["ocr"]["image_quality"] == 95
+    assert settings["ocr"]["binarize"] is False